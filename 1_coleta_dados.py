@@ -4,6 +4,7 @@ Coleta dados de curvas de juros do Brasil e dos EUA
 """
 
 import pandas as pd
+import pyarrow.parquet as pq
 import numpy as np
 import requests
 import lxml.html
@@ -15,6 +16,13 @@ from scipy.interpolate import interp1d
 import pandas_datareader as pdr
 import os
 
+from armazenamento import atualizar_manifesto, escrever_parquet
+from base_bruta import CAMINHO_BASE, MERCADORIAS, caminho_mercadoria, carregar_indice
+from diario_coleta import DiarioColeta
+
+# Segundos de espera pela página de ajustes antes de desistir da data
+TEMPO_LIMITE = 60
+
 # Funções auxiliares do modelo original
 def to_numeric(elm):
     s = elm.text
@@ -47,7 +55,7 @@ def contract_to_maturity(x):
     month = int(m_[month_code])
     return datetime.datetime(year, month, 1)
 
-def get_contracts(refdate):
+def get_contracts(refdate, mercadoria=None):
     def _cleanup(x):
         if x is None:
             return ''
@@ -57,7 +65,7 @@ def get_contracts(refdate):
         return x
     
     url = 'https://www2.bmf.com.br/pages/portal/bmfbovespa/lumis/lum-ajustes-do-pregao-ptBR.asp'
-    res = requests.post(url, data=dict(dData1=refdate.strftime('%d/%m/%Y')), verify=False)
+    res = requests.post(url, data=dict(dData1=refdate.strftime('%d/%m/%Y')), verify=False, timeout=TEMPO_LIMITE)
     root = lxml.html.fromstring(res.text)
 
     rx = re.compile(r'Atualizado em: (\d\d/\d\d/\d\d\d\d)')
@@ -71,14 +79,21 @@ def get_contracts(refdate):
         return None
     
     data = [_cleanup(td.text) for td in table[0].xpath('//td')]
-    df = pd.DataFrame({
-        'DataRef': refdate,
+    colunas = {
         'Mercadoria': flatten_names(recycle(data, 0, 6)),
         'CDVencimento': recycle(data, 1, 6),
         'PUAnterior': recycle(data, 2, 6),
         'PUAtual': recycle(data, 3, 6),
         'Variacao': recycle(data, 4, 6)
-    })
+    }
+    
+    # Filtra a(s) mercadoria(s) antes de montar o DataFrame (a tabela traz todas)
+    if mercadoria is not None:
+        mercadorias = {mercadoria} if isinstance(mercadoria, str) else set(mercadoria)
+        linhas = [i for i, m in enumerate(colunas['Mercadoria']) if m in mercadorias]
+        colunas = {nome: [valores[i] for i in linhas] for nome, valores in colunas.items()}
+    
+    df = pd.DataFrame({'DataRef': refdate, **colunas})
     df['Vencimento'] = df['CDVencimento'].map(contract_to_maturity)
     df['PUAnterior'] = df['PUAnterior'].astype('float64')
     df['PUAtual'] = df['PUAtual'].astype('float64')
@@ -95,73 +110,88 @@ def retrieve_us_yield_curve_data():
     return df
 
 def coleta_dados_brasil():
-    """Coleta dados do Brasil"""
+    """Coleta dados do Brasil; retorna o número de registros na base"""
     print("Iniciando coleta de dados do Brasil...")
     
     # Caminho para a base existente
-    base_path = 'Dados/Base_Bruta.parquet'
+    base_path = CAMINHO_BASE
+    
+    # Calendario de mercado
+    MARKET_CALENDAR = Calendar.load('ANBIMA')
     
-    # Carrega base existente ou cria uma nova
-    if os.path.exists(base_path):
-        base = pd.read_parquet(base_path)
-        last_date = base['DataRef'].drop_duplicates().sort_values(ascending=False).head(1).iloc[0]
+    # Última data de cada mercadoria a partir do índice de chaves (na primeira
+    # vez a base é compactada); a coleta recomeça na mais atrasada. Uma
+    # mercadoria sem base começa na última data do DI1: o histórico dela vem
+    # dos arquivos da B3 (importacao_b3.py), não de uma página por data
+    ultimas = {}
+    for mercadoria in MERCADORIAS:
+        caminho = caminho_mercadoria(mercadoria, base_path)
+        indice = carregar_indice(caminho) if os.path.exists(caminho) else []
+        if len(indice):
+            ultimas[mercadoria] = pd.Timestamp(np.datetime64(int(indice[-1] >> 16), 'D')).to_pydatetime()
+    
+    sem_base = [m for m in MERCADORIAS if m not in ultimas]
+    if 'DI1' in ultimas and sem_base:
+        print(f"Sem base para {', '.join(sem_base)}: coleta a partir de {ultimas['DI1']:%Y-%m-%d}; "
+              f"para o histórico, rode `python importacao_b3.py` com os arquivos da B3")
+        for mercadoria in sem_base:
+            ultimas[mercadoria] = ultimas['DI1']
+    
+    if len(ultimas) == len(MERCADORIAS):
+        last_date = min(ultimas.values())
+        inicio = MARKET_CALENDAR.offset(last_date, 1)
     else:
-        base = pd.DataFrame()
         last_date = datetime.datetime(2020, 1, 1)
+        inicio = last_date
     
-    print(f"Última data na base: {last_date}")
+    print(f"Última data na base: {last_date} "
+          f"({', '.join(f'{m}: {d:%Y-%m-%d}' for m, d in ultimas.items()) or 'nenhuma base'})")
     
-    # Calendario de mercado
-    MARKET_CALENDAR = Calendar.load('ANBIMA')
+    # Datas para coletar (a partir do dia útil seguinte à última data gravada)
+    fim = (datetime.datetime.today() - datetime.timedelta(days=1)).date()
+    refdate = MARKET_CALENDAR.seq(inicio, fim) if pd.Timestamp(inicio).date() <= fim else []
     
-    # Datas para coletar
-    refdate = MARKET_CALENDAR.seq(last_date, 
-                                datetime.datetime.today() - datetime.timedelta(days=1))
+    # Diário: datas já concluídas (coleta interrompida) e datas sem dados são puladas
+    diario = DiarioColeta()
+    pendentes = diario.pendentes(refdate)
     
-    print(f"Coletando dados para {len(refdate)} datas...")
+    print(f"Coletando dados para {len(pendentes)} datas "
+          f"({len(refdate) - len(pendentes)} já no diário ou sem dados)...")
     
-    # Lista para armazenar DataFrames
-    lista = []
-    
-    # Itera sobre cada data
-    for i, date in enumerate(refdate):
+    # Itera sobre cada data; o resultado de cada uma vai para o diário na hora
+    for i, date in enumerate(pendentes):
         try:
-            print(f"Processando {i+1}/{len(refdate)}: {date}")
-            curve = get_contracts(date)
+            print(f"Processando {i+1}/{len(pendentes)}: {date}")
+            # Uma leitura da página alimenta as bases de todas as mercadorias
+            # que ainda não têm a data
+            atrasadas = [m for m in MERCADORIAS if m not in ultimas or pd.Timestamp(date) > ultimas[m]]
+            curve = get_contracts(date, mercadoria=atrasadas)
             
             if curve is not None:
                 curve['date'] = date
-                lista.append(curve)
+                
+                # Contratos vencidos (PU 100.000) não entram
+                df_new = curve[curve['PUAtual'] != 100000.0].reset_index(drop=True)
+                diario.registrar(date, df_new)
             else:
                 print(f"Nenhuma curva encontrada para a data {date}")
+                diario.registrar_vazia(date)
         
         except Exception as e:
+            # Erros não entram no cache negativo: a data é tentada de novo na próxima execução
             print(f"Erro ao processar a data {date}: {e}")
     
-    if lista:
-        # Concatena todos os DataFrames
-        df_final = pd.concat(lista, ignore_index=True)
-        
-        # Filtra apenas DI1
-        df_new = df_final[(df_final['Mercadoria'] == 'DI1') & 
-                         (df_final['PUAtual'] != 100000.0)].copy()
-        df_new = df_new.reset_index(drop=True, inplace=False)
+    # Inserção pela chave (DataRef, CDVencimento): datas já gravadas são substituídas
+    resultados = diario.consolidar(base_path)
+    if resultados is not None:
+        for mercadoria, (total, inseridos, substituidos) in resultados.items():
+            print(f"Base atualizada salva: {caminho_mercadoria(mercadoria, base_path)} "
+                  f"({inseridos} registros novos, {substituidos} substituídos)")
         
-        # Append à base existente
-        if not base.empty:
-            di1 = pd.concat([base, df_new], ignore_index=True)
-        else:
-            di1 = df_new
-        
-        # Salva a base atualizada
-        os.makedirs(os.path.dirname(base_path), exist_ok=True)
-        di1.to_parquet(base_path, index=True)
-        print(f"Base atualizada salva: {base_path}")
-        
-        return di1
+        return resultados['DI1'][0]
     else:
         print("Nenhum dado novo coletado")
-        return base
+        return pq.read_metadata(base_path).num_rows if os.path.exists(base_path) else 0
 
 def coleta_dados_eua():
     """Coleta dados dos EUA"""
@@ -173,7 +203,7 @@ def coleta_dados_eua():
         # Salva os dados
         eua_path = 'Dados/juros_eua_bruto.parquet'
         os.makedirs(os.path.dirname(eua_path), exist_ok=True)
-        df_us.to_parquet(eua_path)
+        escrever_parquet(df_us, eua_path)
         print(f"Dados dos EUA salvos: {eua_path}")
         
         return df_us
@@ -192,10 +222,13 @@ def main():
     # Coleta dados dos EUA
     dados_eua = coleta_dados_eua()
     
+    # Registra a nova versão dos dados para o app recarregar sem reiniciar
+    atualizar_manifesto()
+    
     print("=== COLETA FINALIZADA ===")
     
     if dados_brasil is not None:
-        print(f"Brasil: {len(dados_brasil)} registros coletados")
+        print(f"Brasil: {dados_brasil} registros na base")
     
     if dados_eua is not None:
         print(f"EUA: {len(dados_eua)} registros coletados")
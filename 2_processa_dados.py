@@ -5,139 +5,557 @@ Processa os dados coletados para criar as superfícies de juros
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 from bizdays import Calendar
-from scipy.interpolate import interp1d
 import datetime
+import functools
 import os
+from concurrent.futures import ProcessPoolExecutor
 
-def flat_forward_interpolation(x, y):
-    """Interpolação flat-forward"""
-    return interp1d(x, y, kind='previous', fill_value='extrapolate')
+from ajuste_nss import processa_nss
+from decomposicao_pca import processa_pca
+from metricas_curva import processa_metricas
+from copom_implicito import processa_copom
+from base_bruta import anos, caminho_mercadoria, ler_base, ler_base_em_blocos
+from armazenamento import (
+    LINHAS_POR_GRUPO, atualizar_manifesto, escrever_json_atomico, escrever_parquet,
+    escrever_parquet_lotes, versao_dados,
+)
 
-def processa_dados_brasil():
-    """Processa dados do Brasil para criar superfície de juros"""
+# Grade padrão de horizontes (dias úteis) da superfície do Brasil
+HORIZONTES_PADRAO = [
+    21, 63, 126,
+    252, 504, 756, 1008, 1260, 1512, 1764, 2016, 2268, 2520,
+    2772, 3024, 3276, 3528, 3780, 4032, 4284, 4536, 4788, 5040,
+    5292, 5544, 5796, 6048, 6300, 6552, 6804, 7056, 7308, 7560,
+    7812, 8064, 8316, 8558
+]
+
+# Passo (dias úteis) da grade densa, que vai até o vértice mais longo da base
+PASSO_GRADE_DENSA = 21
+
+# Acima deste número de registros na base bruta o Brasil é processado em
+# blocos de LINHAS_POR_BLOCO linhas, sem carregar a base inteira
+LIMITE_REGISTROS_MEMORIA = 5_000_000
+LINHAS_POR_BLOCO = 65536
+
+# Convenções dos contratos de cada mercadoria: dia do mês do vencimento (ou o
+# dia útil seguinte) e base da taxa. DI1 e DAP têm taxa exponencial em dias
+# úteis/252 (PU = 100.000 / (1 + taxa)^(du/252)); o DDI (cupom cambial) tem
+# taxa linear em dias corridos/360 (PU = 100.000 / (1 + taxa * dc/360)).
+CONVENCOES = {
+    'DI1': (1, 252),
+    'DAP': (15, 252),
+    'DDI': (1, 360),
+}
+
+# Superfícies processadas de cada mercadoria (grade padrão de horizontes)
+CAMINHOS_SUPERFICIE = {
+    'DI1': 'Dados/juros_brasil_processado.parquet',
+    'DAP': 'Dados/juros_dap_processado.parquet',
+    'DDI': 'Dados/juros_ddi_processado.parquet',
+}
+CAMINHO_INFLACAO_IMPLICITA = 'Dados/inflacao_implicita.parquet'
+
+def grade_densa(du_maximo, passo=PASSO_GRADE_DENSA):
+    """Horizontes a cada `passo` dias úteis, cobrindo até `du_maximo`"""
+    return list(range(passo, int(du_maximo) + passo, passo))
+
+@functools.lru_cache(maxsize=1)
+def feriados_anbima():
+    """Feriados do calendário ANBIMA (carregar o calendário leva ~1 s)"""
+    return np.array(Calendar.load('ANBIMA').holidays, dtype='datetime64[D]')
+
+def taxas_contratos(registros, mercadoria='DI1'):
+    """
+    Vencimento, dias úteis e taxa de cada registro, na ordem dos registros,
+    com as convenções da `mercadoria` (DI1 por padrão; veja CONVENCOES).
+    """
+    # Vencimento no dia do contrato (ou no próximo dia útil) e dias úteis até ele (calendário ANBIMA)
+    dia, base = CONVENCOES[mercadoria]
+    feriados = feriados_anbima()
+    referencia = registros['DataRef'].to_numpy(dtype='datetime64[D]')
+    vencimento = registros['Vencimento'].to_numpy(dtype='datetime64[D]') + np.timedelta64(dia - 1, 'D')
+    vencimento = np.busday_offset(vencimento, 0, roll='forward', holidays=feriados)
+    du = np.busday_count(referencia, vencimento, holidays=feriados)
+    pu = registros['PUAtual'].to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if base == 252:
+            taxa = (100000 / pu) ** (252 / du) - 1
+        else:
+            taxa = (100000 / pu - 1) * base / (vencimento - referencia).astype(np.int64)
+    return vencimento, du, taxa
+
+def curvas_mercadoria(registros, mercadoria='DI1'):
+    """
+    Vértices (data, dias úteis, taxa) ordenados por data e prazo, com as
+    convenções da `mercadoria` (DI1 por padrão; veja CONVENCOES).
+
+    Mantém o primeiro contrato de cada prazo repetido e só as datas com pelo
+    menos dois vértices.
+    """
+    _, du, taxa = taxas_contratos(registros, mercadoria)
+    positivos = du > 0
+    datas, codigo = np.unique(registros['DataRef'].to_numpy()[positivos], return_inverse=True)
+    du, taxa = du[positivos], taxa[positivos]
+
+    # Ordenação estável: entre prazos repetidos fica o primeiro da base
+    ordem = np.lexsort((du, codigo))
+    codigo, du, taxa = codigo[ordem], du[ordem], taxa[ordem]
+    primeiro = np.ones(len(du), dtype=bool)
+    primeiro[1:] = (codigo[1:] != codigo[:-1]) | (du[1:] != du[:-1])
+    codigo, du, taxa = codigo[primeiro], du[primeiro], taxa[primeiro]
+
+    vertices = np.bincount(codigo, minlength=len(datas))
+    validas = vertices[codigo] > 1
+    usadas = vertices > 1
+    novo_codigo = np.cumsum(usadas) - 1
+    return datas[usadas], novo_codigo[codigo[validas]], du[validas], taxa[validas]
+
+def interpolar_horizontes(codigo, du, taxa, n_datas, horizontes):
+    """
+    Taxas flat-forward (valor do último vértice com prazo <= horizonte) de
+    todas as datas em todos os horizontes, em uma única busca ordenada.
+
+    Os vértices são ordenados pela chave composta data * escala + prazo; cada
+    par (data, horizonte) vira a mesma chave e `searchsorted` encontra o
+    vértice anterior. Abaixo do primeiro vértice da data o resultado é NaN e
+    depois do último vale a taxa do último, como em
+    interp1d(kind='previous', fill_value='extrapolate').
+    """
+    horizontes = np.asarray(horizontes, dtype=np.int64)
+    escala = int(max(du.max(initial=0), horizontes.max())) + 1
+    chaves = codigo.astype(np.int64) * escala + du
+
+    consultas = np.arange(n_datas, dtype=np.int64)[:, None] * escala + horizontes[None, :]
+    posicao = np.searchsorted(chaves, consultas, side='right') - 1
+    encontrado = posicao >= 0
+    posicao = np.maximum(posicao, 0)
+    mesma_data = encontrado & (codigo[posicao] == np.arange(n_datas)[:, None])
+    return np.where(mesma_data, taxa[posicao], np.nan)
+
+def _superficie(valores, datas, horizontes):
+    """DataFrame no formato da superfície: índice 'Data', maior horizonte primeiro"""
+    indice = pd.DatetimeIndex(datas.astype('datetime64[ns]'), name='Data')
+    df = pd.DataFrame(valores.astype(np.float32), index=indice, columns=[f'{h}_dias' for h in horizontes])
+    return df[df.columns[::-1]]
+
+def processa_dados_brasil(horizontes=HORIZONTES_PADRAO, passo_denso=PASSO_GRADE_DENSA, linhas_por_bloco=None,
+                          processos=1):
+    """
+    Processa dados do Brasil para criar superfície de juros.
+
+    Gera a grade padrão (Dados/juros_brasil_processado.parquet) e a grade
+    densa a cada `passo_denso` dias úteis (Dados/juros_brasil_denso.parquet),
+    avaliadas juntas em uma única passada vetorizada. Ambas em float32 com
+    compressão zstd.
+
+    Com `linhas_por_bloco` (ou base acima de LIMITE_REGISTROS_MEMORIA
+    registros) o processamento é feito em blocos e retorna None; veja
+    `processa_brasil_em_blocos()`, inclusive com `processos`. Com `processos`
+    > 1 (ou None, um por núcleo) e a base dentro do limite, intervalos de anos
+    da base são processados em paralelo; veja `processa_brasil_paralelo()`.
+    """
     print("Processando dados do Brasil...")
     
-    # Verifica se já temos dados processados
-    rates_path = 'Dados/rates_all_horizons_df.parquet'
-    
-    if os.path.exists(rates_path):
-        print("Dados já processados encontrados, carregando...")
-        rates_all_horizons_df = pd.read_parquet(rates_path)
-        print(f"Carregados {len(rates_all_horizons_df)} registros processados")
-        
-        # Prepara para visualização
-        rates_all_horizons_df2 = rates_all_horizons_df.copy()
-        rates_all_horizons_df2["Data"] = pd.to_datetime(rates_all_horizons_df2["refdate"])
-        rates_all_horizons_df2.set_index('Data', inplace=True)
-        rates_all_horizons_df2 = rates_all_horizons_df2[rates_all_horizons_df2.columns[::-1]]  # Inverte ordem
-        rates_all_horizons_df2 = rates_all_horizons_df2.iloc[:,:-1]  # Remove coluna refdate
-        
-        # Salva dados processados
-        brasil_path = 'Dados/juros_brasil_processado.parquet'
-        os.makedirs(os.path.dirname(brasil_path), exist_ok=True)
-        rates_all_horizons_df2.to_parquet(brasil_path)
-        
-        print(f"Dados do Brasil processados e salvos: {brasil_path}")
-        print(f"Shape final: {rates_all_horizons_df2.shape}")
-        
-        return rates_all_horizons_df2
-    
-    # Carrega dados brutos se não houver processados
     base_path = 'Dados/Base_Bruta.parquet'
     
     if not os.path.exists(base_path):
         print(f"Arquivo não encontrado: {base_path}")
         return None
     
-    di1 = pd.read_parquet(base_path)
-    print(f"Carregados {len(di1)} registros do Brasil")
-    
-    # Calendário de mercado
-    MARKET_CALENDAR = Calendar.load('ANBIMA')
-    
-    # Arruma os dados
-    di1['Maturity'] = di1['Vencimento'].map(MARKET_CALENDAR.following)
-    di1['DU'] = di1.apply(lambda x: MARKET_CALENDAR.bizdays(x['DataRef'], x['Maturity']), axis=1)
-    di1['Rate'] = (100000 / di1['PUAtual'])**(252 / di1['DU']) - 1
-    di1_curve = di1[['DataRef', 'Maturity', 'DU', 'Rate', 'PUAtual']]
-    di1_curve.columns = ['refdate', 'forward_date', 'biz_days', 'r_252', 'PU']
-    
-    print("Dados processados, iniciando interpolação...")
+    # Acima do limite a base vai em blocos mesmo com processos: cada intervalo de anos seria lido inteiro
+    if linhas_por_bloco is None and pq.read_metadata(base_path).num_rows > LIMITE_REGISTROS_MEMORIA:
+        linhas_por_bloco = LINHAS_POR_BLOCO
+    if (processos or os.cpu_count() or 1) > 1 and not linhas_por_bloco:
+        return processa_brasil_paralelo(base_path, horizontes=horizontes, passo_denso=passo_denso,
+                                        processos=processos)
+    if linhas_por_bloco:
+        processa_brasil_em_blocos(base_path, horizontes=horizontes, passo_denso=passo_denso,
+                                  linhas_por_bloco=linhas_por_bloco)
+        return None
     
-    # Interpolação para múltiplas curvas
-    unique_dates = di1_curve['refdate'].unique()
-    curves = []
+    di1 = ler_base(base_path, colunas=['DataRef', 'Vencimento', 'PUAtual'])
+    print(f"Carregados {len(di1)} registros do Brasil")
     
-    for date in unique_dates:
-        # Filtra dados para a data específica
-        df_curve = di1_curve[(di1_curve['refdate'] == date) & (di1_curve['biz_days'] > 0)]
-        
-        # Remove duplicatas
-        df_curve = df_curve.drop_duplicates(subset='biz_days')
-        
-        if len(df_curve) > 1:  # Precisa de pelo menos 2 pontos para interpolar
-            # Cria curva com interpolação
-            curve = flat_forward_interpolation(df_curve['biz_days'], df_curve['r_252'])
-            curves.append((date, curve))
-    
-    print(f"Criadas {len(curves)} curvas interpoladas")
-    
-    # Define horizontes para interpolação
-    horizons = [
-        21, 63, 126,
-        252, 504, 756, 1008, 1260, 1512, 1764, 2016, 2268, 2520,
-        2772, 3024, 3276, 3528, 3780, 4032, 4284, 4536, 4788, 5040,
-        5292, 5544, 5796, 6048, 6300, 6552, 6804, 7068, 7308, 7560,
-        7812, 8064, 8316, 8558
-    ]
-    
-    # Calcula taxas para diferentes horizontes
-    rates_all_horizons = []
-    
-    for date, curve in curves:
-        rates_for_date = {'refdate': date}
-        
-        for horizon in horizons:
-            try:
-                rates_for_date[f'{horizon}_dias'] = float(curve(horizon))
-            except:
-                rates_for_date[f'{horizon}_dias'] = np.nan
-        
-        rates_all_horizons.append(rates_for_date)
+    datas, codigo, du, taxa = curvas_mercadoria(di1)
+    print(f"Criadas {len(datas)} curvas, iniciando interpolação...")
     
-    # Converte para DataFrame
-    rates_all_horizons_df = pd.DataFrame(rates_all_horizons)
+    # Uma única avaliação na união das grades padrão e densa
+    horizontes = sorted(horizontes)
+    densos = grade_densa(du.max(initial=0), passo_denso)
+    uniao = np.union1d(horizontes, densos)
+    valores = interpolar_horizontes(codigo, du, taxa, len(datas), uniao)
+    padrao = valores[:, np.searchsorted(uniao, horizontes)]
     
-    # Remove linhas com muitos NaN
-    rates_all_horizons_df = rates_all_horizons_df.dropna(thresh=len(horizons)*0.5)
+    # Remove linhas com muitos NaN (pelo menos metade dos horizontes, contando a data)
+    manter = np.isfinite(padrao).sum(axis=1) + 1 >= len(horizontes) * 0.5
     
     # Remove outliers na coluna de maior maturidade
-    if not rates_all_horizons_df.empty and '8558_dias' in rates_all_horizons_df.columns:
-        # Remove apenas se não for NaN
-        valid_values = rates_all_horizons_df['8558_dias'].dropna()
-        if not valid_values.empty:
-            idx_min = valid_values.idxmin()
-            rates_all_horizons_df = rates_all_horizons_df.drop(idx_min)
-    
-    rates_all_horizons_df.reset_index(drop=True, inplace=True)
-    
-    # Prepara para visualização
-    rates_all_horizons_df2 = rates_all_horizons_df.copy()
-    rates_all_horizons_df2["Data"] = pd.to_datetime(rates_all_horizons_df2["refdate"])
-    rates_all_horizons_df2.set_index('Data', inplace=True)
-    rates_all_horizons_df2 = rates_all_horizons_df2[rates_all_horizons_df2.columns[::-1]]  # Inverte ordem
-    rates_all_horizons_df2 = rates_all_horizons_df2.iloc[:,:-1]  # Remove coluna refdate
+    maior = np.where(manter & np.isfinite(padrao[:, -1]), padrao[:, -1], np.inf)
+    if np.isfinite(maior).any():
+        manter[np.argmin(maior)] = False
+    
+    df_padrao = _superficie(padrao[manter], datas[manter], horizontes)
+    df_denso = _superficie(valores[manter][:, np.searchsorted(uniao, densos)], datas[manter], densos)
     
     # Salva dados processados
     brasil_path = 'Dados/juros_brasil_processado.parquet'
+    denso_path = 'Dados/juros_brasil_denso.parquet'
     os.makedirs(os.path.dirname(brasil_path), exist_ok=True)
-    rates_all_horizons_df2.to_parquet(brasil_path)
+    escrever_parquet(df_padrao, brasil_path)
+    escrever_parquet(df_denso, denso_path)
     
     print(f"Dados do Brasil processados e salvos: {brasil_path}")
-    print(f"Shape final: {rates_all_horizons_df2.shape}")
+    print(f"Shape final: {df_padrao.shape} (grade densa: {df_denso.shape}, {denso_path})")
     
-    return rates_all_horizons_df2
+    return df_padrao
+
+def _sem_data(caminho, data, linhas_por_lote=LINHAS_POR_GRUPO):
+    """Lotes (tabelas Arrow) de um arquivo de superfície sem as linhas de `data`"""
+    for lote in pq.ParquetFile(caminho).iter_batches(batch_size=linhas_por_lote):
+        tabela = pa.Table.from_batches([lote])
+        if data is not None:
+            tabela = tabela.filter(tabela.column('Data').to_numpy() != data)
+        yield tabela
+
+def processa_brasil_em_blocos(base_path='Dados/Base_Bruta.parquet', horizontes=HORIZONTES_PADRAO,
+                              passo_denso=PASSO_GRADE_DENSA, linhas_por_bloco=LINHAS_POR_BLOCO,
+                              brasil_path='Dados/juros_brasil_processado.parquet',
+                              denso_path='Dados/juros_brasil_denso.parquet'):
+    """
+    Mesmo resultado de `processa_dados_brasil()` com memória limitada pelo
+    tamanho do bloco, para bases maiores que a memória disponível.
+
+    A base é percorrida em blocos de datas completas (`ler_base_em_blocos`)
+    três vezes: a primeira acha o vértice mais longo (que define a grade
+    densa); a segunda interpola cada bloco e grava as linhas em arquivos
+    temporários, guardando a candidata a outlier da maior maturidade; a
+    terceira regrava os temporários sem ela, no layout de leitura.
+    Retorna (linhas, colunas padrão, colunas densas).
+    """
+    colunas = ['DataRef', 'Vencimento', 'PUAtual']
+    horizontes = sorted(horizontes)
+
+    du_maximo = 0
+    for bloco in ler_base_em_blocos(base_path, colunas, linhas_por_bloco):
+        du_maximo = max(du_maximo, int(curvas_mercadoria(bloco)[2].max(initial=0)))
+    densos = grade_densa(du_maximo, passo_denso)
+    uniao = np.union1d(horizontes, densos)
+    colunas_padrao, colunas_densas = np.searchsorted(uniao, horizontes), np.searchsorted(uniao, densos)
+
+    temporarios = {brasil_path: brasil_path + '.blocos', denso_path: denso_path + '.blocos'}
+    escritores, pendentes = {}, {brasil_path: [], denso_path: []}
+    linhas, blocos = 0, 0
+
+    def gravar_pendentes(caminho, minimo=1):
+        # Blocos pequenos juntos: o escritor guarda metadados por grupo de linhas até fechar
+        if sum(t.num_rows for t in pendentes[caminho]) < minimo:
+            return
+        tabela = pa.concat_tables(pendentes[caminho])
+        if caminho not in escritores:
+            os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+            escritores[caminho] = pq.ParquetWriter(temporarios[caminho], tabela.schema, write_statistics=False)
+        escritores[caminho].write_table(tabela)
+        pendentes[caminho] = []
+
+    outlier, menor = None, np.inf
+    try:
+        for bloco in ler_base_em_blocos(base_path, colunas, linhas_por_bloco):
+            datas, codigo, du, taxa = curvas_mercadoria(bloco)
+            if not len(datas):
+                continue
+            valores = interpolar_horizontes(codigo, du, taxa, len(datas), uniao)
+            padrao = valores[:, colunas_padrao]
+            manter = np.isfinite(padrao).sum(axis=1) + 1 >= len(horizontes) * 0.5
+
+            # Candidata a outlier: menor taxa da maior maturidade entre todos os blocos
+            maior = np.where(manter & np.isfinite(padrao[:, -1]), padrao[:, -1], np.inf)
+            i = np.argmin(maior)
+            if maior[i] < menor:
+                outlier, menor = datas[i], maior[i]
+
+            for caminho, df in [
+                (brasil_path, _superficie(padrao[manter], datas[manter], horizontes)),
+                (denso_path, _superficie(valores[manter][:, colunas_densas], datas[manter], densos)),
+            ]:
+                pendentes[caminho].append(pa.Table.from_pandas(df))
+                gravar_pendentes(caminho, LINHAS_POR_GRUPO)
+            linhas += int(manter.sum())
+            blocos += 1
+        for caminho in pendentes:
+            if pendentes[caminho]:
+                gravar_pendentes(caminho)
+    finally:
+        for escritor in escritores.values():
+            escritor.close()
+
+    if not escritores:
+        print("Nenhuma curva válida na base")
+        return None
+
+    if outlier is not None:
+        linhas -= 1
+    for caminho, temporario in temporarios.items():
+        escrever_parquet_lotes(_sem_data(temporario, outlier), caminho, linhas)
+        os.remove(temporario)
+
+    print(f"Dados do Brasil processados em {blocos} blocos de até {linhas_por_bloco} registros: {brasil_path}")
+    print(f"Shape final: ({linhas}, {len(horizontes)}) (grade densa: ({linhas}, {len(densos)}), {denso_path})")
+    return linhas, len(horizontes), len(densos)
+
+def _grade_ipc(valores, datas, horizontes):
+    """
+    Grade (datas x horizontes) em um buffer Arrow (formato IPC), maior
+    horizonte primeiro e a coluna 'Data' no fim: copiada entre processos
+    como bytes, sem pickle de DataFrames.
+    """
+    colunas = np.asfortranarray(valores[:, ::-1], dtype=np.float32)
+    tabela = pa.table([pa.array(colunas[:, j]) for j in range(colunas.shape[1])] + [datas.astype('datetime64[ns]')],
+                      names=[f'{h}_dias' for h in horizontes[::-1]] + ['Data'])
+    saida = pa.BufferOutputStream()
+    with pa.ipc.new_stream(saida, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    return saida.getvalue()
+
+def processa_anos_brasil(tarefa):
+    """
+    Superfícies de um intervalo de anos da base: (maior vértice, menor taxa da
+    maior maturidade e sua data, grade padrão e grade densa em buffers Arrow).
+
+    A grade densa vai só até o vértice mais longo do intervalo; `tarefa` é
+    (caminho da base, primeiro ano, último ano, horizontes, passo da grade densa).
+    """
+    base_path, primeiro, ultimo, horizontes, passo_denso = tarefa
+    di1 = ler_base(base_path, colunas=['DataRef', 'Vencimento', 'PUAtual'],
+                   inicio=f'{primeiro}-01-01', fim=f'{ultimo}-12-31')
+    datas, codigo, du, taxa = curvas_mercadoria(di1)
+
+    horizontes = sorted(horizontes)
+    du_maximo = int(du.max(initial=0))
+    densos = grade_densa(du_maximo, passo_denso)
+    uniao = np.union1d(horizontes, densos)
+    valores = interpolar_horizontes(codigo, du, taxa, len(datas), uniao)
+    padrao = valores[:, np.searchsorted(uniao, horizontes)]
+    manter = np.isfinite(padrao).sum(axis=1) + 1 >= len(horizontes) * 0.5
+
+    maior = np.where(manter & np.isfinite(padrao[:, -1]), padrao[:, -1], np.inf)
+    i = np.argmin(maior) if len(maior) else None
+    candidata = (maior[i], datas[i]) if i is not None else (np.inf, None)
+
+    return (du_maximo, candidata, _grade_ipc(padrao[manter], datas[manter], horizontes),
+            _grade_ipc(valores[manter][:, np.searchsorted(uniao, densos)], datas[manter], densos))
+
+def tarefas_brasil(base_path, partes, horizontes=HORIZONTES_PADRAO, passo_denso=PASSO_GRADE_DENSA):
+    """Tarefas de `processa_anos_brasil()`: anos da base em até `partes` intervalos contíguos"""
+    intervalos = [a for a in np.array_split(anos(base_path), partes) if len(a)]
+    return [(base_path, int(a[0]), int(a[-1]), horizontes, passo_denso) for a in intervalos]
+
+def processa_brasil_paralelo(base_path='Dados/Base_Bruta.parquet', horizontes=HORIZONTES_PADRAO,
+                             passo_denso=PASSO_GRADE_DENSA, processos=None,
+                             brasil_path='Dados/juros_brasil_processado.parquet',
+                             denso_path='Dados/juros_brasil_denso.parquet'):
+    """
+    Mesmo resultado de `processa_dados_brasil()` com a base dividida em
+    intervalos de anos inteiros (dois por processo) distribuídos em
+    processos (`processos=None`: um por núcleo).
+
+    Cada processo lê do arquivo só o seu intervalo (o predicado de data pula
+    os outros grupos de linhas) e devolve as grades em buffers Arrow. A junção
+    segue a ordem dos intervalos, então o resultado não depende do número de
+    processos: a outlier é a menor taxa da maior maturidade entre os
+    intervalos (a primeira, no empate) e a grade densa de cada intervalo é
+    estendida até o vértice mais longo da base repetindo a última coluna, que
+    já é a taxa extrapolada do último vértice de cada data.
+    """
+    processos = processos or os.cpu_count() or 1
+    feriados_anbima()  # carregado uma vez, antes de criar os processos
+    tarefas = tarefas_brasil(base_path, 2 * processos, horizontes, passo_denso)
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        resultados = list(executor.map(processa_anos_brasil, tarefas))
+
+    outlier, menor = None, np.inf
+    for _, (taxa, data), _, _ in resultados:
+        if taxa < menor:
+            outlier, menor = data, taxa
+
+    densos = grade_densa(max((r[0] for r in resultados), default=0), passo_denso)
+    colunas_densas = [f'{h}_dias' for h in densos[::-1]] + ['Data']
+    partes_padrao, partes_denso = [], []
+    for _, _, buffer_padrao, buffer_denso in resultados:
+        padrao = pa.ipc.open_stream(buffer_padrao).read_all()
+        denso = pa.ipc.open_stream(buffer_denso).read_all()
+        if not padrao.num_rows:
+            continue
+        # Horizontes além do vértice mais longo do intervalo: mesma coluna do maior horizonte dele
+        do_intervalo = set(denso.column_names)
+        denso = pa.table([denso.column(c) if c in do_intervalo else denso.column(0) for c in colunas_densas],
+                         names=colunas_densas)
+        partes_padrao.append(padrao)
+        partes_denso.append(denso)
+    if not partes_padrao:
+        print("Nenhuma curva válida na base")
+        return None
+
+    df_padrao = pa.concat_tables(partes_padrao).to_pandas().set_index('Data')
+    df_denso = pa.concat_tables(partes_denso).to_pandas().set_index('Data')
+    if outlier is not None:
+        df_padrao = df_padrao[df_padrao.index != outlier]
+        df_denso = df_denso[df_denso.index != outlier]
+
+    os.makedirs(os.path.dirname(brasil_path) or '.', exist_ok=True)
+    escrever_parquet(df_padrao, brasil_path)
+    escrever_parquet(df_denso, denso_path)
+
+    print(f"Dados do Brasil processados em {len(tarefas)} intervalos de anos ({processos} processos): {brasil_path}")
+    print(f"Shape final: {df_padrao.shape} (grade densa: {df_denso.shape}, {denso_path})")
+    return df_padrao
+
+def fatores_desconto_horizontes(codigo, du, taxa, n_datas, horizontes):
+    """
+    Log dos fatores de desconto de todas as datas em todos os horizontes.
+
+    Nos vértices o fator é PU / 100.000 = (1 + taxa)^(-du/252); entre eles o
+    log do fator é interpolado linearmente no prazo (flat forward), partindo
+    de FD = 1 na data de referência. Depois do último vértice da data não há
+    fator de desconto e o resultado é NaN. Mesma busca ordenada por chave
+    composta de `interpolar_horizontes()`.
+    """
+    horizontes = np.asarray(horizontes, dtype=np.int64)
+    if not len(du):
+        return np.full((n_datas, len(horizontes)), np.nan)
+    log_fatores = -du / 252 * np.log1p(taxa)
+    escala = int(max(du.max(), horizontes.max())) + 1
+    chaves = codigo.astype(np.int64) * escala + du
+
+    linhas = np.arange(n_datas)[:, None]
+    anterior = np.searchsorted(chaves, linhas * escala + horizontes[None, :], side='right') - 1
+    seguinte = np.minimum(anterior + 1, len(du) - 1)
+    anterior = np.maximum(anterior, 0)
+    tem_anterior = (codigo[anterior] == linhas) & (du[anterior] <= horizontes[None, :])
+    tem_seguinte = (codigo[seguinte] == linhas) & (du[seguinte] > horizontes[None, :])
+
+    du_anterior = np.where(tem_anterior, du[anterior], 0)
+    log_anterior = np.where(tem_anterior, log_fatores[anterior], 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        peso = (horizontes[None, :] - du_anterior) / (du[seguinte] - du_anterior)
+        interpolado = log_anterior + peso * (log_fatores[seguinte] - log_anterior)
+    exato = tem_anterior & (du_anterior == horizontes[None, :])
+    return np.where(exato, log_anterior, np.where(tem_seguinte, interpolado, np.nan))
+
+def calcular_forwards(log_fatores, horizontes):
+    """
+    Taxas a termo entre horizontes consecutivos (ordem crescente) a partir do
+    log dos fatores de desconto: (FD_{i-1} / FD_i)^(252 / (h_i - h_{i-1})) - 1,
+    com FD = 1 antes do primeiro horizonte (a primeira forward é a taxa spot).
+    Todas as datas de uma vez (matriz datas x horizontes).
+    """
+    horizontes = np.asarray(horizontes)
+    anteriores = np.hstack([np.zeros((len(log_fatores), 1)), log_fatores[:, :-1]])
+    return np.expm1((anteriores - log_fatores) * 252 / np.diff(horizontes, prepend=0))
+
+def processa_forwards_brasil(base_path='Dados/Base_Bruta.parquet', horizontes=HORIZONTES_PADRAO,
+                             linhas_por_bloco=LINHAS_POR_BLOCO,
+                             brasil_path='Dados/juros_brasil_processado.parquet',
+                             forward_path='Dados/juros_brasil_forward.parquet'):
+    """
+    Gera a superfície de forwards DI1 na grade padrão a partir dos fatores de
+    desconto nos vértices (veja `fatores_desconto_horizontes()`), e não da
+    superfície spot, que repete a taxa do último vértice até cada horizonte.
+
+    A grade vai só até o vértice mais longo da base: além dele nenhuma data
+    tem fator de desconto. A base é lida em blocos de datas completas (memória
+    limitada ao bloco), uma vez para achar esse vértice e outra para as
+    forwards, e só as datas da superfície spot são gravadas, em float32.
+    Retorna o número de datas gravadas.
+    """
+    print("Calculando superfície de forwards do Brasil...")
+
+    for caminho in (base_path, brasil_path):
+        if not os.path.exists(caminho):
+            print(f"Arquivo não encontrado: {caminho}")
+            return None
+
+    # Mesmas datas da superfície spot (filtro de vértices e outlier já aplicados)
+    datas_spot = pq.read_table(brasil_path, columns=['Data']).column('Data').to_numpy()
+    colunas = ['DataRef', 'Vencimento', 'PUAtual']
+    du_maximo = 0
+    for bloco in ler_base_em_blocos(base_path, colunas, linhas_por_bloco):
+        du_maximo = max(du_maximo, int(curvas_mercadoria(bloco)[2].max(initial=0)))
+    horizontes = [h for h in sorted(horizontes) if h <= du_maximo]
+
+    def lotes():
+        for bloco in ler_base_em_blocos(base_path, colunas, linhas_por_bloco):
+            datas, codigo, du, taxa = curvas_mercadoria(bloco)
+            manter = np.isin(datas, datas_spot)
+            if manter.any():
+                log_fatores = fatores_desconto_horizontes(codigo, du, taxa, len(datas), horizontes)
+                forwards = calcular_forwards(log_fatores[manter], horizontes)
+                yield pa.Table.from_pandas(_superficie(forwards, datas[manter], horizontes))
+
+    escrever_parquet_lotes(lotes(), forward_path, len(datas_spot))
+    print(f"Forwards do Brasil salvos: {forward_path}")
+    print(f"Shape final: ({len(datas_spot)}, {len(horizontes)})")
+    return len(datas_spot)
+
+def processa_mercadoria(mercadoria, horizontes=HORIZONTES_PADRAO):
+    """
+    Superfície de uma mercadoria além do DI1 (DAP: juro real; DDI: cupom
+    cambial) na grade padrão de horizontes, a partir da sua base bruta, com a
+    mesma interpolação e o mesmo filtro de datas do DI1.
+    """
+    print(f"Processando superfície {mercadoria}...")
+
+    base_path = caminho_mercadoria(mercadoria)
+    if not os.path.exists(base_path):
+        print(f"Arquivo não encontrado: {base_path}")
+        return None
+
+    registros = ler_base(base_path, colunas=['DataRef', 'Vencimento', 'PUAtual'])
+    datas, codigo, du, taxa = curvas_mercadoria(registros, mercadoria)
+    horizontes = sorted(horizontes)
+    padrao = interpolar_horizontes(codigo, du, taxa, len(datas), horizontes)
+    manter = np.isfinite(padrao).sum(axis=1) + 1 >= len(horizontes) * 0.5
+    df = _superficie(padrao[manter], datas[manter], horizontes)
+
+    caminho = CAMINHOS_SUPERFICIE[mercadoria]
+    escrever_parquet(df, caminho)
+    print(f"Superfície {mercadoria} salva: {caminho}")
+    print(f"Shape final: {df.shape}")
+    return df
+
+def calcular_inflacao_implicita(nominal, real):
+    """
+    Inflação implícita (breakeven) (1 + nominal) / (1 + real) - 1 nas datas e
+    horizontes comuns às duas superfícies, de uma vez (matriz datas x horizontes).
+    """
+    datas = nominal.index.intersection(real.index)
+    colunas = [c for c in nominal.columns if c in real.columns]
+    taxas_nominais = nominal.loc[datas, colunas].to_numpy(dtype=np.float64)
+    taxas_reais = real.loc[datas, colunas].to_numpy(dtype=np.float64)
+    inflacao = (1 + taxas_nominais) / (1 + taxas_reais) - 1
+    return pd.DataFrame(inflacao.astype(np.float32), index=datas, columns=colunas)
+
+def processa_inflacao_implicita(df_nominal=None, df_real=None):
+    """Gera a superfície de inflação implícita a partir das superfícies DI1 e DAP"""
+    print("Calculando inflação implícita (DI1 x DAP)...")
+
+    superficies = []
+    for df, mercadoria in [(df_nominal, 'DI1'), (df_real, 'DAP')]:
+        if df is None:
+            caminho = CAMINHOS_SUPERFICIE[mercadoria]
+            if not os.path.exists(caminho):
+                print(f"Arquivo não encontrado: {caminho}")
+                return None
+            df = pd.read_parquet(caminho)
+        superficies.append(df)
+
+    df_inflacao = calcular_inflacao_implicita(*superficies)
+    escrever_parquet(df_inflacao, CAMINHO_INFLACAO_IMPLICITA)
+    print(f"Inflação implícita salva: {CAMINHO_INFLACAO_IMPLICITA}")
+    print(f"Shape final: {df_inflacao.shape}")
+    return df_inflacao
 
 def processa_dados_eua():
     """Processa dados dos EUA para criar superfície de juros"""
@@ -174,7 +592,7 @@ def processa_dados_eua():
     # Salva dados processados
     eua_processado_path = 'Dados/juros_eua_processado.parquet'
     os.makedirs(os.path.dirname(eua_processado_path), exist_ok=True)
-    df_us.to_parquet(eua_processado_path)
+    escrever_parquet(df_us, eua_processado_path)
     
     print(f"Dados dos EUA processados e salvos: {eua_processado_path}")
     print(f"Shape final: {df_us.shape}")
@@ -254,6 +672,110 @@ def criar_datasets_comparacao():
     
     return comparacao_br, comparacao_us
 
+def _para_json(valor):
+    """Converte NaN em None para gerar JSON válido"""
+    return None if pd.isna(valor) else float(valor)
+
+def _spread(df, curto, longo):
+    """Spread longo - curto na última data e sua variação em relação à anterior"""
+    serie = (df[longo] - df[curto]).dropna()
+    if serie.empty:
+        return None
+    variacao = serie.iloc[-1] - serie.iloc[-2] if len(serie) > 1 else np.nan
+    return {'valor': _para_json(serie.iloc[-1]), 'variacao': _para_json(variacao)}
+
+def criar_snapshot_recente(n_curvas=5):
+    """
+    Gera Dados/snapshot_recente.json com as últimas curvas de cada mercado,
+    spreads principais e a versão dos dados de origem.
+
+    O snapshot permite ao app renderizar a página inicial e o dashboard sem
+    carregar a base completa. A versão é a mesma que o manifesto registra em
+    seguida (o snapshot fica fora dela): o app só usa o snapshot quando ela
+    confere com a versão ativa dos dados.
+    """
+    print("Criando snapshot das curvas mais recentes...")
+
+    snapshot_path = 'Dados/snapshot_recente.json'
+    base_path = 'Dados/Base_Bruta.parquet'
+    brasil_path = 'Dados/juros_brasil_processado.parquet'
+    eua_path = 'Dados/juros_eua_processado.parquet'
+
+    snapshot = {
+        'versao_dados': versao_dados(),
+        'gerado_em': datetime.datetime.now().isoformat(timespec='seconds'),
+        'brasil': None,
+        'eua': None,
+    }
+
+    # Brasil: curvas DI1 (vencimento x taxa) das últimas datas da base bruta
+    if os.path.exists(base_path):
+        datas = np.sort(ler_base(base_path, colunas=['DataRef'])['DataRef'].unique())
+
+        if len(datas) > 0:
+            ultimo_ano = pd.Timestamp(datas[-1]).year
+            inicio_ultimo_ano = datas[pd.DatetimeIndex(datas).year == ultimo_ano][0]
+            datas_snapshot = sorted(set(datas[-n_curvas:]) | {inicio_ultimo_ano})
+
+            # Só os grupos de linhas a partir da data mais antiga do snapshot
+            di1 = ler_base(base_path, colunas=['DataRef', 'Vencimento', 'PUAtual'], inicio=datas_snapshot[0])
+            recente = di1[di1['DataRef'].isin(datas_snapshot)]
+            vencimento, _, taxa = taxas_contratos(recente)
+            recente = recente.assign(Maturity=vencimento, Rate=taxa).sort_values(['DataRef', 'Maturity'])
+
+            curvas = {}
+            for data, curva in recente.groupby('DataRef'):
+                curvas[pd.Timestamp(data).strftime('%Y-%m-%d')] = {
+                    'vencimento': pd.to_datetime(curva['Maturity']).dt.strftime('%Y-%m-%d').tolist(),
+                    'taxa': [_para_json(v) for v in curva['Rate']],
+                }
+
+            spreads = {}
+            if os.path.exists(brasil_path):
+                df_br = pd.read_parquet(brasil_path)
+                for curto, longo in [('252_dias', '2520_dias'), ('21_dias', '252_dias')]:
+                    if curto in df_br.columns and longo in df_br.columns:
+                        spreads[f"{curto.split('_')[0]}x{longo.split('_')[0]}"] = _spread(df_br, curto, longo)
+
+            snapshot['brasil'] = {
+                'primeira_data': pd.Timestamp(datas[0]).strftime('%Y-%m-%d'),
+                'ultima_data': pd.Timestamp(datas[-1]).strftime('%Y-%m-%d'),
+                'data_inicio_ultimo_ano': pd.Timestamp(inicio_ultimo_ano).strftime('%Y-%m-%d'),
+                'curvas': curvas,
+                'spreads': spreads,
+            }
+
+    # EUA: últimas linhas da tabela processada
+    if os.path.exists(eua_path):
+        df_us = pd.read_parquet(eua_path).sort_index()
+
+        if not df_us.empty:
+            ultimo_ano = df_us.index[-1].year
+            inicio_ultimo_ano = df_us.index[df_us.index.year == ultimo_ano][0]
+            datas_snapshot = sorted(set(df_us.index[-n_curvas:]) | {inicio_ultimo_ano})
+
+            spreads = {}
+            for curto, longo in [('2Y', '10Y'), ('3M', '10Y')]:
+                if curto in df_us.columns and longo in df_us.columns:
+                    spreads[f"{curto}x{longo}"] = _spread(df_us, curto, longo)
+
+            snapshot['eua'] = {
+                'primeira_data': df_us.index[0].strftime('%Y-%m-%d'),
+                'ultima_data': df_us.index[-1].strftime('%Y-%m-%d'),
+                'data_inicio_ultimo_ano': inicio_ultimo_ano.strftime('%Y-%m-%d'),
+                'maturidades': df_us.columns.tolist(),
+                'curvas': {
+                    data.strftime('%Y-%m-%d'): [_para_json(v) for v in df_us.loc[data]]
+                    for data in datas_snapshot
+                },
+                'spreads': spreads,
+            }
+
+    escrever_json_atomico(snapshot_path, snapshot)
+    print(f"Snapshot salvo: {snapshot_path}")
+
+    return snapshot
+
 def main():
     """Função principal de processamento"""
     print("=== PROCESSAMENTO DE DADOS - SUPERFÍCIE DE JUROS ===")
@@ -261,12 +783,40 @@ def main():
     # Processa dados do Brasil
     dados_brasil = processa_dados_brasil()
     
+    # Superfície de forwards a partir dos fatores de desconto nos vértices DI1
+    processa_forwards_brasil()
+    
+    # Juro real (DAP), cupom cambial (DDI) e inflação implícita
+    superficies = {mercadoria: processa_mercadoria(mercadoria) for mercadoria in ('DAP', 'DDI')}
+    processa_inflacao_implicita(dados_brasil, superficies['DAP'])
+    
     # Processa dados dos EUA
     dados_eua = processa_dados_eua()
     
+    # Curvas paramétricas NSS (só as datas novas são ajustadas)
+    processa_nss('brasil')
+    processa_nss('eua')
+    
+    # Nível, inclinação e curvatura das variações diárias (covariância incremental)
+    processa_pca('brasil')
+    processa_pca('eua')
+    
+    # Spreads, borboletas e variações diárias materializados
+    processa_metricas('brasil')
+    processa_metricas('eua')
+    
+    # Taxas implícitas por reunião do Copom (requer Dados/calendario_copom.csv)
+    processa_copom()
+    
     # Cria datasets para comparação
     comp_br, comp_us = criar_datasets_comparacao()
     
+    # Snapshot leve para a página inicial do app
+    criar_snapshot_recente()
+    
+    # Registra a nova versão dos dados para o app recarregar sem reiniciar
+    atualizar_manifesto()
+    
     print("=== PROCESSAMENTO FINALIZADO ===")
     
     if dados_brasil is not None:
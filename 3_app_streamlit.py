@@ -7,44 +7,27 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
+from plotly.subplots import make_subplots
 from datetime import datetime, date
 import numpy as np
+import base64
+import io
+import json
 import os
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from bizdays import Calendar
 from streamlit_option_menu import option_menu
 
+from armazenamento import MonitorDados, MonitorIntradiario
+from base_bruta import CODIGOS_MES, ler_base
+from copom_implicito import CAMINHO_COPOM, COLUNAS as COLUNAS_COPOM, carregar_calendario, reunioes_seguintes
+
+# Segundos entre atualizações da curva do pregão nas sessões abertas
+INTERVALO_INTRADIARIO = 5
+
 # Função para determinar altura responsiva dos gráficos
 def get_responsive_height(tipo="normal"):
-    # Detecta o tamanho da tela do usuário via JavaScript
-    is_mobile = """
-    <script>
-        var isMobile = window.matchMedia("(max-width: 768px)").matches;
-        var isSmallMobile = window.matchMedia("(max-width: 480px)").matches;
-        if (isMobile) {
-            document.querySelector("body").classList.add("is-mobile");
-        }
-        if (isSmallMobile) {
-            document.querySelector("body").classList.add("is-small-mobile");
-        }
-        
-        // Armazena tamanho para uso posterior
-        localStorage.setItem("viewportWidth", window.innerWidth);
-        localStorage.setItem("isMobile", isMobile);
-        localStorage.setItem("isSmallMobile", isSmallMobile);
-    </script>
-    <style>
-        .is-mobile {
-            --mobile-mode: true;
-        }
-        .is-small-mobile {
-            --small-mobile-mode: true;
-        }
-    </style>
-    """
-    st.markdown(is_mobile, unsafe_allow_html=True)
-    
     # Valores de altura responsivos baseados no tipo de gráfico
     if tipo == "superficie":
         # Gráficos de superfície 3D (mais altos para visualização adequada)
@@ -72,7 +55,7 @@ st.set_page_config(
 # em algumas versões do Streamlit
 
 # CSS customizado para tema dark e navegação avançada
-st.markdown("""
+CSS_APP = """
 <style>
     @import url("https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap");
     
@@ -326,11 +309,76 @@ st.markdown("""
         }
     }
     </style>
-""", unsafe_allow_html=True)
+"""
+
+# Detecta o tamanho da tela do usuário via JavaScript
+SCRIPT_DISPOSITIVO = """
+    <script>
+        var isMobile = window.matchMedia("(max-width: 768px)").matches;
+        var isSmallMobile = window.matchMedia("(max-width: 480px)").matches;
+        if (isMobile) {
+            document.querySelector("body").classList.add("is-mobile");
+        }
+        if (isSmallMobile) {
+            document.querySelector("body").classList.add("is-small-mobile");
+        }
+        
+        // Armazena tamanho para uso posterior
+        localStorage.setItem("viewportWidth", window.innerWidth);
+        localStorage.setItem("isMobile", isMobile);
+        localStorage.setItem("isSmallMobile", isSmallMobile);
+    </script>
+    <style>
+        .is-mobile {
+            --mobile-mode: true;
+        }
+        .is-small-mobile {
+            --small-mobile-mode: true;
+        }
+    </style>
+    """
+
+# Detecta dispositivo e ajusta zoom em telas pequenas
+SCRIPT_VIEWPORT = """
+    <script>
+        // Detecta dispositivo e salva para uso no app
+        document.addEventListener("DOMContentLoaded", function() {
+            const isMobile = window.innerWidth <= 768;
+            const isSmallMobile = window.innerWidth <= 480;
+            
+            // Armazena para uso pelo Python via sessionState
+            window.parent.postMessage({
+                type: "streamlit:setComponentValue",
+                value: {
+                    isMobile: isMobile,
+                    isSmallMobile: isSmallMobile,
+                    viewportWidth: window.innerWidth
+                }
+            }, "*");
+            
+            // Ajusta zoom para melhor visualização mobile
+            if (isSmallMobile) {
+                document.querySelector(".main").style.zoom = "0.9";
+            }
+        });
+    </script>
+    """
+
+def injetar_estilos():
+    """
+    Injeta CSS e scripts estáticos da página.
+    
+    Só é chamada em execuções completas do script: reruns de fragmentos (troca de
+    datas, seletores dos gráficos) não reenviam esse conteúdo ao navegador.
+    """
+    st.markdown(CSS_APP, unsafe_allow_html=True)
+    st.markdown(SCRIPT_DISPOSITIVO, unsafe_allow_html=True)
+    st.markdown(SCRIPT_VIEWPORT, unsafe_allow_html=True)
+
 
-@st.cache_data
-def carregar_dados():
-    """Carrega dados processados com cache"""
+@st.cache_data(max_entries=2, show_spinner=False)
+def carregar_dados(versao):
+    """Carrega dados processados com cache (a chave é a versão dos arquivos)"""
     dados = {}
     
     # Brasil - carrega dados da Base_Bruta.parquet
@@ -338,7 +386,7 @@ def carregar_dados():
     brasil_path = "Dados/juros_brasil_processado.parquet"
     
     if os.path.exists(brasil_bruto_path):
-        dados["brasil_bruto"] = pd.read_parquet(brasil_bruto_path)
+        dados["brasil_bruto"] = ler_base(brasil_bruto_path, colunas=["DataRef", "Vencimento", "PUAtual"])
     else:
         dados["brasil_bruto"] = None
         
@@ -346,7 +394,20 @@ def carregar_dados():
         dados["brasil"] = pd.read_parquet(brasil_path)
     else:
         dados["brasil"] = None
-        st.warning("⚠️ Dados do Brasil não encontrados. Execute o script de coleta e processamento primeiro.")
+    
+    # Brasil - grade densa de horizontes (calculada no processamento)
+    denso_path = "Dados/juros_brasil_denso.parquet"
+    if os.path.exists(denso_path):
+        dados["brasil_denso"] = pd.read_parquet(denso_path)
+    else:
+        dados["brasil_denso"] = None
+    
+    # Brasil - forwards entre vértices (calculadas no processamento)
+    forward_path = "Dados/juros_brasil_forward.parquet"
+    if os.path.exists(forward_path):
+        dados["brasil_forward"] = pd.read_parquet(forward_path)
+    else:
+        dados["brasil_forward"] = None
     
     # EUA
     eua_path = "Dados/juros_eua_processado.parquet"
@@ -354,25 +415,101 @@ def carregar_dados():
         dados["eua"] = pd.read_parquet(eua_path)
     else:
         dados["eua"] = None
-        st.warning("⚠️ Dados dos EUA não encontrados. Execute o script de coleta e processamento primeiro.")
     
     return dados
 
+def pre_carregar(versao):
+    """Deixa em cache tudo o que as visualizações usam para uma nova versão"""
+    carregar_snapshot(versao)
+    carregar_dados(versao)
+    carregar_curva_brasil(versao)
+
+@st.cache_resource
+def monitor_dados():
+    """Monitor compartilhado entre sessões que pré-carrega novas versões dos dados"""
+    return MonitorDados(pre_carregar=pre_carregar, intervalo=30).iniciar()
+
+def obter_dados():
+    """Retorna os dados da versão ativa, sem reiniciar o app após atualizações"""
+    return carregar_dados(monitor_dados().versao)
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def carregar_snapshot(versao):
+    """
+    Carrega o snapshot das curvas mais recentes gerado pelo processamento.
+    
+    Retorna None se o snapshot não for da versão `versao` (processamento em
+    andamento ou interrompido): o app usa então os dados completos.
+    """
+    snapshot_path = "Dados/snapshot_recente.json"
+    if not os.path.exists(snapshot_path):
+        return None
+    
+    with open(snapshot_path, encoding="utf-8") as f:
+        bruto = json.load(f)
+    
+    if bruto.get("versao_dados") != versao:
+        return None
+    
+    snapshot = {"versao_dados": bruto.get("versao_dados"), "brasil": None, "eua": None}
+    
+    # Brasil: mesmo formato de processar_dados_brasil_historico (DataRef, Maturity, Rate)
+    br = bruto.get("brasil")
+    if br and br["curvas"]:
+        curvas = pd.concat([
+            pd.DataFrame({
+                "DataRef": pd.Timestamp(data),
+                "Maturity": pd.to_datetime(curva["vencimento"]),
+                "Rate": pd.to_numeric(pd.Series(curva["taxa"], dtype="float64"))
+            })
+            for data, curva in br["curvas"].items()
+        ], ignore_index=True)
+        snapshot["brasil"] = {
+            "curvas": curvas,
+            "primeira_data": pd.Timestamp(br["primeira_data"]),
+            "ultima_data": pd.Timestamp(br["ultima_data"]),
+            "data_inicio_ultimo_ano": pd.Timestamp(br["data_inicio_ultimo_ano"]),
+            "spreads": br.get("spreads", {})
+        }
+    
+    # EUA: mesmo formato de juros_eua_processado (maior maturidade primeiro)
+    eua = bruto.get("eua")
+    if eua and eua["curvas"]:
+        curvas = pd.DataFrame.from_dict(eua["curvas"], orient="index", columns=eua["maturidades"]).astype("float64")
+        curvas.index = pd.to_datetime(curvas.index)
+        snapshot["eua"] = {
+            "curvas": curvas.sort_index(),
+            "primeira_data": pd.Timestamp(eua["primeira_data"]),
+            "ultima_data": pd.Timestamp(eua["ultima_data"]),
+            "data_inicio_ultimo_ano": pd.Timestamp(eua["data_inicio_ultimo_ano"]),
+            "spreads": eua.get("spreads", {})
+        }
+    
+    return snapshot
+
+def obter_snapshot():
+    """Retorna o snapshot da versão ativa (None se ainda não foi gerado)"""
+    return carregar_snapshot(monitor_dados().versao)
+
+def datas_epoch_ms(datas):
+    """Converte datas para milissegundos desde 1970 (eixo de datas numérico do Plotly)"""
+    return np.asarray(datas, dtype="datetime64[ms]").astype(np.int64).astype(np.float64)
+
 def plot_superficie_3d(df, titulo, pais):
     """Cria gráfico de superfície 3D"""
     if df is None or df.empty:
         st.error(f"Dados não disponíveis para {pais}")
         return None
     
-    # Prepara os dados
+    # Prepara os dados (float32: enviados ao navegador como array binário)
     if pais == "Brasil":
         # Remove sufixo "_dias" das colunas para melhor visualização
         colunas_display = [col.replace("_dias", "d") for col in df.columns]
-        z_values = df.values * 100  # Converte para percentual
+        z_values = (df.to_numpy(dtype=np.float64) * 100).astype(np.float32)  # Converte para percentual
         colorscale = "RdYlGn_r"
     else:
         colunas_display = df.columns.tolist()
-        z_values = df.values
+        z_values = df.to_numpy(dtype=np.float32)
         colorscale = "RdYlGn_r"
     
     # Cria figura
@@ -382,7 +519,7 @@ def plot_superficie_3d(df, titulo, pais):
     fig.add_trace(
         go.Surface(
             x=colunas_display,
-            y=df.index.strftime("%Y-%m-%d"),
+            y=datas_epoch_ms(df.index),
             z=z_values,
             colorscale=colorscale,
             opacity=0.9,
@@ -391,7 +528,7 @@ def plot_superficie_3d(df, titulo, pais):
                 "y": {"show": True, "color": "lightblue", "size": 0.01},
                 "z": {"show": False}
             },
-            hovertemplate="<b>Data</b>: %{y}<br>" +
+            hovertemplate="<b>Data</b>: %{y|%Y-%m-%d}<br>" +
                          "<b>Maturidade</b>: %{x}<br>" +
                          "<b>Taxa</b>: %{z:.2f}%<extra></extra>",
             showscale=True,
@@ -402,7 +539,7 @@ def plot_superficie_3d(df, titulo, pais):
     # Layout
     fig.update_layout(
         title=dict(
-            text=f"Superfície de Juros - {pais}",
+            text=titulo or f"Superfície de Juros - {pais}",
             y=0.95,
             x=0.5,
             xanchor='center',
@@ -421,6 +558,7 @@ def plot_superficie_3d(df, titulo, pais):
             ),
             yaxis=dict(
                 title="Data",
+                type="date",
                 showgrid=True,
                 gridcolor="#2d3035",
                 backgroundcolor="#0e1117",
@@ -472,6 +610,42 @@ def processar_dados_brasil_historico(di1):
         st.error(f"Erro ao processar dados: {e}")
         return None
 
+@st.cache_data(max_entries=2, show_spinner=False)
+def carregar_curva_brasil(versao):
+    """Curvas DI1 históricas processadas uma única vez por versão dos dados"""
+    dados = carregar_dados(versao)
+    if dados["brasil_bruto"] is None:
+        return None
+    return processar_dados_brasil_historico(dados["brasil_bruto"])
+
+def obter_curva_brasil():
+    """Retorna as curvas DI1 históricas da versão ativa"""
+    return carregar_curva_brasil(monitor_dados().versao)
+
+@st.cache_resource
+def monitor_intradiario():
+    """Monitor compartilhado entre sessões das cotações do pregão (coleta_intradiaria.py)"""
+    return MonitorIntradiario(intervalo=INTERVALO_INTRADIARIO).iniciar()
+
+@st.cache_resource
+def calendario_anbima():
+    return Calendar.load("ANBIMA")
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def carregar_curva_intradiaria(sequencia):
+    """Curva DI1 do pregão (Maturity, Rate, hora) montada uma vez por atualização do monitor"""
+    cotacoes = {v: (hora, taxa) for (m, v), (hora, taxa) in monitor_intradiario().cotacoes.items() if m == "DI1"}
+    if not cotacoes:
+        return None
+    calendario = calendario_anbima()
+    vencimentos = [date(2000 + int(v[1:]), CODIGOS_MES.index(v[0]) + 1, 1) for v in cotacoes]
+    curva = pd.DataFrame({
+        "Maturity": pd.to_datetime([calendario.following(v) for v in vencimentos]),
+        "Rate": [taxa / 100 for _, taxa in cotacoes.values()],
+        "hora": [hora for hora, _ in cotacoes.values()],
+    })
+    return curva.sort_values("Maturity").reset_index(drop=True)
+
 def plot_curva_di1_plotly(di1_curve, refdate_one, refdate_two):
     """Cria gráfico interativo de curva DI1 usando Plotly"""
     try:
@@ -510,8 +684,8 @@ def plot_curva_di1_plotly(di1_curve, refdate_one, refdate_two):
         # Primeira curva
         fig.add_trace(
             go.Scatter(
-                x=di1_curve_1["Maturity"],
-                y=di1_curve_1["Rate"],
+                x=datas_epoch_ms(di1_curve_1["Maturity"]),
+                y=di1_curve_1["Rate"].to_numpy(dtype=np.float32),
                 mode="lines+markers",
                 name=data_real_1.strftime("%Y-%m-%d"),
                 line=dict(color="#58FFE9", width=3),
@@ -525,8 +699,8 @@ def plot_curva_di1_plotly(di1_curve, refdate_one, refdate_two):
         # Segunda curva
         fig.add_trace(
             go.Scatter(
-                x=di1_curve_2["Maturity"],
-                y=di1_curve_2["Rate"],
+                x=datas_epoch_ms(di1_curve_2["Maturity"]),
+                y=di1_curve_2["Rate"].to_numpy(dtype=np.float32),
                 mode="lines+markers",
                 name=data_real_2.strftime("%Y-%m-%d"),
                 line=dict(color="#FF5F71", width=3),
@@ -564,6 +738,7 @@ def plot_curva_di1_plotly(di1_curve, refdate_one, refdate_two):
         margin=dict(t=80),  # Ajusta margem superior para o título
         xaxis=dict(
             title="Maturidade",
+            type="date",
             tickformat="%Y",
             dtick="M24",
             tickangle=45,
@@ -591,25 +766,77 @@ def plot_curva_di1_plotly(di1_curve, refdate_one, refdate_two):
         st.error(f"Erro ao criar gráfico: {e}")
         return None
 
+def plot_curva_intradiaria(curva, ajuste, data_ajuste):
+    """Curva DI1 do pregão em andamento contra a do último ajuste"""
+    fig = go.Figure()
+    if ajuste is not None and not ajuste.empty:
+        ajuste = ajuste.sort_values("Maturity")
+        fig.add_trace(
+            go.Scatter(
+                x=datas_epoch_ms(ajuste["Maturity"]),
+                y=ajuste["Rate"].to_numpy(dtype=np.float32),
+                mode="lines",
+                name=f"Ajuste {data_ajuste:%d/%m/%Y}",
+                line=dict(color="#FF5F71", width=2, dash="dot"),
+                hovertemplate="<b>Ajuste</b>: %{y:.3%}<extra></extra>"
+            )
+        )
+        # Variação em pontos-base contra o ajuste, por vencimento
+        anterior = ajuste.set_index("Maturity")["Rate"].reindex(curva["Maturity"]).to_numpy()
+        variacao = (curva["Rate"].to_numpy() - anterior) * 10000
+    else:
+        variacao = np.full(len(curva), np.nan)
+
+    fig.add_trace(
+        go.Scatter(
+            x=datas_epoch_ms(curva["Maturity"]),
+            y=curva["Rate"].to_numpy(dtype=np.float32),
+            customdata=np.column_stack([variacao, curva["hora"].str[11:19]]),
+            mode="lines+markers",
+            name="Pregão",
+            line=dict(color="#58FFE9", width=3),
+            marker=dict(size=7, color="#58FFE9"),
+            hovertemplate="<b>Maturidade</b>: %{x|%Y-%m}<br>" +
+                         "<b>Taxa</b>: %{y:.3%} (%{customdata[0]:+.1f} bps)<br>" +
+                         "<b>Hora</b>: %{customdata[1]}<extra></extra>"
+        )
+    )
+    fig.update_layout(
+        hovermode="x unified",
+        showlegend=True,
+        legend=dict(orientation="h", yanchor="top", y=0.98, xanchor="center", x=0.5,
+                    font=dict(color="#f0f2f6")),
+        height=get_responsive_height("normal"),
+        template="plotly_dark",
+        plot_bgcolor="#0e1117",
+        paper_bgcolor="#0e1117",
+        margin=dict(l=20, r=20, t=40, b=40),
+        xaxis=dict(title="Maturidade", type="date", tickformat="%Y", dtick="M24", tickangle=45,
+                   gridcolor="#2d3035", zerolinecolor="#4a4f60", color="#f0f2f6"),
+        yaxis=dict(title="Taxa de Juros (%)", tickformat=".1%", gridcolor="#2d3035",
+                   zerolinecolor="#4a4f60", color="#f0f2f6"),
+        font=dict(family="Inter, sans-serif", size=12, color="#f0f2f6")
+    )
+    return fig
+
+def data_mais_proxima(datas_ordenadas, alvo):
+    """Data disponível mais próxima de `alvo` (busca binária no índice ordenado)"""
+    alvo = pd.Timestamp(alvo)
+    pos = datas_ordenadas.searchsorted(alvo)
+    if pos == 0:
+        return datas_ordenadas[0]
+    if pos == len(datas_ordenadas):
+        return datas_ordenadas[-1]
+    anterior, seguinte = datas_ordenadas[pos - 1], datas_ordenadas[pos]
+    return anterior if alvo - anterior <= seguinte - alvo else seguinte
+
 def plot_curva_eua_plotly(df_eua, data1, data2):
     """Cria gráfico interativo de curva dos EUA usando Plotly"""
     try:
-        # Encontra as datas mais próximas das datas selecionadas
-        datas_disponiveis = sorted(df_eua.index)
-        
-        # Converte para pandas Timestamp se necessário
-        if not isinstance(data1, pd.Timestamp):
-            data1 = pd.Timestamp(data1)
-        if not isinstance(data2, pd.Timestamp):
-            data2 = pd.Timestamp(data2)
-        
         # Encontra as datas mais próximas disponíveis nos dados
-        datas_series = pd.Series(datas_disponiveis)
-        idx1 = (datas_series - data1).abs().idxmin()
-        idx2 = (datas_series - data2).abs().idxmin()
-        
-        data1_real = datas_disponiveis[idx1]
-        data2_real = datas_disponiveis[idx2]
+        datas_disponiveis = df_eua.index if df_eua.index.is_monotonic_increasing else df_eua.index.sort_values()
+        data1_real = data_mais_proxima(datas_disponiveis, data1)
+        data2_real = data_mais_proxima(datas_disponiveis, data2)
         
         # Encontra as curvas correspondentes às datas encontradas
         curva1 = df_eua.loc[data1_real]
@@ -629,7 +856,7 @@ def plot_curva_eua_plotly(df_eua, data1, data2):
         fig.add_trace(
             go.Scatter(
                 x=maturidades,
-                y=curva1_invertida,
+                y=curva1_invertida.astype(np.float32),
                 mode="lines+markers",
                 name=data1_real.strftime("%Y-%m-%d"),
                 line=dict(color="#58FFE9", width=3),
@@ -644,7 +871,7 @@ def plot_curva_eua_plotly(df_eua, data1, data2):
         fig.add_trace(
             go.Scatter(
                 x=maturidades,
-                y=curva2_invertida,
+                y=curva2_invertida.astype(np.float32),
                 mode="lines+markers",
                 name=data2_real.strftime("%Y-%m-%d"),
                 line=dict(color="#FF5F71", width=3),
@@ -707,168 +934,693 @@ def plot_curva_eua_plotly(df_eua, data1, data2):
         st.error(f"Erro ao criar gráfico dos EUA: {e}")
         return None
 
-def mostrar_historica_brasil(dados):
-    """Mostra curvas históricas do Brasil com comparação usando dados brutos"""
-    if dados["brasil_bruto"] is None:
-        st.error("Dados brutos do Brasil não disponíveis")
-        return
+# Prazos dos vértices dos EUA em anos (eixo numérico do leque de curvas)
+PRAZOS_EUA_ANOS = {"1M": 1 / 12, "3M": 0.25, "6M": 0.5, "1Y": 1, "2Y": 2, "3Y": 3, "5Y": 5, "10Y": 10, "30Y": 30}
+
+# Frequências disponíveis para o leque de curvas (códigos de período do pandas)
+FREQUENCIAS_LEQUE = {"Fim de mês": "M", "Fim de trimestre": "Q", "Fim de ano": "Y"}
+
+def selecionar_fechamentos(df, anos, frequencia):
+    """Última data de cada período (mês, trimestre ou ano) dos últimos `anos` anos"""
+    recorte = df.loc[df.index > df.index[-1] - pd.DateOffset(years=anos)]
+    periodos = recorte.index.to_period(frequencia)
+    ultimas = np.append(periodos[1:] != periodos[:-1], True)
+    return recorte[ultimas]
+
+def plot_leque_curvas(df, pais, anos, frequencia):
+    """
+    Sobrepõe as curvas de fechamento de cada período em um único traço WebGL.
     
-    st.markdown("## Curvas de Juros Futura - Brasil 🇧🇷")
-    st.markdown("Visualize e compare curvas de juros futuras DI1 em diferentes datas.")
+    As curvas são concatenadas em uma só série, separadas por NaN, de forma que
+    centenas de curvas continuam leves para o navegador.
+    """
+    curvas = selecionar_fechamentos(df, anos, frequencia)
+    if curvas.empty:
+        return None
     
-    # Processa os dados brutos
-    di1_curve = processar_dados_brasil_historico(dados["brasil_bruto"])
+    # Prazos em anos e taxas em percentual, do menor para o maior vértice
+    if pais == "Brasil":
+        prazos = np.array([int(col.split("_")[0]) for col in df.columns]) / 252
+        valores = curvas.to_numpy(dtype=np.float64) * 100
+    else:
+        prazos = np.array([PRAZOS_EUA_ANOS[col] for col in df.columns])
+        valores = curvas.to_numpy(dtype=np.float64)
+    ordem = np.argsort(prazos)
+    prazos, valores = prazos[ordem], valores[:, ordem]
     
-    if di1_curve is None:
-        return
+    n_curvas = len(curvas)
+    x = np.tile(np.append(prazos, np.nan), n_curvas).astype(np.float32)
+    y = np.hstack([valores, np.full((n_curvas, 1), np.nan)]).ravel().astype(np.float32)
     
-    # Obtém datas disponíveis
-    datas_disponiveis = sorted(di1_curve["DataRef"].unique())
+    fig = go.Figure()
     
-    if len(datas_disponiveis) < 2:
-        st.error("Dados insuficientes para comparação")
-        return
+    # Todas as curvas históricas em um único traço
+    fig.add_trace(
+        go.Scattergl(
+            x=x,
+            y=y,
+            mode="lines",
+            name=f"{n_curvas} curvas",
+            line=dict(color="rgba(88, 255, 233, 0.25)", width=1),
+            connectgaps=False,
+            hovertemplate="<b>Prazo</b>: %{x:.2f} anos<br>" +
+                         "<b>Taxa</b>: %{y:.2f}%<extra></extra>"
+        )
+    )
     
-    # Seleção automática de datas padrão
-    # Primeira data do último ano
-    last_year = pd.to_datetime(datas_disponiveis[-1]).year
-    first_date_last_year = None
-    for data in datas_disponiveis:
-        if pd.to_datetime(data).year == last_year:
-            first_date_last_year = data
-            break
+    # Curva mais recente em destaque
+    ultima = curvas.index[-1]
+    fig.add_trace(
+        go.Scattergl(
+            x=prazos.astype(np.float32),
+            y=valores[-1].astype(np.float32),
+            mode="lines+markers",
+            name=ultima.strftime("%Y-%m-%d"),
+            line=dict(color="#FF5F71", width=3),
+            marker=dict(size=6, color="#FF5F71"),
+            hovertemplate="<b>Data</b>: " + ultima.strftime("%d/%m/%Y") + "<br>" +
+                         "<b>Prazo</b>: %{x:.2f} anos<br>" +
+                         "<b>Taxa</b>: %{y:.2f}%<extra></extra>"
+        )
+    )
+    
+    fig.update_layout(
+        title=dict(
+            text=f"Leque de Curvas - {pais} ({curvas.index[0].strftime('%m/%Y')} a {ultima.strftime('%m/%Y')})",
+            y=0.95,
+            x=0.5,
+            xanchor='center',
+            yanchor='top',
+            font=dict(color="#FFFFFF", size=20)
+        ),
+        hovermode="closest",
+        showlegend=True,
+        legend=dict(
+            orientation="h",
+            yanchor="top",
+            y=0.98,
+            xanchor="center",
+            x=0.5,
+            font=dict(color="#f0f2f6")
+        ),
+        height=get_responsive_height("normal"),
+        template="plotly_dark",
+        plot_bgcolor="#0e1117",
+        paper_bgcolor="#0e1117",
+        margin=dict(t=80),
+        xaxis=dict(
+            title="Prazo (anos)",
+            gridcolor="#2d3035",
+            zerolinecolor="#4a4f60",
+            color="#f0f2f6"
+        ),
+        yaxis=dict(
+            title="Taxa de Juros (%)",
+            ticksuffix="%",
+            gridcolor="#2d3035",
+            zerolinecolor="#4a4f60",
+            color="#f0f2f6"
+        ),
+        font=dict(
+            family="Inter, sans-serif",
+            size=12,
+            color="#f0f2f6"
+        )
+    )
     
-    # Última data disponível
-    last_date = datas_disponiveis[-1]
+    return fig
+
+@st.fragment
+def leque_curvas(chave, pais):
+    """Leque de curvas históricas (a base processada só é carregada quando ativado)"""
+    st.markdown("### Leque de Curvas")
+    if not st.toggle("Sobrepor curvas históricas", key=f"leque_{chave}"):
+        return
     
-    # Interface para seleção de datas
-    st.markdown("### Selecione as datas para comparar")
+    df = obter_dados()[chave]
+    if df is None or len(df) < 2:
+        st.error(f"Dados não disponíveis para {pais}")
+        return
     
+    max_anos = max(1, int(np.ceil((df.index[-1] - df.index[0]).days / 365.25)))
     col1, col2 = st.columns(2)
     
     with col1:
-        data1 = st.date_input(
-            "Primeira Data",
-            value=pd.to_datetime(first_date_last_year).date() if first_date_last_year else pd.to_datetime(datas_disponiveis[0]).date(),
-            min_value=pd.to_datetime(datas_disponiveis[0]).date(),
-            max_value=pd.to_datetime(datas_disponiveis[-1]).date(),
-            key="br_data1_new"
-        )
+        anos = st.slider("Anos de histórico", 1, max_anos, min(5, max_anos), key=f"leque_anos_{chave}")
     
     with col2:
-        data2 = st.date_input(
-            "Segunda Data",
-            value=pd.to_datetime(datas_disponiveis[-1]).date(),
-            min_value=pd.to_datetime(datas_disponiveis[0]).date(),
-            max_value=pd.to_datetime(datas_disponiveis[-1]).date(),
-            key="br_data2_new"
-        )
+        frequencia = st.radio("Frequência", list(FREQUENCIAS_LEQUE), horizontal=True,
+                              key=f"leque_frequencia_{chave}")
     
-    # Cria o gráfico de comparação
-    if data1 and data2:
-        # Converte para datetime
-        refdate_one = pd.to_datetime(data1)
-        refdate_two = pd.to_datetime(data2)
-        
-        # Gera o gráfico plotly
-        fig = plot_curva_di1_plotly(di1_curve, refdate_one, refdate_two)
-        
-        if fig is not None:
-            # Ajusta altura para mobile
-            fig.update_layout(
-                height=get_responsive_height("normal"),
-                margin=dict(l=20, r=20, t=40, b=40),
-                font=dict(size=12)
-            )
-            st.plotly_chart(fig, use_container_width=True, config={
-                "displayModeBar": True,
-                "displaylogo": False,
-                "modeBarButtonsToRemove": ["pan2d", "lasso2d", "select2d"]
-            })
+    fig = plot_leque_curvas(df, pais, anos, FREQUENCIAS_LEQUE[frequencia])
+    if fig is not None:
+        st.plotly_chart(fig, use_container_width=True, config={
+            "displayModeBar": True,
+            "displaylogo": False,
+            "modeBarButtonsToRemove": ["lasso2d", "select2d"]
+        })
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def carregar_copom(versao):
+    """Taxas implícitas por reunião (vigente, r1...r16) e calendário do Copom (None se não existirem)"""
+    reunioes = carregar_calendario()
+    if reunioes is None or not os.path.exists(CAMINHO_COPOM):
+        return None
+    taxas = pd.read_parquet(CAMINHO_COPOM)
+    if taxas.columns.tolist() != COLUNAS_COPOM:
+        # Matriz no formato antigo (uma coluna por reunião): refeita no próximo processamento
+        return None
+    return {"taxas": taxas, "reunioes": reunioes}
+
+def trajetoria_copom(copom, data):
+    """Datas (referência e reuniões seguintes) e taxas em % da trajetória implícita em `data`"""
+    taxas = copom["taxas"].loc[data].to_numpy(dtype=np.float64) * 100
+    feriados = np.array(calendario_anbima().holidays, dtype="datetime64[D]")
+    reunioes = reunioes_seguintes(data, copom["reunioes"], feriados, len(taxas) - 1)
+    datas = pd.DatetimeIndex([data]).append(pd.DatetimeIndex(reunioes))
+    validas = np.isfinite(taxas[:len(datas)])
+    return datas[validas], taxas[:len(datas)][validas]
+
+def plot_copom_implicito(copom, data, data_comparacao):
+    """
+    Trajetória da Selic implícita na curva DI1: a taxa vigente e a taxa após
+    cada reunião seguinte, em degraus, com o movimento implícito de cada
+    reunião (pontos-base) em barras.
+    """
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
     
-    # Seção de download dos dados
-    st.markdown("### Download dos Dados")
-    st.markdown("Baixe os dados históricos utilizados nesta análise:")
+    datas, taxas = trajetoria_copom(copom, data)
+    movimentos = np.diff(taxas) * 100
+    fig.add_trace(
+        go.Bar(
+            x=datas[1:],
+            y=movimentos.astype(np.float32),
+            name="Movimento implícito",
+            marker=dict(color=np.where(movimentos >= 0, "#FF5F71", "#58FFE9"), opacity=0.35),
+            hovertemplate="<b>Reunião</b>: %{x|%d/%m/%Y}<br><b>Movimento</b>: %{y:.1f} bps<extra></extra>"
+        ),
+        secondary_y=True
+    )
     
-    # Converte para CSV para download
-    csv_data = di1_curve.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        label="Baixar dados do Brasil (CSV)",
-        data=csv_data,
-        file_name=f"juros_brasil_historico_{datetime.now().strftime("%Y%m%d")}.csv",
-        mime="text/csv"
+    cores = {data: "#58FFE9", data_comparacao: "#FFD166"}
+    for referencia in dict.fromkeys([data, data_comparacao]):
+        datas, taxas = trajetoria_copom(copom, referencia)
+        fig.add_trace(
+            go.Scatter(
+                x=datas,
+                y=taxas.astype(np.float32),
+                mode="lines+markers",
+                line=dict(shape="hv", color=cores[referencia], width=2.5),
+                marker=dict(size=6, color=cores[referencia]),
+                name=referencia.strftime("%Y-%m-%d"),
+                hovertemplate="<b>Data</b>: %{x|%d/%m/%Y}<br><b>Taxa</b>: %{y:.2f}%<extra></extra>"
+            ),
+            secondary_y=False
+        )
+    
+    fig.update_layout(
+        title=dict(
+            text="Trajetória Implícita da Selic por Reunião do Copom",
+            y=0.95,
+            x=0.5,
+            xanchor='center',
+            yanchor='top',
+            font=dict(color="#FFFFFF", size=20)
+        ),
+        hovermode="closest",
+        showlegend=True,
+        legend=dict(
+            orientation="h",
+            yanchor="top",
+            y=0.98,
+            xanchor="center",
+            x=0.5,
+            font=dict(color="#f0f2f6")
+        ),
+        height=get_responsive_height("normal"),
+        template="plotly_dark",
+        plot_bgcolor="#0e1117",
+        paper_bgcolor="#0e1117",
+        margin=dict(t=80),
+        bargap=0.6,
+        font=dict(
+            family="Inter, sans-serif",
+            size=12,
+            color="#f0f2f6"
+        )
     )
+    fig.update_xaxes(title="Data", type="date", gridcolor="#2d3035", color="#f0f2f6")
+    fig.update_yaxes(title="Taxa implícita (%)", ticksuffix="%", gridcolor="#2d3035",
+                     zerolinecolor="#4a4f60", color="#f0f2f6", secondary_y=False)
+    fig.update_yaxes(title="Movimento (bps)", showgrid=False, zerolinecolor="#4a4f60",
+                     color="#f0f2f6", secondary_y=True)
+    
+    return fig
 
-def mostrar_historica_eua(dados):
-    """Mostra curvas históricas dos EUA com comparação usando matplotlib"""
-    if dados["eua"] is None:
-        st.error("Dados dos EUA não disponíveis")
+@st.fragment
+def copom_implicito_brasil():
+    """Taxas implícitas por reunião do Copom (matriz extraída no processamento)"""
+    st.markdown("### Copom Implícito")
+    if not st.toggle("Mostrar trajetória implícita da Selic", key="copom_brasil"):
         return
     
-    st.markdown("## Curvas de Juros Futura - EUA 🇺🇸")
-    st.markdown("Visualize e compare curvas de juros dos EUA em diferentes datas.")
+    copom = carregar_copom(monitor_dados().versao)
+    if copom is None or copom["taxas"].empty:
+        st.error("Taxas implícitas não disponíveis. Execute o script de processamento "
+                 "(requer Dados/calendario_copom.csv).")
+        return
     
-    df = dados["eua"]
+    datas = copom["taxas"].index
+    col1, col2 = st.columns(2)
+    with col1:
+        data = st.date_input("Data", value=datas[-1].date(), min_value=datas[0].date(),
+                             max_value=datas[-1].date(), key="copom_data")
+    with col2:
+        comparacao = st.date_input("Comparar com", value=datas[max(len(datas) - 22, 0)].date(),
+                                   min_value=datas[0].date(), max_value=datas[-1].date(), key="copom_comparacao")
+    
+    fig = plot_copom_implicito(copom, data_mais_proxima(datas, data), data_mais_proxima(datas, comparacao))
+    st.plotly_chart(fig, use_container_width=True, config={
+        "displayModeBar": True,
+        "displaylogo": False,
+        "modeBarButtonsToRemove": ["lasso2d", "select2d"]
+    })
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def carregar_pca(versao, chave):
+    """Cargas, variância explicada e fatores PCA gerados pelo processamento"""
+    estado_path = f"Dados/pca_{chave}_estado.json"
+    fatores_path = f"Dados/pca_{chave}_fatores.parquet"
+    if not (os.path.exists(estado_path) and os.path.exists(fatores_path)):
+        return None
     
-    # Obtém datas disponíveis
-    datas_disponiveis = sorted(df.index)
+    with open(estado_path, encoding="utf-8") as f:
+        estado = json.load(f)
     
-    if len(datas_disponiveis) < 2:
-        st.error("Dados insuficientes para comparação")
+    return {
+        "horizontes": estado["colunas"],
+        "cargas": estado["cargas"],
+        "variancia": estado["variancia_explicada"],
+        "fatores": pd.read_parquet(fatores_path),
+    }
+
+def plot_fatores_pca(pca, pais):
+    """Cargas por horizonte e fatores acumulados ao longo do tempo"""
+    nomes = {"nivel": "Nível", "inclinacao": "Inclinação", "curvatura": "Curvatura"}
+    cores = {"nivel": "#58FFE9", "inclinacao": "#FF5F71", "curvatura": "#FFD166"}
+    rotulos = [h.replace("_dias", "d") for h in pca["horizontes"]]
+    
+    fig = make_subplots(rows=1, cols=2, column_widths=[0.4, 0.6], horizontal_spacing=0.08,
+                        subplot_titles=("Cargas por Horizonte", "Fatores Acumulados (p.p.)"))
+    
+    for fator, cargas in pca["cargas"].items():
+        legenda = f"{nomes[fator]} ({pca['variancia'][fator]:.1%})"
+        fig.add_trace(
+            go.Scatter(
+                x=rotulos,
+                y=np.asarray(cargas, dtype=np.float32),
+                mode="lines+markers",
+                name=legenda,
+                legendgroup=fator,
+                line=dict(color=cores[fator], width=2),
+                marker=dict(size=5, color=cores[fator]),
+                hovertemplate="<b>Horizonte</b>: %{x}<br><b>Carga</b>: %{y:.3f}<extra></extra>"
+            ),
+            row=1, col=1
+        )
+        fig.add_trace(
+            go.Scattergl(
+                x=datas_epoch_ms(pca["fatores"].index),
+                y=pca["fatores"][fator].cumsum().to_numpy(dtype=np.float32),
+                mode="lines",
+                name=legenda,
+                legendgroup=fator,
+                showlegend=False,
+                line=dict(color=cores[fator], width=1.5),
+                hovertemplate="<b>Data</b>: %{x|%d/%m/%Y}<br><b>Acumulado</b>: %{y:.2f} p.p.<extra></extra>"
+            ),
+            row=1, col=2
+        )
+    
+    fig.update_layout(
+        title=dict(
+            text=f"Decomposição das Variações - {pais}",
+            y=0.97,
+            x=0.5,
+            xanchor='center',
+            yanchor='top',
+            font=dict(color="#FFFFFF", size=20)
+        ),
+        height=get_responsive_height("normal"),
+        template="plotly_dark",
+        plot_bgcolor="#0e1117",
+        paper_bgcolor="#0e1117",
+        margin=dict(t=100),
+        legend=dict(
+            orientation="h",
+            yanchor="top",
+            y=1.12,
+            xanchor="center",
+            x=0.5,
+            font=dict(color="#f0f2f6")
+        ),
+        font=dict(
+            family="Inter, sans-serif",
+            size=12,
+            color="#f0f2f6"
+        )
+    )
+    fig.update_xaxes(gridcolor="#2d3035", color="#f0f2f6")
+    fig.update_xaxes(tickangle=45, row=1, col=1)
+    fig.update_xaxes(type="date", row=1, col=2)
+    fig.update_yaxes(gridcolor="#2d3035", zerolinecolor="#4a4f60", color="#f0f2f6")
+    
+    return fig
+
+@st.fragment
+def fatores_pca(chave, pais):
+    """Nível, inclinação e curvatura das variações das curvas (pré-calculados)"""
+    st.markdown("### Nível, Inclinação e Curvatura")
+    if not st.toggle("Mostrar decomposição das variações", key=f"pca_{chave}"):
         return
     
-    # Seleção automática de datas padrão
-    # Primeira data do último ano
-    last_year = datas_disponiveis[-1].year
-    first_date_last_year = None
-    for data in datas_disponiveis:
-        if data.year == last_year:
-            first_date_last_year = data
-            break
+    pca = carregar_pca(monitor_dados().versao, chave)
+    if pca is None:
+        st.error("Decomposição não disponível. Execute o script de processamento.")
+        return
+    
+    st.plotly_chart(plot_fatores_pca(pca, pais), use_container_width=True, config={
+        "displayModeBar": True,
+        "displaylogo": False,
+        "modeBarButtonsToRemove": ["lasso2d", "select2d"]
+    })
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def carregar_metricas(versao, chave):
+    """Tabela de métricas materializada pelo processamento (None se não existir)"""
+    metricas_path = f"Dados/metricas_{chave}.parquet"
+    if not os.path.exists(metricas_path):
+        return None
+    return pd.read_parquet(metricas_path)
+
+def plot_metricas(metricas, nomes, variacao, pais):
+    """Séries históricas das métricas escolhidas (nível ou variação diária)"""
+    cores = ["#58FFE9", "#FF5F71", "#FFD166", "#06D6A0", "#A78BFA", "#F78C6B"]
+    x = datas_epoch_ms(metricas.index)
+    fig = go.Figure()
     
-    # Última data disponível
-    last_date = datas_disponiveis[-1]
+    for i, nome in enumerate(nomes):
+        coluna = f"{nome}_var" if variacao else nome
+        fig.add_trace(
+            go.Scattergl(
+                x=x,
+                y=metricas[coluna].to_numpy(dtype=np.float32),
+                mode="lines",
+                name=nome,
+                line=dict(color=cores[i % len(cores)], width=1.5),
+                hovertemplate="<b>Data</b>: %{x|%d/%m/%Y}<br>" +
+                             f"<b>{nome}</b>: " + "%{y:.2f} p.p.<extra></extra>"
+            )
+        )
     
-    # Interface para seleção de datas
-    st.markdown("### Selecione as datas para comparar")
+    fig.update_layout(
+        title=dict(
+            text=f"Métricas da Estrutura a Termo - {pais}",
+            y=0.95,
+            x=0.5,
+            xanchor='center',
+            yanchor='top',
+            font=dict(color="#FFFFFF", size=20)
+        ),
+        hovermode="x unified",
+        showlegend=True,
+        legend=dict(
+            orientation="h",
+            yanchor="top",
+            y=0.98,
+            xanchor="center",
+            x=0.5,
+            font=dict(color="#f0f2f6")
+        ),
+        height=get_responsive_height("normal"),
+        template="plotly_dark",
+        plot_bgcolor="#0e1117",
+        paper_bgcolor="#0e1117",
+        margin=dict(t=80),
+        xaxis=dict(
+            title="Data",
+            type="date",
+            gridcolor="#2d3035",
+            zerolinecolor="#4a4f60",
+            color="#f0f2f6"
+        ),
+        yaxis=dict(
+            title="Variação diária (p.p.)" if variacao else "Pontos percentuais",
+            gridcolor="#2d3035",
+            zerolinecolor="#4a4f60",
+            color="#f0f2f6"
+        ),
+        font=dict(
+            family="Inter, sans-serif",
+            size=12,
+            color="#f0f2f6"
+        )
+    )
     
-    # Formata as datas disponíveis para exibição
-    datas_formatadas = [data.strftime("%d/%m/%Y") for data in datas_disponiveis]
+    return fig
+
+@st.fragment
+def metricas_historicas(chave, pais):
+    """Spreads, borboletas e taxas de vértices lidos da tabela pré-calculada"""
+    st.markdown("### Spreads e Borboletas")
+    if not st.toggle("Mostrar métricas históricas", key=f"metricas_{chave}"):
+        return
     
-    # Índices padrão
-    idx_primeira = datas_disponiveis.index(first_date_last_year) if first_date_last_year else 0
-    idx_ultima = len(datas_disponiveis) - 1
+    metricas = carregar_metricas(monitor_dados().versao, chave)
+    if metricas is None:
+        st.error("Métricas não disponíveis. Execute o script de processamento.")
+        return
+    
+    disponiveis = [c for c in metricas.columns if not c.endswith("_var")]
+    padrao = [c for c in disponiveis if c.startswith("spread")][:1] or disponiveis[:1]
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        nomes = st.multiselect("Métricas", disponiveis, default=padrao, key=f"metricas_nomes_{chave}")
+    with col2:
+        serie = st.radio("Série", ["Nível", "Variação diária"], key=f"metricas_serie_{chave}")
+    
+    if not nomes:
+        return
+    
+    st.plotly_chart(plot_metricas(metricas, nomes, serie == "Variação diária", pais), use_container_width=True, config={
+        "displayModeBar": True,
+        "displaylogo": False,
+        "modeBarButtonsToRemove": ["lasso2d", "select2d"]
+    })
+
+@st.fragment
+def comparacao_curvas_brasil(snap_br, di1_curve, primeira_data, ultima_data, first_date_last_year):
+    """Seletores de data e gráfico de comparação do Brasil (rerun isolado ao trocar datas)"""
+    # Interface para seleção de datas
+    st.markdown("### Selecione as datas para comparar")
     
     col1, col2 = st.columns(2)
     
     with col1:
-        idx_data1 = st.selectbox(
+        data1 = st.date_input(
             "Primeira Data",
-            range(len(datas_formatadas)),
-            index=idx_primeira,
-            format_func=lambda x: datas_formatadas[x],
-            key="eua_data1_select"
+            value=pd.to_datetime(first_date_last_year).date() if first_date_last_year else pd.to_datetime(primeira_data).date(),
+            min_value=pd.to_datetime(primeira_data).date(),
+            max_value=pd.to_datetime(ultima_data).date(),
+            key="br_data1_new"
         )
-        data1 = datas_disponiveis[idx_data1]
     
     with col2:
-        idx_data2 = st.selectbox(
+        data2 = st.date_input(
             "Segunda Data",
-            range(len(datas_formatadas)),
-            index=idx_ultima,
-            format_func=lambda x: datas_formatadas[x],
-            key="eua_data2_select"
+            value=pd.to_datetime(ultima_data).date(),
+            min_value=pd.to_datetime(primeira_data).date(),
+            max_value=pd.to_datetime(ultima_data).date(),
+            key="br_data2_new"
         )
-        data2 = datas_disponiveis[idx_data2]
     
     # Cria o gráfico de comparação
     if data1 and data2:
-        # Converte para datetime (os objetos já são datetime do pandas)
-        data1_ts = pd.Timestamp(data1)
-        data2_ts = pd.Timestamp(data2)
+        # Converte para datetime
+        refdate_one = pd.to_datetime(data1)
+        refdate_two = pd.to_datetime(data2)
+        
+        # Usa o snapshot quando as duas datas estão nele; senão carrega a base completa
+        if di1_curve is None:
+            datas_snapshot = set(snap_br["curvas"]["DataRef"])
+            if refdate_one in datas_snapshot and refdate_two in datas_snapshot:
+                di1_curve = snap_br["curvas"]
+            else:
+                with st.spinner("Carregando histórico completo..."):
+                    di1_curve = obter_curva_brasil()
+                if di1_curve is None:
+                    st.error("Dados brutos do Brasil não disponíveis")
+                    return
         
         # Gera o gráfico plotly
-        fig = plot_curva_eua_plotly(df, data1_ts, data2_ts)
+        fig = plot_curva_di1_plotly(di1_curve, refdate_one, refdate_two)
+        
+        if fig is not None:
+            # Ajusta altura para mobile
+            fig.update_layout(
+                height=get_responsive_height("normal"),
+                margin=dict(l=20, r=20, t=40, b=40),
+                font=dict(size=12)
+            )
+            st.plotly_chart(fig, use_container_width=True, config={
+                "displayModeBar": True,
+                "displaylogo": False,
+                "modeBarButtonsToRemove": ["pan2d", "lasso2d", "select2d"]
+            })
+
+@st.fragment(run_every=INTERVALO_INTRADIARIO)
+def curva_pregao_brasil(snap_br):
+    """
+    Curva DI1 do pregão em andamento. Só este fragmento é refeito a cada
+    INTERVALO_INTRADIARIO segundos, com as cotações que o monitor já leu do
+    arquivo da coleta intradiária (sem recarregar a base).
+    """
+    monitor = monitor_intradiario()
+    curva = carregar_curva_intradiaria(monitor.sequencia)
+    if curva is None:
+        return
+
+    ajuste, data_ajuste = None, None
+    if snap_br is not None:
+        data_ajuste = snap_br["ultima_data"]
+        ajuste = snap_br["curvas"][snap_br["curvas"]["DataRef"] == data_ajuste]
+
+    st.markdown("### Pregão em Andamento")
+    st.caption(f"Última cotação às {curva['hora'].max()[11:19]} · {len(curva)} vencimentos · "
+               f"atualiza a cada {INTERVALO_INTRADIARIO} s")
+    st.plotly_chart(plot_curva_intradiaria(curva, ajuste, data_ajuste), use_container_width=True, config={
+        "displayModeBar": True,
+        "displaylogo": False,
+        "modeBarButtonsToRemove": ["pan2d", "lasso2d", "select2d"]
+    })
+
+def mostrar_historica_brasil(snapshot=None):
+    """
+    Mostra curvas históricas do Brasil com comparação usando dados brutos.
+    
+    As datas padrão vêm do snapshot; a base completa só é carregada quando o
+    usuário escolhe datas que não estão nele.
+    """
+    snap_br = snapshot["brasil"] if snapshot else None
+    di1_curve = None
+    
+    if snap_br is None:
+        # Processa os dados brutos
+        di1_curve = obter_curva_brasil()
+        
+        if di1_curve is None:
+            st.error("Dados brutos do Brasil não disponíveis")
+            return
+        
+        # Obtém datas disponíveis
+        datas_disponiveis = sorted(di1_curve["DataRef"].unique())
+        
+        if len(datas_disponiveis) < 2:
+            st.error("Dados insuficientes para comparação")
+            return
+        
+        # Seleção automática de datas padrão
+        # Primeira data do último ano
+        last_year = pd.to_datetime(datas_disponiveis[-1]).year
+        first_date_last_year = None
+        for data in datas_disponiveis:
+            if pd.to_datetime(data).year == last_year:
+                first_date_last_year = data
+                break
+        
+        primeira_data = datas_disponiveis[0]
+        ultima_data = datas_disponiveis[-1]
+    else:
+        primeira_data = snap_br["primeira_data"]
+        ultima_data = snap_br["ultima_data"]
+        first_date_last_year = snap_br["data_inicio_ultimo_ano"]
+    
+    st.markdown("## Curvas de Juros Futura - Brasil 🇧🇷")
+    st.markdown("Visualize e compare curvas de juros futuras DI1 em diferentes datas.")
+    
+    comparacao_curvas_brasil(snap_br, di1_curve, primeira_data, ultima_data, first_date_last_year)
+    
+    # Curva do pregão: o fragmento fica sempre montado e só aparece quando a coleta intradiária grava o dia
+    curva_pregao_brasil(snap_br)
+    
+    leque_curvas("brasil", "Brasil")
+    
+    copom_implicito_brasil()
+    
+    fatores_pca("brasil", "Brasil")
+    
+    metricas_historicas("brasil", "Brasil")
+    
+    # Seção de download dos dados
+    st.markdown("### Download dos Dados")
+    st.markdown("Baixe os dados históricos utilizados nesta análise:")
+    
+    # CSV gerado apenas quando o usuário clica (evita carregar a base completa)
+    st.download_button(
+        label="Baixar dados do Brasil (CSV)",
+        data=lambda: obter_curva_brasil().to_csv(index=False).encode("utf-8"),
+        file_name=f"juros_brasil_historico_{datetime.now().strftime("%Y%m%d")}.csv",
+        mime="text/csv",
+        on_click="ignore"
+    )
+
+@st.fragment
+def comparacao_curvas_eua(df, datas_disponiveis, first_date_last_year):
+    """Seletores de data e gráfico de comparação dos EUA (rerun isolado ao trocar datas)"""
+    # Interface para seleção de datas
+    st.markdown("### Selecione as datas para comparar")
+    
+    # Só os limites e o valor vão ao navegador; a data escolhida é ajustada
+    # no servidor para a data disponível mais próxima
+    primeira_data = datas_disponiveis[0].date()
+    ultima_data = datas_disponiveis[-1].date()
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        escolhida1 = st.date_input(
+            "Primeira Data",
+            value=(first_date_last_year or datas_disponiveis[0]).date(),
+            min_value=primeira_data,
+            max_value=ultima_data,
+            format="DD/MM/YYYY",
+            key="eua_data1"
+        )
+    
+    with col2:
+        escolhida2 = st.date_input(
+            "Segunda Data",
+            value=ultima_data,
+            min_value=primeira_data,
+            max_value=ultima_data,
+            format="DD/MM/YYYY",
+            key="eua_data2"
+        )
+    
+    data1 = data_mais_proxima(datas_disponiveis, escolhida1) if escolhida1 else None
+    data2 = data_mais_proxima(datas_disponiveis, escolhida2) if escolhida2 else None
+    
+    ajustes = [f"{pd.Timestamp(e).strftime('%d/%m/%Y')} → {d.strftime('%d/%m/%Y')}"
+               for e, d in ((escolhida1, data1), (escolhida2, data2))
+               if e and pd.Timestamp(e) != d]
+    if ajustes:
+        st.caption("Datas sem dados ajustadas para a mais próxima disponível: " + "; ".join(ajustes))
+    
+    # Cria o gráfico de comparação
+    if data1 is not None and data2 is not None:
+        # Gera o gráfico plotly
+        fig = plot_curva_eua_plotly(df, data1, data2)
         
         if fig is not None:
             # Ajusta altura para mobile
@@ -888,6 +1640,36 @@ def mostrar_historica_eua(dados):
                 "displaylogo": False,
                 "modeBarButtonsToRemove": ["pan2d", "lasso2d", "select2d"]
             })
+
+def mostrar_historica_eua(dados):
+    """Mostra curvas históricas dos EUA com comparação usando matplotlib"""
+    if dados["eua"] is None:
+        st.error("Dados dos EUA não disponíveis")
+        return
+    
+    st.markdown("## Curvas de Juros Futura - EUA 🇺🇸")
+    st.markdown("Visualize e compare curvas de juros dos EUA em diferentes datas.")
+    
+    df = dados["eua"]
+    
+    # Obtém datas disponíveis (índice ordenado)
+    datas_disponiveis = df.index if df.index.is_monotonic_increasing else df.index.sort_values()
+    
+    if len(datas_disponiveis) < 2:
+        st.error("Dados insuficientes para comparação")
+        return
+    
+    # Seleção automática de datas padrão
+    # Primeira data do último ano
+    first_date_last_year = datas_disponiveis[datas_disponiveis.year == datas_disponiveis[-1].year][0]
+    
+    comparacao_curvas_eua(df, datas_disponiveis, first_date_last_year)
+    
+    leque_curvas("eua", "EUA")
+    
+    fatores_pca("eua", "EUA")
+    
+    metricas_historicas("eua", "EUA")
     
     # Seção de download dos dados
     st.markdown("### Download dos Dados")
@@ -899,22 +1681,223 @@ def mostrar_historica_eua(dados):
         label="Baixar dados dos EUA (CSV)",
         data=csv_data,
         file_name=f"juros_eua_historico_{datetime.now().strftime("%Y%m%d")}.csv",
-        mime="text/csv"
+        mime="text/csv",
+        on_click="ignore"
     )
 
-def mostrar_superficie_brasil(dados):
-    """Mostra superfície 3D do Brasil"""
-    if dados["brasil"] is None:
-        st.error("Dados do Brasil não disponíveis")
-        return
+# Tamanho fixo (pixels) da imagem do mapa de calor e linhas da grade de hover
+LARGURA_MAPA = 740
+ALTURA_MAPA = 600
+LINHAS_HOVER = 150
+
+def paleta_rdylgn_r(n=256):
+    """Tabela de cores RGB (n x 3, uint8) equivalente à escala 'RdYlGn_r' do Plotly"""
+    ancoras = np.array([px.colors.unlabel_rgb(c) for c in px.colors.diverging.RdYlGn[::-1]], dtype=np.float64)
+    posicoes = np.linspace(0, 1, len(ancoras))
+    alvo = np.linspace(0, 1, n)
+    return np.column_stack([np.interp(alvo, posicoes, ancoras[:, i]) for i in range(3)]).round().astype(np.uint8)
+
+PALETA_MAPA = paleta_rdylgn_r()
+
+def agregar_por_tempo(datas, valores, inicio, fim, n_linhas):
+    """
+    Média das linhas de `valores` em n_linhas faixas de tempo iguais entre inicio e fim.
     
-    st.markdown("## Superfície de Juros - Brasil 🇧🇷")
-    st.markdown("Visualize a evolução temporal completa das curvas de juros brasileiras em três dimensões.")
+    Faixas sem dados repetem a faixa anterior (séries mensais ou feriados).
+    Retorna (centro de cada faixa em ms, matriz n_linhas x colunas).
+    """
+    t = datas_epoch_ms(datas)
+    t0, t1 = datas_epoch_ms([inicio, fim])
+    bordas = np.linspace(t0, t1, n_linhas + 1)
+    faixa = np.clip(np.searchsorted(bordas, t, side="right") - 1, 0, n_linhas - 1)
+    
+    validos = np.isfinite(valores)
+    soma = np.zeros((n_linhas, valores.shape[1]))
+    contagem = np.zeros((n_linhas, valores.shape[1]))
+    np.add.at(soma, faixa, np.where(validos, valores, 0.0))
+    np.add.at(contagem, faixa, validos)
+    
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = np.where(contagem > 0, soma / contagem, np.nan)
+    
+    # Preenche faixas vazias com a última faixa que tinha dados
+    preenchidas = np.where((contagem > 0).any(axis=1), np.arange(n_linhas), 0)
+    media = media[np.maximum.accumulate(preenchidas)]
+    return (bordas[:-1] + bordas[1:]) / 2, media
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def carregar_mapa_calor(versao, chave, inicio, fim):
+    """
+    Rasteriza no servidor o mapa data x maturidade de uma janela de datas.
+    
+    A imagem PNG tem tamanho fixo e a grade de hover tem LINHAS_HOVER linhas, então
+    o custo no navegador não depende do tamanho do histórico. O cache guarda uma
+    entrada por janela (zoom).
+    """
+    df = carregar_dados(versao)[chave]
+    janela = df.loc[(df.index >= pd.Timestamp(inicio)) & (df.index <= pd.Timestamp(fim))]
+    if janela.empty:
+        return None
     
-    fig_br = plot_superficie_3d(dados["brasil"], "Superfície de Juros - Brasil", "Brasil")
-    if fig_br:
+    # Maturidades da menor para a maior; taxas em percentual
+    if chave.startswith("brasil"):
+        colunas = sorted(janela.columns, key=lambda c: int(c.split("_")[0]))
+        rotulos = [col.replace("_dias", "d") for col in colunas]
+        valores = janela[colunas].to_numpy(dtype=np.float64) * 100
+    else:
+        colunas = janela.columns[::-1].tolist()
+        rotulos = colunas
+        valores = janela[colunas].to_numpy(dtype=np.float64)
+    
+    zmin, zmax = float(np.nanmin(valores)), float(np.nanmax(valores))
+    
+    # Imagem: linhas = faixas de tempo (mais recente no topo), colunas = maturidades
+    _, grade = agregar_por_tempo(janela.index, valores, inicio, fim, ALTURA_MAPA)
+    grade = grade[::-1, np.arange(LARGURA_MAPA) * len(colunas) // LARGURA_MAPA]
+    normalizado = (grade - zmin) / max(zmax - zmin, 1e-12)
+    indices = np.clip(np.nan_to_num(normalizado) * (len(PALETA_MAPA) - 1), 0, len(PALETA_MAPA) - 1).round().astype(np.intp)
+    rgba = np.dstack([PALETA_MAPA[indices], np.where(np.isfinite(grade), 255, 0).astype(np.uint8)])
+    
+    buffer = io.BytesIO()
+    plt.imsave(buffer, rgba, format="png")
+    
+    # Grade reduzida usada apenas para o hover
+    centros, hover = agregar_por_tempo(janela.index, valores, inicio, fim, LINHAS_HOVER)
+    
+    return {
+        "imagem": "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii"),
+        "rotulos": rotulos,
+        "inicio_ms": float(datas_epoch_ms([inicio])[0]),
+        "fim_ms": float(datas_epoch_ms([fim])[0]),
+        "hover_y": centros,
+        "hover_z": hover.astype(np.float32),
+        "zmin": zmin,
+        "zmax": zmax,
+    }
+
+def plot_mapa_calor(mapa, titulo):
+    """Mapa de calor data x maturidade a partir da imagem rasterizada no servidor"""
+    n_colunas = len(mapa["rotulos"])
+    fig = go.Figure()
+    
+    # Camada transparente com a grade reduzida: só fornece os valores do hover
+    fig.add_trace(
+        go.Heatmap(
+            x=mapa["rotulos"],
+            y=mapa["hover_y"],
+            z=mapa["hover_z"],
+            colorscale=[[0, "rgba(0,0,0,0)"], [1, "rgba(0,0,0,0)"]],
+            showscale=False,
+            hovertemplate="<b>Data</b>: %{y|%m/%Y}<br>" +
+                         "<b>Maturidade</b>: %{x}<br>" +
+                         "<b>Taxa</b>: %{z:.2f}%<extra></extra>"
+        )
+    )
+    
+    # Traço vazio apenas para exibir a barra de cores da imagem
+    fig.add_trace(
+        go.Scatter(
+            x=[None],
+            y=[None],
+            mode="markers",
+            marker=dict(
+                colorscale="RdYlGn_r",
+                cmin=mapa["zmin"],
+                cmax=mapa["zmax"],
+                color=[mapa["zmin"]],
+                showscale=True,
+                colorbar=dict(title="Taxa (%)")
+            ),
+            hoverinfo="skip",
+            showlegend=False
+        )
+    )
+    
+    fig.update_layout(
+        title=dict(
+            text=titulo,
+            y=0.95,
+            x=0.5,
+            xanchor='center',
+            yanchor='top',
+            font=dict(color="#FFFFFF", size=20)
+        ),
+        images=[dict(
+            source=mapa["imagem"],
+            xref="x",
+            yref="y",
+            x=-0.5,
+            y=mapa["fim_ms"],
+            sizex=n_colunas,
+            sizey=mapa["fim_ms"] - mapa["inicio_ms"],
+            sizing="stretch",
+            xanchor="left",
+            yanchor="top",
+            layer="below"
+        )],
+        height=get_responsive_height("superficie"),
+        template="plotly_dark",
+        plot_bgcolor="#0e1117",
+        paper_bgcolor="#0e1117",
+        margin=dict(l=10, r=10, t=60, b=10),
+        xaxis=dict(
+            title="Maturidade",
+            type="category",
+            range=[-0.5, n_colunas - 0.5],
+            tickangle=45,
+            showgrid=False,
+            color="#f0f2f6"
+        ),
+        yaxis=dict(
+            title="Data",
+            type="date",
+            range=[mapa["inicio_ms"], mapa["fim_ms"]],
+            showgrid=False,
+            color="#f0f2f6"
+        ),
+        font=dict(
+            family="Inter, sans-serif",
+            size=12,
+            color="#f0f2f6"
+        )
+    )
+    
+    return fig
+
+@st.fragment
+def grafico_superficie(df, titulo, pais, chave):
+    """Superfície 3D ou mapa de calor em fragmento (interações não refazem a página inteira)"""
+    modo = st.radio("Visualização", ["Superfície 3D", "Mapa de calor"], horizontal=True,
+                    key=f"modo_superficie_{chave}")
+    
+    if modo == "Mapa de calor":
+        primeira_data, ultima_data = df.index.min().date(), df.index.max().date()
+        inicio, fim = st.slider(
+            "Janela de datas",
+            min_value=primeira_data,
+            max_value=ultima_data,
+            value=(primeira_data, ultima_data),
+            format="DD/MM/YYYY",
+            key=f"janela_mapa_{chave}"
+        )
+        if inicio >= fim:
+            st.warning("Escolha uma janela com pelo menos dois dias")
+            return
+        mapa = carregar_mapa_calor(monitor_dados().versao, chave, inicio, fim)
+        if mapa is None:
+            st.warning("Não há dados na janela escolhida")
+            return
+        st.plotly_chart(plot_mapa_calor(mapa, titulo), use_container_width=True, config={
+            "displayModeBar": True,
+            "displaylogo": False,
+            "modeBarButtonsToRemove": ["lasso2d", "select2d"]
+        })
+        return
+    
+    fig = plot_superficie_3d(df, titulo, pais)
+    if fig:
         # Ajusta para mobile
-        fig_br.update_layout(
+        fig.update_layout(
             height=get_responsive_height("superficie"),
             margin=dict(l=10, r=10, t=40, b=10),
             scene=dict(
@@ -923,24 +1906,49 @@ def mostrar_superficie_brasil(dados):
                 )
             )
         )
-        st.plotly_chart(fig_br, use_container_width=True, config={
+        st.plotly_chart(fig, use_container_width=True, config={
             "displayModeBar": True,
             "displaylogo": False,
             "modeBarButtonsToRemove": ["pan2d", "lasso2d", "select2d"]
         })
+
+def mostrar_superficie_brasil(dados):
+    """Mostra superfície 3D do Brasil"""
+    if dados["brasil"] is None:
+        st.error("Dados do Brasil não disponíveis")
+        return
+    
+    st.markdown("## Superfície de Juros - Brasil 🇧🇷")
+    st.markdown("Visualize a evolução temporal completa das curvas de juros brasileiras em três dimensões.")
+    
+    # Grade padrão ou densa (as duas já vêm prontas do processamento)
+    chave = "brasil"
+    if dados["brasil_denso"] is not None:
+        passo = int(dados["brasil_denso"].columns[-1].split("_")[0])
+        resolucao = st.radio(
+            "Resolução",
+            [f"Padrão ({dados['brasil'].shape[1]} vértices)", f"Densa (a cada {passo} DU)"],
+            horizontal=True,
+            key="resolucao_brasil"
+        )
+        if resolucao.startswith("Densa"):
+            chave = "brasil_denso"
+    
+    grafico_superficie(dados[chave], "Superfície de Juros - Brasil", "Brasil", chave)
     
     # Seção de download dos dados
     st.markdown("### Download dos Dados")
     st.markdown("Baixe os dados históricos utilizados nesta análise:")
     
     # Converte para CSV para download
-    df = dados["brasil"]
+    df = dados[chave]
     csv_data = df.to_csv().encode("utf-8")
     st.download_button(
         label="Baixar dados do Brasil (CSV)",
         data=csv_data,
         file_name=f"juros_brasil_historico_{datetime.now().strftime("%Y%m%d")}.csv",
-        mime="text/csv"
+        mime="text/csv",
+        on_click="ignore"
     )
 
 def mostrar_superficie_eua(dados):
@@ -952,23 +1960,7 @@ def mostrar_superficie_eua(dados):
     st.markdown("## Superfície de Juros - EUA 🇺🇸")
     st.markdown("Visualize a evolução temporal completa das curvas de juros americanas em três dimensões.")
     
-    fig_us = plot_superficie_3d(dados["eua"], "Superfície de Juros - EUA", "EUA")
-    if fig_us:
-        # Ajusta para mobile
-        fig_us.update_layout(
-            height=get_responsive_height("superficie"),
-            margin=dict(l=10, r=10, t=40, b=10),
-            scene=dict(
-                camera=dict(
-                    eye=dict(x=1.3, y=1.3, z=1.1)  # Câmera mais próxima para mobile
-                )
-            )
-        )
-        st.plotly_chart(fig_us, use_container_width=True, config={
-            "displayModeBar": True,
-            "displaylogo": False,
-            "modeBarButtonsToRemove": ["pan2d", "lasso2d", "select2d"]
-        })
+    grafico_superficie(dados["eua"], "Superfície de Juros - EUA", "EUA", "eua")
     
     # Seção de download dos dados
     st.markdown("### Download dos Dados")
@@ -981,10 +1973,50 @@ def mostrar_superficie_eua(dados):
         label="Baixar dados dos EUA (CSV)",
         data=csv_data,
         file_name=f"juros_eua_historico_{datetime.now().strftime("%Y%m%d")}.csv",
-        mime="text/csv"
+        mime="text/csv",
+        on_click="ignore"
     )
 
-def criar_dashboard_comparativo(dados):
+def mostrar_superficie_forward(dados):
+    """Mostra superfície 3D das taxas a termo (forwards) entre vértices DI1"""
+    if dados["brasil_forward"] is None:
+        st.error("Forwards do Brasil não disponíveis. Execute o script de processamento.")
+        return
+    
+    st.markdown("## Superfície de Forwards - Brasil 🇧🇷")
+    st.markdown("Taxas a termo implícitas entre vértices consecutivos da curva DI1, ao longo do tempo.")
+    
+    grafico_superficie(dados["brasil_forward"], "Superfície de Forwards - Brasil", "Brasil", "brasil_forward")
+    
+    # Seção de download dos dados
+    st.markdown("### Download dos Dados")
+    st.markdown("Baixe os dados históricos utilizados nesta análise:")
+    
+    st.download_button(
+        label="Baixar forwards do Brasil (CSV)",
+        data=lambda: dados["brasil_forward"].to_csv().encode("utf-8"),
+        file_name=f"forwards_brasil_historico_{datetime.now().strftime("%Y%m%d")}.csv",
+        mime="text/csv",
+        on_click="ignore"
+    )
+
+def mostrar_spreads(spreads, escala):
+    """Mostra os spreads do snapshot como métricas (em pontos percentuais)"""
+    itens = [(nome, valor) for nome, valor in spreads.items() if valor and valor["valor"] is not None]
+    if not itens:
+        return
+    
+    colunas = st.columns(len(itens))
+    for coluna, (nome, valor) in zip(colunas, itens):
+        variacao = valor["variacao"]
+        coluna.metric(
+            f"Spread {nome}",
+            f"{valor['valor'] * escala:.2f} p.p.",
+            f"{variacao * escala:+.2f} p.p." if variacao is not None else None
+        )
+
+@st.fragment
+def criar_dashboard_comparativo(snapshot=None):
     """Cria dashboard com comparação visual entre Brasil e EUA"""
     st.markdown("## 📊 Dashboard Comparativo Brasil vs EUA")
     st.markdown("Visualize simultaneamente as curvas e superfícies de juros dos dois países.")
@@ -997,30 +2029,38 @@ def criar_dashboard_comparativo(dados):
     )
     
     if tipo_vis == "Curvas Comparativas":
+        # As duas últimas curvas de cada país vêm do snapshot, quando disponível
+        snap_br = snapshot["brasil"] if snapshot else None
+        snap_eua = snapshot["eua"] if snapshot else None
         
         col1, col2 = st.columns(2)
         
         with col1:
-            if dados["brasil_bruto"] is not None:
-                di1_curve = processar_dados_brasil_historico(dados["brasil_bruto"])
-                if di1_curve is not None:
-                    datas = sorted(di1_curve["DataRef"].unique())
-                    if len(datas) >= 2:
-                        fig_br = plot_curva_di1_plotly(di1_curve, datas[-2], datas[-1])
-                        if fig_br:
-                            fig_br.update_layout(height=get_responsive_height("dashboard"), margin=dict(l=10, r=10, t=30, b=10))
-                            st.plotly_chart(fig_br, use_container_width=True, key="dash_br")
+            di1_curve = snap_br["curvas"] if snap_br else obter_curva_brasil()
+            if di1_curve is not None:
+                datas = sorted(di1_curve["DataRef"].unique())
+                if len(datas) >= 2:
+                    fig_br = plot_curva_di1_plotly(di1_curve, datas[-2], datas[-1])
+                    if fig_br:
+                        fig_br.update_layout(height=get_responsive_height("dashboard"), margin=dict(l=10, r=10, t=30, b=10))
+                        st.plotly_chart(fig_br, use_container_width=True, key="dash_br")
+            if snap_br:
+                mostrar_spreads(snap_br["spreads"], escala=100)
         
         with col2:
-            if dados["eua"] is not None:
-                datas_eua = sorted(dados["eua"].index)
+            df_eua = snap_eua["curvas"] if snap_eua else obter_dados()["eua"]
+            if df_eua is not None:
+                datas_eua = sorted(df_eua.index)
                 if len(datas_eua) >= 2:
-                    fig_eua = plot_curva_eua_plotly(dados["eua"], datas_eua[-2], datas_eua[-1])
+                    fig_eua = plot_curva_eua_plotly(df_eua, datas_eua[-2], datas_eua[-1])
                     if fig_eua:
                         fig_eua.update_layout(height=get_responsive_height("dashboard"), margin=dict(l=10, r=10, t=30, b=10))
                         st.plotly_chart(fig_eua, use_container_width=True, key="dash_eua")
+            if snap_eua:
+                mostrar_spreads(snap_eua["spreads"], escala=1)
     
     else:  # Superfícies 3D
+        dados = obter_dados()
         
         col1, col2 = st.columns(2)
         
@@ -1069,40 +2109,29 @@ def criar_dashboard_comparativo(dados):
 def main():
     """Função principal do app"""
     
-    # Detectar dispositivo para otimizações específicas
-    st.markdown("""
-    <script>
-        // Detecta dispositivo e salva para uso no app
-        document.addEventListener("DOMContentLoaded", function() {
-            const isMobile = window.innerWidth <= 768;
-            const isSmallMobile = window.innerWidth <= 480;
-            
-            // Armazena para uso pelo Python via sessionState
-            window.parent.postMessage({
-                type: "streamlit:setComponentValue",
-                value: {
-                    isMobile: isMobile,
-                    isSmallMobile: isSmallMobile,
-                    viewportWidth: window.innerWidth
-                }
-            }, "*");
-            
-            // Ajusta zoom para melhor visualização mobile
-            if (isSmallMobile) {
-                document.querySelector(".main").style.zoom = "0.9";
-            }
-        });
-    </script>
-    """, unsafe_allow_html=True)
+    # Estilos e scripts estáticos
+    injetar_estilos()
+    
+    # Carrega o snapshot leve; a base completa só é lida quando necessária
+    snapshot = obter_snapshot()
     
-    # Carrega dados
-    with st.spinner("Carregando dados..."):
-        dados = carregar_dados()
+    if snapshot is not None:
+        tem_brasil = snapshot["brasil"] is not None
+        tem_eua = snapshot["eua"] is not None
+    else:
+        with st.spinner("Carregando dados..."):
+            dados = obter_dados()
+        tem_brasil = dados["brasil"] is not None
+        tem_eua = dados["eua"] is not None
     
     # Verifica se há dados disponíveis
-    if dados["brasil"] is None and dados["eua"] is None:
+    if not tem_brasil and not tem_eua:
         st.error("Nenhum dado disponível. Execute os scripts de coleta e processamento primeiro.")
         return
+    if not tem_brasil:
+        st.warning("⚠️ Dados do Brasil não encontrados. Execute o script de coleta e processamento primeiro.")
+    if not tem_eua:
+        st.warning("⚠️ Dados dos EUA não encontrados. Execute o script de coleta e processamento primeiro.")
 
     # Header customizado sem logo
     st.markdown("""
@@ -1196,7 +2225,7 @@ def main():
     """, unsafe_allow_html=True)
     
     # Criação dos botões usando colunas do Streamlit
-    col1, col2, col3, col4 = st.columns(4)
+    col1, col2, col3, col4, col5 = st.columns(5)
     
     with col1:
         if st.button("📊 Curvas Brasil", key="btn_curvas_br", 
@@ -1225,6 +2254,13 @@ def main():
                     use_container_width=True):
             st.session_state.visualizacao_ativa = "superficie_eua"
             st.rerun()
+    
+    with col5:
+        if st.button("📐 Forwards Brasil", key="btn_fwd_br",
+                    help="Visualizar superfície de taxas a termo entre vértices DI1",
+                    use_container_width=True):
+            st.session_state.visualizacao_ativa = "forward_brasil"
+            st.rerun()
 
     # Estado para controlar qual visualização está ativa
     if "visualizacao_ativa" not in st.session_state:
@@ -1244,15 +2280,17 @@ def main():
     
     # Conteúdo principal baseado na seleção
     if st.session_state.visualizacao_ativa == "historica_brasil":
-        mostrar_historica_brasil(dados)
+        mostrar_historica_brasil(snapshot)
     elif st.session_state.visualizacao_ativa == "historica_eua":
-        mostrar_historica_eua(dados)
+        mostrar_historica_eua(obter_dados())
     elif st.session_state.visualizacao_ativa == "superficie_brasil":
-        mostrar_superficie_brasil(dados)
+        mostrar_superficie_brasil(obter_dados())
     elif st.session_state.visualizacao_ativa == "superficie_eua":
-        mostrar_superficie_eua(dados)
+        mostrar_superficie_eua(obter_dados())
+    elif st.session_state.visualizacao_ativa == "forward_brasil":
+        mostrar_superficie_forward(obter_dados())
     else:
-        mostrar_historica_brasil(dados)  # Default para curva Brasil
+        mostrar_historica_brasil(snapshot)  # Default para curva Brasil
 
 
 if __name__ == "__main__":
@@ -0,0 +1,242 @@
+"""
+Ajuste Nelson-Siegel-Svensson - Superfície de Juros
+Ajusta curvas paramétricas NSS a todas as datas de referência do Brasil (vértices
+DI1) e dos EUA (tenores do Tesouro), usando os parâmetros do dia anterior como
+ponto de partida e blocos de datas em paralelo.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from bizdays import Calendar
+from scipy.optimize import least_squares
+
+from armazenamento import escrever_parquet
+from base_bruta import ler_base
+
+PARAMETROS = ['beta0', 'beta1', 'beta2', 'beta3', 'lambda1', 'lambda2']
+
+# Limites de lambda1 (em anos) e da razão lambda2 / lambda1; manter os dois
+# lambdas afastados evita fatores de curvatura colineares (betas explosivos).
+# Os betas saem de mínimos quadrados lineares.
+LAMBDA_MINIMO = 0.05
+LAMBDA_MAXIMO = 30.0
+RAZAO_MINIMA = 2.0
+RAZAO_MAXIMA = 20.0
+
+# Penalidade (ridge) sobre beta1..beta3: evita que fatores quase colineares
+# compensem um ao outro com betas enormes, com efeito desprezível no erro
+PENALIDADE_BETAS = 1e-3
+
+# Pares (lambda1, lambda2) testados quando não há ponto de partida
+LAMBDAS_INICIAIS = [(0.5, 3.0), (1.5, 5.0), (3.0, 10.0)]
+
+# Datas por bloco: cada bloco é ajustado em sequência (partida quente) em um processo
+TAMANHO_BLOCO = 250
+
+# Erro (RMSE, decimal) acima do qual a partida quente é refeita a frio
+LIMITE_RMSE_QUENTE = 0.0005
+
+# Prazos dos vértices dos EUA em anos
+PRAZOS_EUA_ANOS = {"1M": 1 / 12, "3M": 0.25, "6M": 0.5, "1Y": 1, "2Y": 2, "3Y": 3, "5Y": 5, "10Y": 10, "30Y": 30}
+
+CAMINHOS_NSS = {
+    'brasil': 'Dados/nss_brasil.parquet',
+    'eua': 'Dados/nss_eua.parquet',
+}
+
+def _fatores(prazos, l1, l2):
+    """Matriz de fatores NSS (nível, inclinação, curvatura 1 e 2) nos prazos"""
+    x1 = prazos / l1
+    x2 = prazos / l2
+    e1 = np.exp(-x1)
+    e2 = np.exp(-x2)
+    f1 = (1 - e1) / x1
+    f2 = (1 - e2) / x2
+    return np.column_stack([np.ones_like(prazos), f1, f1 - e1, f2 - e2])
+
+def curva_nss(parametros, prazos):
+    """Taxa NSS nos prazos (em anos) para um vetor de parâmetros"""
+    b0, b1, b2, b3, l1, l2 = parametros
+    return _fatores(np.asarray(prazos, dtype=np.float64), l1, l2) @ np.array([b0, b1, b2, b3])
+
+_RIDGE = PENALIDADE_BETAS * np.eye(4)[1:]
+
+def _betas(x, prazos, taxas):
+    l1, razao = x
+    fatores = _fatores(prazos, l1, l1 * razao)
+    sistema = np.vstack([fatores, _RIDGE])
+    betas = np.linalg.lstsq(sistema, np.concatenate([taxas, np.zeros(3)]), rcond=None)[0]
+    return betas, fatores @ betas - taxas
+
+def _residuos(x, prazos, taxas):
+    betas, residuos = _betas(x, prazos, taxas)
+    return np.concatenate([residuos, PENALIDADE_BETAS * betas[1:]])
+
+def _otimizar(lambdas, prazos, taxas):
+    """
+    Ajusta lambda1 e a razão lambda2 / lambda1 por mínimos quadrados não lineares;
+    para cada par os betas são a solução linear exata (projeção de variáveis).
+    """
+    l1, l2 = lambdas
+    inicial = np.array([np.clip(l1, LAMBDA_MINIMO, LAMBDA_MAXIMO), np.clip(l2 / l1, RAZAO_MINIMA, RAZAO_MAXIMA)])
+    resultado = least_squares(
+        _residuos, inicial, bounds=([LAMBDA_MINIMO, RAZAO_MINIMA], [LAMBDA_MAXIMO, RAZAO_MAXIMA]),
+        args=(prazos, taxas), method='trf'
+    )
+    betas, residuos = _betas(resultado.x, prazos, taxas)
+    rmse = float(np.sqrt(np.mean(residuos ** 2)))
+    l1, razao = resultado.x
+    return np.concatenate([betas, [l1, l1 * razao]]), rmse
+
+def ajuste_frio(prazos, taxas):
+    """Ajuste sem ponto de partida: testa alguns pares de lambdas e fica com o melhor"""
+    melhor = None
+    for lambdas in LAMBDAS_INICIAIS:
+        parametros, rmse = _otimizar(np.array(lambdas), prazos, taxas)
+        if melhor is None or rmse < melhor[1]:
+            melhor = (parametros, rmse)
+    return melhor
+
+def ajustar_data(prazos, taxas, inicial=None, rmse_anterior=None):
+    """
+    Ajusta uma curva partindo dos lambdas de `inicial` (data anterior).
+
+    Sem ponto de partida, ou se o erro piorar muito em relação à data anterior,
+    recorre ao ajuste a frio e fica com o melhor resultado.
+    """
+    if inicial is None:
+        return ajuste_frio(prazos, taxas)
+
+    parametros, rmse = _otimizar(inicial[4:], prazos, taxas)
+    limite = max(LIMITE_RMSE_QUENTE, 2 * rmse_anterior) if rmse_anterior else LIMITE_RMSE_QUENTE
+    if rmse > limite:
+        frio = ajuste_frio(prazos, taxas)
+        if frio[1] < rmse:
+            return frio
+    return parametros, rmse
+
+def ajustar_bloco(bloco):
+    """
+    Ajusta em sequência as curvas de um bloco de datas contíguas.
+
+    `bloco` é (datas, lista de (prazos, taxas), parâmetros iniciais ou None).
+    Retorna uma matriz len(datas) x (parâmetros + rmse + número de pontos).
+    """
+    datas, curvas, inicial = bloco
+    linhas = np.full((len(datas), len(PARAMETROS) + 2), np.nan)
+    rmse = None
+    for i, (prazos, taxas) in enumerate(curvas):
+        if len(prazos) < len(PARAMETROS):
+            continue
+        parametros, rmse = ajustar_data(prazos, taxas, inicial, rmse)
+        linhas[i, :len(PARAMETROS)] = parametros
+        linhas[i, -2] = rmse
+        linhas[i, -1] = len(prazos)
+        inicial = parametros
+    return linhas
+
+def pontos_brasil(caminho='Dados/Base_Bruta.parquet'):
+    """Vértices DI1 (prazo em anos, taxa decimal) de cada data da base bruta"""
+    di1 = ler_base(caminho, colunas=['DataRef', 'Vencimento', 'PUAtual'])
+
+    # Vencimento no próximo dia útil e dias úteis até ele (calendário ANBIMA)
+    feriados = np.array(Calendar.load('ANBIMA').holidays, dtype='datetime64[D]')
+    referencia = di1['DataRef'].to_numpy(dtype='datetime64[D]')
+    vencimento = np.busday_offset(di1['Vencimento'].to_numpy(dtype='datetime64[D]'), 0,
+                                  roll='forward', holidays=feriados)
+    du = np.busday_count(referencia, vencimento, holidays=feriados)
+
+    curvas = pd.DataFrame({'DataRef': di1['DataRef'].to_numpy(), 'DU': du, 'PU': di1['PUAtual'].to_numpy()})
+    curvas = curvas[curvas['DU'] > 0].drop_duplicates(['DataRef', 'DU'])
+    curvas['Rate'] = (100000 / curvas['PU']) ** (252 / curvas['DU']) - 1
+    curvas = curvas[np.isfinite(curvas['Rate'])].sort_values(['DataRef', 'DU'])
+
+    return _agrupar_por_data(curvas['DataRef'].to_numpy(), curvas['DU'].to_numpy() / 252,
+                             curvas['Rate'].to_numpy())
+
+def pontos_eua(caminho='Dados/juros_eua_processado.parquet'):
+    """Tenores do Tesouro americano (prazo em anos, taxa decimal) de cada data"""
+    df = pd.read_parquet(caminho).sort_index()
+    colunas = [c for c in df.columns if c in PRAZOS_EUA_ANOS]
+    prazos = np.array([PRAZOS_EUA_ANOS[c] for c in colunas])
+    valores = df[colunas].to_numpy(dtype=np.float64) / 100
+
+    validos = np.isfinite(valores)
+    linhas, colunas_validas = np.nonzero(validos)
+    return _agrupar_por_data(df.index.to_numpy()[linhas], prazos[colunas_validas], valores[validos])
+
+def _agrupar_por_data(datas, prazos, taxas):
+    """Separa vetores ordenados por data em (datas únicas, lista de (prazos, taxas))"""
+    unicas, inicios = np.unique(datas, return_index=True)
+    return pd.DatetimeIndex(unicas), list(zip(np.split(prazos, inicios[1:]), np.split(taxas, inicios[1:])))
+
+def ajustar_mercado(datas, curvas, inicial=None, processos=None, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Ajusta todas as curvas, em blocos contíguos de datas distribuídos em processos.
+
+    Dentro de cada bloco a partida é quente (parâmetros da data anterior); o
+    primeiro bloco parte de `inicial`, os demais a frio. Os blocos têm tamanho
+    fixo, então o resultado não depende do número de processos.
+    """
+    blocos = [
+        (datas[i:i + tamanho_bloco], curvas[i:i + tamanho_bloco], inicial if i == 0 else None)
+        for i in range(0, len(datas), tamanho_bloco)
+    ]
+    if processos == 1 or len(blocos) == 1:
+        resultados = [ajustar_bloco(b) for b in blocos]
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            resultados = list(executor.map(ajustar_bloco, blocos))
+
+    linhas = np.vstack(resultados) if resultados else np.empty((0, len(PARAMETROS) + 2))
+    parametros = pd.DataFrame(linhas, index=pd.DatetimeIndex(datas, name='Data'),
+                              columns=PARAMETROS + ['rmse', 'n_pontos'])
+    return parametros.dropna(subset=['rmse'])
+
+def processa_nss(mercado, refazer=False, processos=None):
+    """
+    Ajusta o NSS de um mercado ('brasil' ou 'eua') e salva a série de parâmetros.
+
+    Sem `refazer`, só as datas posteriores à última já ajustada são processadas,
+    partindo dos parâmetros dessa última data.
+    """
+    print(f"Ajustando curvas NSS ({mercado})...")
+
+    origem = 'Dados/Base_Bruta.parquet' if mercado == 'brasil' else 'Dados/juros_eua_processado.parquet'
+    if not os.path.exists(origem):
+        print(f"Arquivo não encontrado: {origem}")
+        return None
+
+    datas, curvas = pontos_brasil(origem) if mercado == 'brasil' else pontos_eua(origem)
+
+    caminho = CAMINHOS_NSS[mercado]
+    existentes = None
+    inicial = None
+    if not refazer and os.path.exists(caminho):
+        existentes = pd.read_parquet(caminho)
+        if not existentes.empty:
+            novas = datas > existentes.index[-1]
+            datas = datas[novas]
+            curvas = [c for c, nova in zip(curvas, novas) if nova]
+            inicial = existentes[PARAMETROS].iloc[-1].to_numpy()
+
+    if len(datas) == 0:
+        print(f"Nenhuma data nova para ajustar ({mercado})")
+        return existentes
+
+    inicio = time.perf_counter()
+    parametros = ajustar_mercado(datas, curvas, inicial=inicial, processos=processos)
+    duracao = time.perf_counter() - inicio
+
+    if existentes is not None:
+        parametros = pd.concat([existentes, parametros])
+
+    escrever_parquet(parametros, caminho)
+    print(f"{len(datas)} curvas ajustadas em {duracao:.1f}s ({len(datas) / duracao:.0f} curvas/s)")
+    print(f"Parâmetros NSS salvos: {caminho} (RMSE mediano {parametros['rmse'].median() * 1e4:.1f} bp)")
+
+    return parametros
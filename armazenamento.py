@@ -0,0 +1,337 @@
+"""
+Armazenamento - Superfície de Juros
+Funções compartilhadas de acesso aos arquivos da pasta Dados/
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PASTA_DADOS = 'Dados'
+CAMINHO_MANIFESTO = os.path.join(PASTA_DADOS, 'manifesto.json')
+
+# Cotações do pregão em andamento (coleta_intradiaria.py), fora da versão dos dados
+PASTA_INTRADIARIO = os.path.join(PASTA_DADOS, 'intradiario')
+
+# Linhas por grupo nos arquivos indexados por data (~2 anos de pregões). Cada
+# grupo custa uma leitura por coluna: grupos menores deixam a leitura completa
+# dos arquivos largos (grade densa, Copom) bem mais lenta.
+LINHAS_POR_GRUPO = 504
+
+# Arquivos que compõem uma versão dos dados
+ARQUIVOS_DADOS = [
+    os.path.join(PASTA_DADOS, 'Base_Bruta.parquet'),
+    os.path.join(PASTA_DADOS, 'juros_brasil_processado.parquet'),
+    os.path.join(PASTA_DADOS, 'juros_brasil_denso.parquet'),
+    os.path.join(PASTA_DADOS, 'juros_brasil_forward.parquet'),
+    os.path.join(PASTA_DADOS, 'Base_Bruta_DAP.parquet'),
+    os.path.join(PASTA_DADOS, 'Base_Bruta_DDI.parquet'),
+    os.path.join(PASTA_DADOS, 'juros_dap_processado.parquet'),
+    os.path.join(PASTA_DADOS, 'juros_ddi_processado.parquet'),
+    os.path.join(PASTA_DADOS, 'inflacao_implicita.parquet'),
+    os.path.join(PASTA_DADOS, 'juros_eua_bruto.parquet'),
+    os.path.join(PASTA_DADOS, 'juros_eua_processado.parquet'),
+    os.path.join(PASTA_DADOS, 'nss_brasil.parquet'),
+    os.path.join(PASTA_DADOS, 'nss_eua.parquet'),
+    os.path.join(PASTA_DADOS, 'pca_brasil_estado.json'),
+    os.path.join(PASTA_DADOS, 'pca_brasil_fatores.parquet'),
+    os.path.join(PASTA_DADOS, 'pca_eua_estado.json'),
+    os.path.join(PASTA_DADOS, 'pca_eua_fatores.parquet'),
+    os.path.join(PASTA_DADOS, 'metricas_brasil.parquet'),
+    os.path.join(PASTA_DADOS, 'metricas_eua.parquet'),
+    os.path.join(PASTA_DADOS, 'copom_implicito.parquet'),
+    os.path.join(PASTA_DADOS, 'snapshot_recente.json'),
+]
+
+# Registrados no manifesto, mas fora do cálculo da versão: o snapshot guarda a
+# versão dos dados de que foi gerado e não pode fazer parte dela
+ARQUIVOS_FORA_DA_VERSAO = [
+    os.path.join(PASTA_DADOS, 'snapshot_recente.json'),
+]
+
+def hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    """Calcula o SHA-256 do conteúdo de um arquivo"""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+def escrever_json_atomico(caminho, conteudo):
+    """Grava JSON em arquivo temporário e substitui o destino de uma vez"""
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(conteudo, f, indent=2, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+def escrever_parquet(df, caminho, linhas_por_grupo=LINHAS_POR_GRUPO):
+    """
+    Grava um DataFrame indexado por data no layout de leitura: linhas ordenadas
+    pela data, grupos de linhas de tamanho fixo, zstd, estatísticas por coluna
+    e índice de páginas. Com as estatísticas, `ler_parquet()` pula os grupos
+    fora do intervalo de datas pedido. A escrita é atômica.
+
+    Os grupos são contados a partir da data mais recente (o grupo incompleto
+    é o mais antigo), então consultas dos últimos anos leem grupos inteiros.
+    """
+    tabela = pa.Table.from_pandas(df.sort_index(kind='stable'))
+    escrever_parquet_lotes([tabela], caminho, tabela.num_rows, linhas_por_grupo)
+
+def escrever_parquet_lotes(tabelas, caminho, n_linhas, linhas_por_grupo=LINHAS_POR_GRUPO):
+    """
+    Mesmo layout de `escrever_parquet()` a partir de tabelas Arrow já em ordem
+    de data, consumidas uma a uma (a memória fica em um grupo de linhas).
+    `n_linhas` é o total de linhas, para alinhar os grupos ao fim do arquivo.
+    """
+    temporario = f"{caminho}.tmp"
+    escritor = None
+    pendentes, linhas_pendentes = [], 0
+    proximo = n_linhas % linhas_por_grupo or linhas_por_grupo
+    try:
+        for tabela in tabelas:
+            if escritor is None:
+                esquema = tabela.schema
+                escritor = pq.ParquetWriter(temporario, esquema, compression='zstd',
+                                            write_statistics=True, write_page_index=True)
+            pendentes.append(tabela.cast(esquema))
+            linhas_pendentes += tabela.num_rows
+            while linhas_pendentes >= proximo:
+                junta = pa.concat_tables(pendentes)
+                escritor.write_table(junta.slice(0, proximo), row_group_size=proximo)
+                pendentes, linhas_pendentes = [junta.slice(proximo)], linhas_pendentes - proximo
+                proximo = linhas_por_grupo
+        if escritor is None:
+            raise ValueError(f"Nenhuma tabela para gravar em {caminho}")
+        if linhas_pendentes:
+            escritor.write_table(pa.concat_tables(pendentes))
+    finally:
+        if escritor is not None:
+            escritor.close()
+    os.replace(temporario, caminho)
+
+def filtros_datas(coluna, inicio=None, fim=None):
+    """Predicados [inicio, fim] sobre uma coluna de datas, no formato de `filters` do pyarrow"""
+    filtros = []
+    if inicio is not None:
+        filtros.append((coluna, '>=', pd.Timestamp(inicio)))
+    if fim is not None:
+        filtros.append((coluna, '<=', pd.Timestamp(fim)))
+    return filtros or None
+
+def ler_parquet(caminho, inicio=None, fim=None, colunas=None):
+    """
+    Lê um arquivo indexado por data só no intervalo [inicio, fim].
+
+    O predicado vai para o leitor do pyarrow, que descarta pelas estatísticas
+    os grupos de linhas fora do intervalo sem descomprimi-los; em arquivos
+    gravados por `escrever_parquet()` só os grupos do intervalo são lidos.
+    """
+    indice = pq.read_schema(caminho).pandas_metadata['index_columns'][0]
+    return pd.read_parquet(caminho, columns=colunas, filters=filtros_datas(indice, inicio, fim))
+
+def caminho_intradiario(data=None, pasta=PASTA_INTRADIARIO):
+    """Arquivo (JSON Lines, uma mudança de cotação por linha) do pregão de `data` (hoje)"""
+    return os.path.join(pasta, f'{data or datetime.date.today():%Y-%m-%d}.jsonl')
+
+def ler_manifesto(caminho=CAMINHO_MANIFESTO):
+    """Lê o manifesto dos dados; retorna None se não existir ou estiver inválido"""
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def versao_hashes(hashes):
+    """Versão dos dados a partir do hash de cada arquivo ({caminho: sha256})"""
+    return hashlib.sha256(
+        json.dumps({a: h for a, h in hashes.items() if a not in ARQUIVOS_FORA_DA_VERSAO}, sort_keys=True).encode()
+    ).hexdigest()[:16]
+
+def versao_dados(arquivos=None):
+    """Versão que `atualizar_manifesto()` registrará para os arquivos atuais, sem gravar o manifesto"""
+    arquivos = ARQUIVOS_DADOS if arquivos is None else arquivos
+    return versao_hashes({
+        a: hash_arquivo(a) for a in arquivos if a not in ARQUIVOS_FORA_DA_VERSAO and os.path.exists(a)
+    })
+
+def atualizar_manifesto(arquivos=None, caminho=CAMINHO_MANIFESTO):
+    """Registra mtime, tamanho e hash de cada arquivo e a versão resultante"""
+    arquivos = ARQUIVOS_DADOS if arquivos is None else arquivos
+    entradas = {}
+    for arquivo in arquivos:
+        if not os.path.exists(arquivo):
+            continue
+        info = os.stat(arquivo)
+        entradas[arquivo] = {
+            'mtime_ns': info.st_mtime_ns,
+            'tamanho': info.st_size,
+            'sha256': hash_arquivo(arquivo),
+        }
+
+    versao = versao_hashes({a: e['sha256'] for a, e in entradas.items()})
+
+    manifesto = {'versao': versao, 'arquivos': entradas}
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    escrever_json_atomico(caminho, manifesto)
+    print(f"Manifesto atualizado: {caminho} (versão {versao})")
+    return manifesto
+
+# Hash de conteúdo já calculado por (arquivo, mtime, tamanho), para conferir
+# uma única vez arquivos com mtime diferente do manifesto
+_hashes_conferidos = {}
+
+def _confere_manifesto(arquivo, estado, registro):
+    """True se o arquivo (mtime, tamanho) é o que o manifesto registrou"""
+    if estado is None or registro is None:
+        return estado is None and registro is None
+    mtime_ns, tamanho = estado
+    if registro.get('tamanho') != tamanho:
+        return False
+    if registro.get('mtime_ns') == mtime_ns:
+        return True
+    # Mesmo tamanho e outro mtime (por exemplo, um checkout novo do repositório):
+    # só o hash do conteúdo confirma o arquivo
+    chave = (arquivo, mtime_ns, tamanho)
+    if chave not in _hashes_conferidos:
+        _hashes_conferidos[chave] = hash_arquivo(arquivo)
+    return _hashes_conferidos[chave] == registro.get('sha256')
+
+def impressao_digital(arquivos=None, caminho_manifesto=CAMINHO_MANIFESTO):
+    """
+    Identifica a versão atual dos dados sem ler o conteúdo dos arquivos.
+
+    Usa a versão (hash de conteúdo) do manifesto quando mtime e tamanho de
+    cada arquivo conferem com ele. Um arquivo com o mesmo tamanho e outro
+    mtime tem o conteúdo conferido pelo hash uma vez por estado; qualquer
+    divergência faz a versão vir de mtime e tamanho de cada arquivo.
+    """
+    arquivos = ARQUIVOS_DADOS if arquivos is None else arquivos
+    estado = {}
+    for arquivo in arquivos:
+        try:
+            info = os.stat(arquivo)
+            estado[arquivo] = (info.st_mtime_ns, info.st_size)
+        except OSError:
+            estado[arquivo] = None
+
+    manifesto = ler_manifesto(caminho_manifesto)
+    if manifesto is not None:
+        registrados = manifesto.get('arquivos', {})
+        if all(_confere_manifesto(a, estado[a], registrados.get(a)) for a in arquivos):
+            return manifesto['versao']
+
+    return 'stat-' + hashlib.sha256(repr(sorted(estado.items())).encode()).hexdigest()[:16]
+
+class MonitorDados:
+    """
+    Observa a impressão digital dos dados em segundo plano.
+
+    Quando os arquivos mudam, chama `pre_carregar(nova_versao)` (que deve deixar
+    os dados em cache) e só então troca `versao`, de forma que as sessões em
+    andamento continuem usando a versão anterior até o próximo rerun.
+    """
+
+    def __init__(self, pre_carregar, intervalo=30, arquivos=None):
+        self.pre_carregar = pre_carregar
+        self.intervalo = intervalo
+        self.arquivos = arquivos
+        self.versao = impressao_digital(arquivos)
+        self._thread = threading.Thread(target=self._executar, name='monitor-dados', daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def verificar(self):
+        """Pré-carrega e ativa uma nova versão, se houver; retorna True se trocou"""
+        nova = impressao_digital(self.arquivos)
+        if nova == self.versao:
+            return False
+        try:
+            self.pre_carregar(nova)
+        except Exception as e:
+            # Arquivos possivelmente ainda sendo gravados; tenta no próximo ciclo
+            print(f"Falha ao pré-carregar versão {nova}: {e}")
+            return False
+        self.versao = nova
+        print(f"Dados atualizados para a versão {nova}")
+        return True
+
+    def _executar(self):
+        while True:
+            time.sleep(self.intervalo)
+            self.verificar()
+
+class MonitorIntradiario:
+    """
+    Acompanha o arquivo do pregão de hoje da coleta intradiária em segundo
+    plano e mantém a última cotação de cada contrato.
+
+    Cada verificação lê só os bytes acrescentados desde a anterior (até a
+    última linha completa), então o custo depende das mudanças e não do
+    tamanho do arquivo. `sequencia` aumenta a cada leitura com mudanças; as
+    cotações são trocadas de uma vez (dicionário novo), e quem já tem uma
+    referência continua com um estado consistente.
+    """
+
+    def __init__(self, intervalo=5, pasta=PASTA_INTRADIARIO):
+        self.intervalo = intervalo
+        self.pasta = pasta
+        self.cotacoes = {}  # (mercadoria, vencimento) -> (hora, taxa)
+        self.sequencia = 0
+        self.hora = None
+        self._caminho = None
+        self._posicao = 0
+        self._thread = threading.Thread(target=self._executar, name='monitor-intradiario', daemon=True)
+
+    def iniciar(self):
+        self.verificar()
+        self._thread.start()
+        return self
+
+    def verificar(self):
+        """Aplica as linhas novas do arquivo do dia; retorna True se houve mudanças"""
+        caminho = caminho_intradiario(pasta=self.pasta)
+        if caminho != self._caminho:
+            # Novo pregão: começa do zero
+            self._caminho, self._posicao = caminho, 0
+            self.cotacoes, self.hora = {}, None
+            self.sequencia += 1
+        try:
+            tamanho = os.path.getsize(caminho)
+        except OSError:
+            return False
+        if tamanho <= self._posicao:
+            return False
+
+        with open(caminho, 'rb') as f:
+            f.seek(self._posicao)
+            novos = f.read(tamanho - self._posicao)
+        completos = novos.rfind(b'\n') + 1
+        if not completos:
+            return False
+
+        cotacoes = dict(self.cotacoes)
+        for linha in novos[:completos].splitlines():
+            registro = json.loads(linha)
+            cotacoes[(registro['mercadoria'], registro['vencimento'])] = (registro['hora'], registro['taxa'])
+            self.hora = registro['hora']
+        self._posicao += completos
+        self.cotacoes = cotacoes
+        self.sequencia += 1
+        return True
+
+    def _executar(self):
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                self.verificar()
+            except (OSError, ValueError) as e:
+                print(f"Falha ao ler cotações intradiárias: {e}")
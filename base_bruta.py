@@ -0,0 +1,459 @@
+"""
+Base Bruta - Superfície de Juros
+Gravação da Base_Bruta.parquet com chave primária (DataRef, CDVencimento):
+um índice ordenado das chaves fica em arquivo ao lado da base, e a inserção
+de novos registros decide quais rejeitar ou substituir sem varrer a base; a
+gravação, porém, reescreve a base inteira em fluxo (um lote por vez) no
+esquema compacto, com custo proporcional ao tamanho dela.
+Cada mercadoria coletada (DI1, DAP, DDI) tem a sua base.
+"""
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from armazenamento import filtros_datas
+
+CAMINHO_BASE = 'Dados/Base_Bruta.parquet'
+
+# Mercadorias gravadas pela coleta, cada uma na sua base bruta; a do DI1 é
+# CAMINHO_BASE e as outras ficam ao lado dela (Base_Bruta_DAP.parquet...)
+MERCADORIAS = ('DI1', 'DAP', 'DDI')
+
+CODIGOS_MES = 'FGHJKMNQUVXZ'
+
+def padrao_ticker(mercadorias=MERCADORIAS):
+    """Tickers dos contratos futuros simples (DI1F26, DAPK27...), sem rolagens e opções"""
+    return re.compile(rf"^({'|'.join(map(re.escape, mercadorias))})([{CODIGOS_MES}]\d\d)$")
+
+# Linhas por lote na escrita em fluxo da base e por grupo de linhas no
+# arquivo (~1 ano de pregões com 30-40 vencimentos): uma leitura por
+# intervalo de datas descomprime só os grupos do intervalo
+TAMANHO_LOTE = 8192
+
+OPCOES_ESCRITA = {'compression': 'zstd', 'write_statistics': True, 'write_page_index': True}
+
+# Esquema compacto (versão 2). A versão 1 é o formato original: DataRef e date
+# repetindo a data, Vencimento como timestamp, códigos e mercadoria como texto
+# livre e índice do pandas gravado no arquivo.
+VERSAO_ESQUEMA = 2
+CHAVE_VERSAO = b'superficie_juros.versao_esquema'
+
+ESQUEMA_COMPACTO = pa.schema([
+    ('data_ref', pa.int32()),                               # dias desde 1970-01-01
+    ('mercadoria', pa.dictionary(pa.int8(), pa.string())),
+    ('vencimento', pa.int16()),                             # meses desde jan/2000 (F00 = 0)
+    ('pu_anterior', pa.float64()),
+    ('pu_atual', pa.float64()),
+    ('variacao', pa.float64()),
+], metadata={CHAVE_VERSAO: str(VERSAO_ESQUEMA).encode()})
+
+# Colunas do formato original e as colunas compactas de onde saem
+COLUNAS_LEGADAS = {
+    'DataRef': 'data_ref',
+    'Mercadoria': 'mercadoria',
+    'CDVencimento': 'vencimento',
+    'PUAnterior': 'pu_anterior',
+    'PUAtual': 'pu_atual',
+    'Variacao': 'variacao',
+    'Vencimento': 'vencimento',
+    'date': 'data_ref',
+}
+
+def caminho_mercadoria(mercadoria, caminho_base=CAMINHO_BASE):
+    """Base bruta de uma mercadoria, ao lado da base do DI1 (`caminho_base`)"""
+    if mercadoria == 'DI1':
+        return caminho_base
+    raiz, extensao = os.path.splitext(caminho_base)
+    return f'{raiz}_{mercadoria}{extensao}'
+
+def caminho_indice(caminho_base=CAMINHO_BASE):
+    return os.path.splitext(caminho_base)[0] + '.chaves.npy'
+
+def versao_esquema(caminho_base=CAMINHO_BASE):
+    """Versão do esquema gravada nos metadados do arquivo (1 se não houver)"""
+    metadados = pq.read_schema(caminho_base).metadata or {}
+    return int(metadados.get(CHAVE_VERSAO, b'1'))
+
+def codigos_vencimento(cd_vencimento):
+    """Códigos F26, G26... em meses desde jan/2000"""
+    codigo = pd.Series(cd_vencimento).astype(str).str.strip()
+    mes = codigo.str[-3].map(CODIGOS_MES.find).to_numpy(dtype=np.int64)
+    ano = pd.to_numeric(codigo.str[-2:], errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+    if (mes < 0).any() or (ano < 0).any():
+        raise ValueError("Código de vencimento inválido na base (esperado formato F26)")
+    return ano * 12 + mes
+
+def chaves(df):
+    """
+    Chave inteira de cada registro: dias desde 1970 da data de referência nos
+    bits altos e o vencimento (meses desde jan/2000) nos baixos. Aceita o
+    formato original ou o compacto.
+    """
+    if 'data_ref' in df:
+        return (df['data_ref'].to_numpy(dtype=np.int64) << 16) | df['vencimento'].to_numpy(dtype=np.int64)
+    dias = df['DataRef'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    return (dias << 16) | codigos_vencimento(df['CDVencimento'])
+
+def para_compacto(df):
+    """Tabela Arrow no esquema compacto a partir de registros no formato original"""
+    compacto = pd.DataFrame({
+        'data_ref': df['DataRef'].to_numpy(dtype='datetime64[D]').astype(np.int32),
+        'mercadoria': pd.Categorical(df['Mercadoria'].astype(str)),
+        'vencimento': codigos_vencimento(df['CDVencimento']).astype(np.int16),
+        'pu_anterior': df['PUAnterior'].to_numpy(dtype=np.float64),
+        'pu_atual': df['PUAtual'].to_numpy(dtype=np.float64),
+        'variacao': df['Variacao'].to_numpy(dtype=np.float64),
+    })
+    return pa.Table.from_pandas(compacto, schema=ESQUEMA_COMPACTO, preserve_index=False)
+
+def expandir(compacto, colunas=None):
+    """Registros compactos (DataFrame) no formato original, só nas colunas pedidas"""
+    colunas = list(COLUNAS_LEGADAS) if colunas is None else colunas
+    df = pd.DataFrame(index=pd.RangeIndex(len(compacto)))
+    for coluna in colunas:
+        if coluna == 'DataRef':
+            df[coluna] = compacto['data_ref'].to_numpy().astype('datetime64[D]').astype('datetime64[ns]')
+        elif coluna == 'date':
+            df[coluna] = compacto['data_ref'].to_numpy().astype('datetime64[D]').astype(object)
+        elif coluna == 'Mercadoria':
+            df[coluna] = compacto['mercadoria'].astype(str).to_numpy(dtype=object)
+        elif coluna == 'CDVencimento':
+            # Um rótulo por código distinto, espalhado pelo código de cada linha
+            distintos, posicao = np.unique(compacto['vencimento'].to_numpy(), return_inverse=True)
+            rotulos = np.array([f'{CODIGOS_MES[c % 12]}{c // 12 % 100:02d}' for c in distintos], dtype=object)
+            df[coluna] = rotulos[posicao]
+        elif coluna == 'Vencimento':
+            meses = np.datetime64('2000-01', 'M') + compacto['vencimento'].to_numpy().astype(np.int64)
+            df[coluna] = meses.astype('datetime64[D]').astype('datetime64[ns]')
+        else:
+            df[coluna] = compacto[COLUNAS_LEGADAS[coluna]].to_numpy()
+    return df
+
+def ler_base(caminho_base=CAMINHO_BASE, colunas=None, legado=True, inicio=None, fim=None):
+    """
+    Lê a base em qualquer versão do esquema.
+
+    Com `legado=True` devolve o formato original (DataRef, Mercadoria,
+    CDVencimento, PUAnterior, PUAtual, Variacao, Vencimento, date), só nas
+    `colunas` pedidas e lendo do arquivo apenas as colunas compactas
+    necessárias. Com `legado=False` devolve as colunas compactas.
+
+    `inicio` e `fim` restringem as datas de referência; o predicado vai para o
+    leitor, que pula os grupos de linhas fora do intervalo.
+    """
+    if versao_esquema(caminho_base) < VERSAO_ESQUEMA:
+        base = pd.read_parquet(caminho_base, columns=colunas if legado else None,
+                               filters=filtros_datas('DataRef', inicio, fim))
+        if legado:
+            return base.reset_index(drop=True)
+        return para_compacto(base).to_pandas()
+
+    filtros = []
+    if inicio is not None:
+        filtros.append(('data_ref', '>=', _dias(inicio)))
+    if fim is not None:
+        filtros.append(('data_ref', '<=', _dias(fim)))
+    if not legado:
+        return pd.read_parquet(caminho_base, columns=colunas, filters=filtros or None)
+    necessarias = sorted({COLUNAS_LEGADAS[c] for c in (colunas or COLUNAS_LEGADAS)})
+    return expandir(pd.read_parquet(caminho_base, columns=necessarias, filters=filtros or None), colunas)
+
+def anos(caminho_base=CAMINHO_BASE):
+    """Anos com datas de referência na base, lendo só a coluna de datas"""
+    coluna = 'DataRef' if versao_esquema(caminho_base) < VERSAO_ESQUEMA else 'data_ref'
+    datas = pq.read_table(caminho_base, columns=[coluna]).column(coluna).to_numpy().astype('datetime64[D]')
+    return [int(a) + 1970 for a in np.unique(datas.astype('datetime64[Y]').astype(np.int64))]
+
+def _dias(data):
+    return int(np.datetime64(pd.Timestamp(data).date(), 'D').astype(np.int64))
+
+def ler_base_em_blocos(caminho_base=CAMINHO_BASE, colunas=None, linhas_por_bloco=TAMANHO_LOTE):
+    """
+    Percorre a base em blocos de ~`linhas_por_bloco` linhas, no formato
+    original e só nas `colunas` pedidas, sem carregar o arquivo inteiro.
+
+    Cada bloco traz datas de referência completas: as linhas da última data de
+    um lote ficam para o bloco seguinte. Exige a base ordenada pela data, como
+    `compactar()` e `inserir()` a deixam; uma data fora de ordem é erro.
+    """
+    colunas = list(COLUNAS_LEGADAS) if colunas is None else colunas
+    if versao_esquema(caminho_base) < VERSAO_ESQUEMA:
+        coluna_data = 'DataRef'
+        leitura = sorted(set(colunas) | {coluna_data})
+        converter = lambda tabela: tabela.to_pandas()[colunas]
+    else:
+        coluna_data = 'data_ref'
+        leitura = sorted({COLUNAS_LEGADAS[c] for c in colunas} | {coluna_data})
+        converter = lambda tabela: expandir(tabela.to_pandas(), colunas)
+
+    pendente, anterior = None, None
+    for lote in pq.ParquetFile(caminho_base).iter_batches(batch_size=linhas_por_bloco, columns=leitura):
+        tabela = pa.Table.from_batches([lote])
+        if pendente is not None:
+            tabela = pa.concat_tables([pendente, tabela])
+        datas = tabela.column(coluna_data).to_numpy().astype('datetime64[D]')
+        if (anterior is not None and datas[0] < anterior) or (np.diff(datas) < np.timedelta64(0, 'D')).any():
+            raise ValueError(f"Base fora de ordem de data em {caminho_base}; rode base_bruta.compactar()")
+
+        # Linhas da última data esperam o próximo lote
+        corte = np.searchsorted(datas, datas[-1])
+        pendente = tabela.slice(corte)
+        if corte:
+            anterior = datas[corte - 1]
+            yield converter(tabela.slice(0, corte))
+
+    if pendente is not None and pendente.num_rows:
+        yield converter(pendente)
+
+def _gravar_indice(indice, caminho_base):
+    destino = caminho_indice(caminho_base)
+    temporario = destino + '.tmp'
+    with open(temporario, 'wb') as f:
+        np.save(f, indice)
+    os.replace(temporario, destino)
+
+def _gravar_base(tabela, caminho_base, tamanho_lote=TAMANHO_LOTE):
+    temporario = caminho_base + '.tmp'
+    pq.write_table(tabela, temporario, row_group_size=tamanho_lote, **OPCOES_ESCRITA)
+    os.replace(temporario, caminho_base)
+
+def compactar(caminho_base=CAMINHO_BASE):
+    """
+    Remove registros com chave repetida (fica o último gravado), converte a base
+    para o esquema compacto se ela ainda estiver no formato original (migração),
+    ordena pela chave (data de referência, vencimento) e cria o índice de
+    chaves. Retorna o índice.
+    """
+    versao = versao_esquema(caminho_base)
+    base = ler_base(caminho_base, legado=False)
+    chaves_base = chaves(base)
+    repetidos = pd.Series(chaves_base).duplicated(keep='last').to_numpy()
+    fora_de_ordem = (np.diff(chaves_base) < 0).any()
+    if repetidos.any() or fora_de_ordem or versao < VERSAO_ESQUEMA:
+        base = base[~repetidos]
+        base = base.iloc[np.argsort(chaves_base[~repetidos], kind='stable')]
+        _gravar_base(pa.Table.from_pandas(base, schema=ESQUEMA_COMPACTO, preserve_index=False), caminho_base)
+        if versao < VERSAO_ESQUEMA:
+            print(f"Base migrada do esquema {versao} para o {VERSAO_ESQUEMA}")
+        if repetidos.any():
+            print(f"Base compactada: {repetidos.sum()} registros duplicados removidos ({len(base)} restantes)")
+
+    indice = np.sort(chaves(base))
+    _gravar_indice(indice, caminho_base)
+    return indice
+
+def migrar(caminho_base=CAMINHO_BASE):
+    """Converte uma base no formato original para o esquema compacto (se preciso)"""
+    if versao_esquema(caminho_base) < VERSAO_ESQUEMA:
+        return compactar(caminho_base)
+    return carregar_indice(caminho_base)
+
+def carregar_indice(caminho_base=CAMINHO_BASE):
+    """
+    Índice ordenado das chaves da base. Na primeira vez (ou se o índice não
+    corresponder à base, ou se a base estiver no formato original) a base é
+    compactada e o índice recriado.
+    """
+    destino = caminho_indice(caminho_base)
+    if versao_esquema(caminho_base) < VERSAO_ESQUEMA:
+        print("Base no esquema original; migrando para o esquema compacto")
+    elif os.path.exists(destino):
+        indice = np.load(destino)
+        if len(indice) == pq.read_metadata(caminho_base).num_rows:
+            return indice
+        print("Índice de chaves desatualizado; recriando")
+    else:
+        print("Índice de chaves não encontrado; compactando a base")
+    return compactar(caminho_base)
+
+class _FilaFontes:
+    """
+    Registros novos a inserir, entregues em ordem de chave: as fontes são
+    carregadas na ordem da menor chave de cada uma e só enquanto a menor chave
+    não passa do limite pedido, então a memória fica no que ainda não foi
+    intercalado com a base.
+    """
+
+    def __init__(self, fontes, chaves_fontes, manter, mercadoria=None):
+        inicios = np.cumsum([0] + [len(c) for c in chaves_fontes])
+        self.fontes = [
+            (chaves_fonte[manter[i:i + len(chaves_fonte)]].min(), fonte, manter[i:i + len(chaves_fonte)])
+            for fonte, chaves_fonte, i in zip(fontes, chaves_fontes, inicios)
+            if manter[i:i + len(chaves_fonte)].any()
+        ]
+        self.fontes.sort(key=lambda f: f[0])
+        self.mercadoria = mercadoria
+        self.posicao = 0
+        self.tabelas, self.chaves = [], []
+
+    def vazia(self):
+        return self.posicao == len(self.fontes) and not self.tabelas
+
+    def receber(self, limite):
+        """Tabela (ordenada) das linhas ainda não entregues com chave <= limite"""
+        while self.posicao < len(self.fontes) and self.fontes[self.posicao][0] <= limite:
+            _, fonte, manter = self.fontes[self.posicao]
+            tabela = _tabela(fonte, self.mercadoria).filter(manter)
+            self.tabelas.append(tabela)
+            self.chaves.append(_chaves_tabela(tabela))
+            self.posicao += 1
+        if not self.tabelas:
+            return None, None
+
+        tabela = pa.concat_tables(self.tabelas)
+        chaves_tabela = np.concatenate(self.chaves)
+        ordem = np.argsort(chaves_tabela, kind='stable')
+        tabela, chaves_tabela = tabela.take(ordem), chaves_tabela[ordem]
+        corte = np.searchsorted(chaves_tabela, limite, side='right')
+        self.tabelas = [tabela.slice(corte)] if corte < len(chaves_tabela) else []
+        self.chaves = [chaves_tabela[corte:]] if corte < len(chaves_tabela) else []
+        return tabela.slice(0, corte), chaves_tabela[:corte]
+
+    def proximo_limite(self):
+        """Limite que entrega ao menos a próxima fonte e nada depois da seguinte"""
+        if self.posicao >= len(self.fontes):
+            return np.iinfo(np.int64).max
+        atual = self.fontes[self.posicao][0]
+        if self.posicao + 1 < len(self.fontes):
+            return max(atual, self.fontes[self.posicao + 1][0] - 1)
+        return np.iinfo(np.int64).max
+
+def _so_mercadoria(df, mercadoria):
+    """Registros de uma mercadoria (todos com `mercadoria=None`), em qualquer formato"""
+    if mercadoria is None:
+        return df
+    coluna = 'mercadoria' if 'mercadoria' in df else 'Mercadoria'
+    return df[df[coluna].astype(str).to_numpy() == mercadoria]
+
+def _tabela(fonte, mercadoria=None):
+    """Tabela no esquema compacto a partir de um arquivo do diário ou de um DataFrame"""
+    if not isinstance(fonte, pd.DataFrame):
+        fonte = pd.read_parquet(fonte)
+    fonte = _so_mercadoria(fonte, mercadoria)
+    if 'data_ref' in fonte:
+        return pa.Table.from_pandas(fonte, schema=ESQUEMA_COMPACTO, preserve_index=False)
+    return para_compacto(fonte)
+
+def _chaves_arquivo(caminho, mercadoria=None):
+    if 'data_ref' in pq.read_schema(caminho).names:
+        colunas = ['data_ref', 'vencimento', 'mercadoria']
+    else:
+        colunas = ['DataRef', 'CDVencimento', 'Mercadoria']
+    if mercadoria is None:
+        colunas = colunas[:2]
+    return chaves(_so_mercadoria(pq.read_table(caminho, columns=colunas).to_pandas(), mercadoria))
+
+def _chaves_tabela(tabela):
+    return chaves(tabela.select(['data_ref', 'vencimento']).to_pandas())
+
+def inserir(fontes, caminho_base=CAMINHO_BASE, substituir=True, tamanho_lote=TAMANHO_LOTE, mercadoria=None):
+    """
+    Insere registros na base pela chave (DataRef, CDVencimento).
+
+    `fontes` é um DataFrame ou uma lista de DataFrames / arquivos Parquet (o
+    diário da coleta), no formato original ou no compacto; a base é sempre
+    gravada no esquema compacto. A verificação de existência é uma busca
+    binária de cada chave nova no índice, O(novos log n) sem ler a base.
+    Chaves já existentes são substituídas (`substituir=True`) ou descartadas;
+    entre as fontes vale a última ocorrência.
+    Com `mercadoria`, só os registros dela são lidos das fontes (o diário
+    guarda todas as mercadorias coletadas de cada data).
+
+    A base nova é escrita em fluxo com pq.ParquetWriter em um arquivo
+    temporário: cada lote da base atual (sem as chaves substituídas) é
+    intercalado com os registros novos de chave até a sua última, e o
+    restante das fontes vem depois, em ordem de chave, um grupo de linhas por
+    vez; só então a base é trocada de uma vez. A base continua ordenada pela
+    data de referência e a memória fica limitada ao lote e às chaves novas,
+    sem depender do tamanho da base nem do número de datas coletadas.
+
+    O tempo, ao contrário, é O(base): toda inserção lê e regrava a base
+    inteira, mesmo para uma única data nova (~0,12 s para os ~170 mil
+    registros atuais, ~1,8 s para 2,7 milhões).
+
+    Retorna (linhas na base, inseridos, substituídos).
+    """
+    if isinstance(fontes, pd.DataFrame):
+        fontes = [fontes]
+
+    # Chaves de todas as fontes (só as duas colunas de chave são lidas)
+    chaves_fontes = [
+        chaves(_so_mercadoria(f, mercadoria)) if isinstance(f, pd.DataFrame) else _chaves_arquivo(f, mercadoria)
+        for f in fontes
+    ]
+    if not chaves_fontes or sum(len(c) for c in chaves_fontes) == 0:
+        total = pq.read_metadata(caminho_base).num_rows if os.path.exists(caminho_base) else 0
+        return total, 0, 0
+    todas = np.concatenate(chaves_fontes)
+    ultimas = ~pd.Series(todas).duplicated(keep='last').to_numpy()
+
+    existe_base = os.path.exists(caminho_base)
+    indice = carregar_indice(caminho_base) if existe_base else np.empty(0, dtype=np.int64)
+    posicoes = np.searchsorted(indice, todas)
+    existentes = posicoes < len(indice)
+    existentes[existentes] = indice[posicoes[existentes]] == todas[existentes]
+
+    manter = ultimas & (substituir | ~existentes)
+    substituidas = todas[manter & existentes]
+    inseridos = int((manter & ~existentes).sum())
+    if not manter.any():
+        return len(indice), 0, 0
+
+    esquema = ESQUEMA_COMPACTO
+    os.makedirs(os.path.dirname(caminho_base) or '.', exist_ok=True)
+    temporario = caminho_base + '.tmp'
+    fila = _FilaFontes(fontes, chaves_fontes, manter, mercadoria)
+    total = 0
+    with pq.ParquetWriter(temporario, esquema, **OPCOES_ESCRITA) as escritor:
+        saida, linhas_saida = [], 0
+
+        def emitir(tabela, final=False):
+            # Acumula até completar grupos de `tamanho_lote` linhas
+            nonlocal saida, linhas_saida, total
+            if tabela is not None and tabela.num_rows:
+                saida.append(tabela)
+                linhas_saida += tabela.num_rows
+            cheias = linhas_saida if final else linhas_saida - linhas_saida % tamanho_lote
+            if cheias:
+                junta = pa.concat_tables(saida)
+                escritor.write_table(junta.slice(0, cheias), row_group_size=tamanho_lote)
+                saida, linhas_saida = [junta.slice(cheias)], linhas_saida - cheias
+                total += cheias
+
+        # Intercala cada lote da base (sem as chaves substituídas) com os
+        # registros novos de chave até a última do lote
+        if existe_base:
+            for lote in pq.ParquetFile(caminho_base).iter_batches(batch_size=tamanho_lote):
+                tabela = pa.Table.from_batches([lote]).cast(esquema)
+                chaves_lote = _chaves_tabela(tabela)
+                if len(substituidas):
+                    fica = ~np.isin(chaves_lote, substituidas)
+                    tabela, chaves_lote = tabela.filter(fica), chaves_lote[fica]
+                if not len(chaves_lote):
+                    continue
+                novos, chaves_novos = fila.receber(chaves_lote.max())
+                if novos is not None and novos.num_rows:
+                    ordem = np.argsort(np.concatenate([chaves_lote, chaves_novos]), kind='stable')
+                    tabela = pa.concat_tables([tabela, novos]).take(ordem)
+                emitir(tabela)
+
+        # Registros novos depois da última chave da base
+        while not fila.vazia():
+            emitir(fila.receber(fila.proximo_limite())[0])
+        emitir(None, final=True)
+    os.replace(temporario, caminho_base)
+
+    # Novas chaves entram no índice por inserção ordenada
+    adicionar = np.sort(todas[manter & ~existentes])
+    _gravar_indice(np.insert(indice, np.searchsorted(indice, adicionar), adicionar), caminho_base)
+
+    return total, inseridos, len(substituidas)
+
+if __name__ == '__main__':
+    # Migração manual: python base_bruta.py
+    migrar()
@@ -0,0 +1,99 @@
+"""
+Benchmark da Atualização Intradiária - Superfície de Juros
+Roda a coleta intradiária contra o servidor de cotações local
+(servidor_cotacoes.py), que muda uma fração dos contratos entre uma consulta
+e outra (e às vezes nada, para exercitar o 304), e confere que:
+- o arquivo do dia tem exatamente uma linha por mudança de cotação;
+- o monitor do app, lendo só as linhas novas, fica igual às cotações do
+  servidor depois de cada consulta.
+Mede o tempo de cada consulta, os bytes gravados contra uma fotografia
+completa por consulta e o custo da leitura incremental do monitor contra
+reler o arquivo inteiro.
+
+Uso:
+    python benchmarks/atualizacao_intradiaria.py
+    python benchmarks/atualizacao_intradiaria.py --consultas 2000 --contratos 40 --mercadorias DI1 DAP DDI
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from dados_sinteticos import RAIZ
+from servidor_cotacoes import ServidorCotacoes
+
+sys.path.insert(0, RAIZ)
+
+from armazenamento import MonitorIntradiario, caminho_intradiario  # noqa: E402
+from coleta_intradiaria import ColetorIntradiario, FonteCotacoes, carregar_ultimas  # noqa: E402
+
+def reler(caminho):
+    """Leitura completa do arquivo (o que o app faria sem a leitura incremental)"""
+    with open(caminho, "rb") as f:
+        return {(r["mercadoria"], r["vencimento"]): (r["hora"], r["taxa"]) for r in map(json.loads, f)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Coleta intradiária e atualização do monitor do app")
+    parser.add_argument("--consultas", type=int, default=500, help="Consultas da coleta")
+    parser.add_argument("--contratos", type=int, default=40, help="Vencimentos por mercadoria")
+    parser.add_argument("--fracao", type=float, default=0.2, help="Fração dos contratos que muda por passo")
+    parser.add_argument("--parados", type=float, default=0.3, help="Fração das consultas sem mudança no servidor")
+    parser.add_argument("--mercadorias", nargs="+", default=["DI1"])
+    args = parser.parse_args()
+
+    print("=== BENCHMARK DA ATUALIZAÇÃO INTRADIÁRIA ===")
+    rng = np.random.default_rng(7)
+    servidor = ServidorCotacoes(args.mercadorias, args.contratos, args.fracao).iniciar()
+    with tempfile.TemporaryDirectory() as pasta:
+        coletor = ColetorIntradiario(FonteCotacoes(servidor.url, args.mercadorias), pasta=pasta)
+        monitor = MonitorIntradiario(pasta=pasta)
+        caminho = caminho_intradiario(pasta=pasta)
+
+        tempos_consulta, tempos_monitor, linhas = [], [], 0
+        bytes_fotografias, divergencias = 0, 0
+        for i in range(args.consultas):
+            if i and rng.random() >= args.parados:
+                servidor.avancar()
+
+            inicio = time.perf_counter()
+            linhas += coletor.ciclo()
+            tempos_consulta.append(time.perf_counter() - inicio)
+            bytes_fotografias += sum(len(servidor.corpo(m)[1]) for m in args.mercadorias)
+
+            inicio = time.perf_counter()
+            monitor.verificar()
+            tempos_monitor.append(time.perf_counter() - inicio)
+            atuais = {chave: taxa for chave, (_, taxa) in monitor.cotacoes.items()}
+            divergencias += atuais != servidor.cotacoes()
+
+        tamanho = os.path.getsize(caminho)
+        inicio = time.perf_counter()
+        completo = reler(caminho)
+        tempo_releitura = time.perf_counter() - inicio
+        retomada = carregar_ultimas(caminho) == servidor.cotacoes()
+
+        print(f"{args.consultas} consultas de {', '.join(args.mercadorias)} ({len(servidor.taxas)} contratos), "
+              f"{servidor.respostas_304} respostas 304 de {servidor.requisicoes} requisições")
+        print(f"Mudanças no servidor: {servidor.mudancas}; linhas gravadas: {linhas} "
+              f"({'iguais' if linhas == servidor.mudancas else 'DIFEREM'})")
+        print(f"Arquivo do dia: {tamanho / 1e3:.0f} kB (fotografias completas: {bytes_fotografias / 1e6:.1f} MB, "
+              f"{bytes_fotografias / tamanho:.0f}x)")
+        print(f"Consulta: p50 {np.median(tempos_consulta) * 1000:.2f} ms, "
+              f"p95 {np.percentile(tempos_consulta, 95) * 1000:.2f} ms")
+        print(f"Monitor (linhas novas): p50 {np.median(tempos_monitor) * 1000:.3f} ms, "
+              f"p95 {np.percentile(tempos_monitor, 95) * 1000:.3f} ms; "
+              f"releitura do arquivo no fim: {tempo_releitura * 1000:.1f} ms")
+        print(f"Monitor igual ao servidor após cada consulta: "
+              f"{'sim' if not divergencias else f'não ({divergencias} divergências)'}; "
+              f"igual à releitura completa: {'sim' if completo == monitor.cotacoes else 'não'}; "
+              f"retomada pelo arquivo: {'sim' if retomada else 'não'}")
+    servidor.parar()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Teste de Carga - Superfície de Juros
+Abre N sessões simuladas contra uma instância local do app (protocolo websocket
+do Streamlit) e repete roteiros de interação realistas: trocar de visualização,
+escolher datas e abrir superfícies. Reporta throughput, latência de rerun
+(p50/p95/p99), bytes recebidos e RSS do servidor conforme N cresce.
+
+Requer o pacote `websockets`, fora das dependências do app:
+    pip install -r benchmarks/requirements.txt
+
+Uso:
+    python benchmarks/carga_sessoes.py --sessoes 1 5 10 20
+    python benchmarks/carga_sessoes.py --url ws://localhost:8501 --pid 12345
+"""
+
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAMINHO_APP = os.path.join(RAIZ, "3_app_streamlit.py")
+
+BOTOES_NAVEGACAO = ["btn_curvas_br", "btn_curvas_eua", "btn_sup_br", "btn_sup_eua"]
+
+# Roteiros de interação: sequência de (ação, argumento)
+ROTEIROS = {
+    "analista_brasil": [("clicar", "btn_curvas_br"), ("datas", None), ("datas", None),
+                        ("clicar", "btn_sup_br")],
+    "analista_eua": [("clicar", "btn_curvas_eua"), ("datas", None), ("datas", None),
+                     ("clicar", "btn_sup_eua")],
+    "navegacao": [("clicar", b) for b in BOTOES_NAVEGACAO],
+}
+
+def rss_servidor(pid):
+    """RSS (bytes) do processo do servidor; None se não for possível medir"""
+    if pid is None:
+        return None
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except ImportError:
+        pass
+    except Exception:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+def _chave_widget(widget_id):
+    """Extrai a chave do usuário de um id '$$ID-<hash>-<chave>'"""
+    return widget_id.split("-", 2)[-1] if widget_id.startswith("$$ID-") else widget_id
+
+class SessaoSimulada:
+    """Sessão de navegador simulada: mantém estado dos widgets e mede reruns"""
+
+    def __init__(self, url, rng):
+        self.url = url
+        self.rng = rng
+        self.ws = None
+        self.widgets = {}         # chave -> (tipo, proto do elemento, fragment_id)
+        self.valores = {}         # chave -> WidgetState a reenviar
+        self.latencias = []
+        self.bytes_recebidos = []
+
+    async def conectar(self):
+        self.ws = await websockets.connect(f"{self.url}/_stcore/stream",
+                                           subprotocols=["streamlit"], max_size=None)
+
+    async def fechar(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def rerun(self, gatilho=None, fragment_id=""):
+        """Envia um rerun com os estados atuais dos widgets e aguarda o fim do script"""
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = ""
+        msg.rerun_script.fragment_id = fragment_id
+
+        for chave, estado in self.valores.items():
+            if chave in self.widgets:
+                estado.id = self.widgets[chave][1].id
+                msg.rerun_script.widget_states.widgets.append(estado)
+        if gatilho is not None:
+            msg.rerun_script.widget_states.widgets.append(gatilho)
+
+        inicio = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+
+        total = 0
+        if not fragment_id:
+            self.widgets = {}
+        while True:
+            bruto = await self.ws.recv()
+            total += len(bruto)
+            fwd = ForwardMsg()
+            fwd.ParseFromString(bruto)
+            tipo = fwd.WhichOneof("type")
+            if tipo == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                self._registrar_elemento(fwd)
+            elif tipo == "script_finished":
+                # st.rerun() encerra o script e inicia outra execução na mesma interação
+                if fwd.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    break
+                self.widgets = {}
+
+        self.latencias.append(time.perf_counter() - inicio)
+        self.bytes_recebidos.append(total)
+
+    def _registrar_elemento(self, fwd):
+        elemento = fwd.delta.new_element
+        tipo = elemento.WhichOneof("type")
+        if tipo not in ("button", "date_input", "selectbox", "radio", "slider"):
+            return
+        proto = getattr(elemento, tipo)
+        self.widgets[_chave_widget(proto.id)] = (tipo, proto, fwd.delta.fragment_id)
+
+    def _estado(self, chave):
+        estado = WidgetState()
+        if chave in self.valores:
+            estado.CopyFrom(self.valores[chave])
+        estado.id = self.widgets[chave][1].id
+        return estado
+
+    async def clicar(self, chave):
+        if chave not in self.widgets:
+            return False
+        _, proto, fragment_id = self.widgets[chave]
+        gatilho = WidgetState()
+        gatilho.id = proto.id
+        gatilho.trigger_value = True
+        await self.rerun(gatilho, fragment_id)
+        return True
+
+    async def escolher_datas(self):
+        """Escolhe uma data aleatória em cada seletor de data da visualização atual"""
+        candidatos = [c for c, (t, _, _) in self.widgets.items()
+                      if t in ("date_input", "selectbox", "slider")]
+        if not candidatos:
+            return False
+        chave = self.rng.choice(candidatos)
+        tipo, proto, fragment_id = self.widgets[chave]
+        estado = self._estado(chave)
+
+        if tipo == "date_input":
+            minimo = datetime.datetime.strptime(proto.min.replace("-", "/"), "%Y/%m/%d").date()
+            maximo = datetime.datetime.strptime(proto.max.replace("-", "/"), "%Y/%m/%d").date()
+            dias = self.rng.randint(0, max((maximo - minimo).days, 0))
+            escolhida = minimo + datetime.timedelta(days=dias)
+            del estado.string_array_value.data[:]
+            estado.string_array_value.data.append(escolhida.strftime("%Y/%m/%d"))
+        elif tipo == "selectbox":
+            estado.string_value = self.rng.choice(list(proto.options))
+        else:
+            estado.double_array_value.data[:] = [self.rng.uniform(proto.min, proto.max)]
+
+        self.valores[chave] = estado
+        await self.rerun(fragment_id=fragment_id)
+        return True
+
+async def executar_sessao(url, roteiro, repeticoes, pausa, semente):
+    rng = random.Random(semente)
+    sessao = SessaoSimulada(url, rng)
+    await sessao.conectar()
+    try:
+        await sessao.rerun()
+        for _ in range(repeticoes):
+            for acao, argumento in ROTEIROS[roteiro]:
+                if acao == "clicar":
+                    await sessao.clicar(argumento)
+                else:
+                    await sessao.escolher_datas()
+                await asyncio.sleep(pausa * rng.uniform(0.5, 1.5))
+    finally:
+        await sessao.fechar()
+    return sessao
+
+async def monitorar_rss(pid, parar, amostras):
+    while not parar.is_set():
+        rss = rss_servidor(pid)
+        if rss is not None:
+            amostras.append(rss)
+        await asyncio.sleep(0.2)
+
+async def executar_nivel(url, pid, n_sessoes, repeticoes, pausa):
+    """Executa n_sessoes simultâneas e consolida as métricas"""
+    parar = asyncio.Event()
+    amostras_rss = []
+    monitor = asyncio.create_task(monitorar_rss(pid, parar, amostras_rss))
+
+    nomes = list(ROTEIROS)
+    inicio = time.perf_counter()
+    sessoes = await asyncio.gather(*[
+        executar_sessao(url, nomes[i % len(nomes)], repeticoes, pausa, semente=i)
+        for i in range(n_sessoes)
+    ])
+    duracao = time.perf_counter() - inicio
+
+    parar.set()
+    await monitor
+
+    latencias = np.array([l for s in sessoes for l in s.latencias])
+    bytes_rerun = np.array([b for s in sessoes for b in s.bytes_recebidos])
+    return {
+        "sessoes": n_sessoes,
+        "reruns": len(latencias),
+        "throughput": len(latencias) / duracao,
+        "p50": float(np.percentile(latencias, 50)),
+        "p95": float(np.percentile(latencias, 95)),
+        "p99": float(np.percentile(latencias, 99)),
+        "bytes_medio": float(bytes_rerun.mean()),
+        "rss_max": max(amostras_rss) if amostras_rss else None,
+    }
+
+def iniciar_servidor(porta):
+    """Inicia o app em modo headless e aguarda o health check"""
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", CAMINHO_APP,
+         "--server.headless", "true", "--server.port", str(porta),
+         "--browser.gatherUsageStats", "false"],
+        cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    import urllib.request
+    for _ in range(120):
+        try:
+            urllib.request.urlopen(f"http://localhost:{porta}/_stcore/health", timeout=1)
+            return processo
+        except Exception:
+            time.sleep(0.5)
+    processo.terminate()
+    raise RuntimeError("Servidor Streamlit não respondeu ao health check")
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga com sessões simultâneas")
+    parser.add_argument("--sessoes", type=int, nargs="+", default=[1, 5, 10, 20],
+                        help="Níveis de sessões simultâneas")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Repetições do roteiro por sessão")
+    parser.add_argument("--pausa", type=float, default=0.5, help="Tempo médio (s) entre interações")
+    parser.add_argument("--url", default=None, help="URL ws:// de uma instância já em execução")
+    parser.add_argument("--pid", type=int, default=None, help="PID do servidor (para medir RSS)")
+    parser.add_argument("--porta", type=int, default=8599, help="Porta ao iniciar o servidor")
+    args = parser.parse_args()
+
+    processo = None
+    url, pid = args.url, args.pid
+    if url is None:
+        print(f"Iniciando servidor Streamlit na porta {args.porta}...")
+        processo = iniciar_servidor(args.porta)
+        url, pid = f"ws://localhost:{args.porta}", processo.pid
+
+    print("=== TESTE DE CARGA - SESSÕES SIMULTÂNEAS ===")
+    print(f"{'Sessões':>8} {'Reruns':>7} {'Reruns/s':>9} {'p50 (s)':>8} {'p95 (s)':>8} "
+          f"{'p99 (s)':>8} {'KiB/rerun':>10} {'RSS (MiB)':>10}")
+    try:
+        for n in args.sessoes:
+            r = asyncio.run(executar_nivel(url, pid, n, args.repeticoes, args.pausa))
+            rss = f"{r['rss_max'] / 1024 ** 2:10.1f}" if r["rss_max"] else f"{'-':>10}"
+            print(f"{r['sessoes']:8d} {r['reruns']:7d} {r['throughput']:9.2f} {r['p50']:8.3f} "
+                  f"{r['p95']:8.3f} {r['p99']:8.3f} {r['bytes_medio'] / 1024:10.1f} {rss}")
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait()
+
+if __name__ == "__main__":
+    main()
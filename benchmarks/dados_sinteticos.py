@@ -0,0 +1,163 @@
+"""
+Dados Sintéticos - Superfície de Juros
+Gera bases no mesmo formato da pasta Dados/ para benchmarks e testes de carga
+"""
+
+import importlib.util
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _modulo_processamento():
+    """Carrega 2_processa_dados.py (nome começa com dígito, sem import direto)"""
+    if RAIZ not in sys.path:
+        sys.path.insert(0, RAIZ)
+    spec = importlib.util.spec_from_file_location(
+        "processa_dados", os.path.join(RAIZ, "2_processa_dados.py"))
+    modulo = importlib.util.module_from_spec(spec)
+    # Registrado para que os processos do pool encontrem as funções do módulo
+    sys.modules[spec.name] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
+
+# Mesmos horizontes (em dias úteis) usados em 2_processa_dados.py
+HORIZONTES = [
+    21, 63, 126,
+    252, 504, 756, 1008, 1260, 1512, 1764, 2016, 2268, 2520,
+    2772, 3024, 3276, 3528, 3780, 4032, 4284, 4536, 4788, 5040,
+    5292, 5544, 5796, 6048, 6300, 6552, 6804, 7056, 7308, 7560,
+    7812, 8064, 8316, 8558
+]
+
+CODIGOS_MES = "FGHJKMNQUVXZ"
+
+def _curva_base(du, nivel, inclinacao):
+    """Curva suave (taxa anual) em função dos dias úteis"""
+    anos = du / 252
+    return nivel + inclinacao * (1 - np.exp(-anos / 2.5))
+
+def gerar_base_bruta(n_datas, inicio="2007-01-02", n_contratos=30, semente=42):
+    """Gera uma Base_Bruta sintética de DI1 com n_datas datas de referência"""
+    rng = np.random.default_rng(semente)
+    datas = pd.bdate_range(inicio, periods=n_datas)
+
+    # Passeio aleatório para nível e inclinação da curva
+    nivel = 0.12 + np.cumsum(rng.normal(0, 0.0008, n_datas))
+    inclinacao = 0.01 + np.cumsum(rng.normal(0, 0.0004, n_datas))
+
+    registros = []
+    for i, data_ref in enumerate(datas):
+        # Vencimentos no primeiro dia dos próximos meses
+        primeiro_mes = (data_ref + pd.offsets.MonthBegin(1)).normalize()
+        vencimentos = pd.date_range(primeiro_mes, periods=n_contratos, freq="3MS")
+        du = np.maximum(np.busday_count(data_ref.date(), vencimentos.values.astype("datetime64[D]")), 1)
+        taxas = _curva_base(du, nivel[i], inclinacao[i])
+        pu = 100000 / (1 + taxas) ** (du / 252)
+
+        registros.append(pd.DataFrame({
+            "DataRef": data_ref,
+            "Mercadoria": "DI1",
+            "CDVencimento": [f"{CODIGOS_MES[v.month - 1]}{v.year % 100:02d}" for v in vencimentos],
+            "PUAnterior": pu.round(2),
+            "PUAtual": pu.round(2),
+            "Variacao": 0.0,
+            "Vencimento": vencimentos,
+            "date": data_ref.date()
+        }))
+
+    return pd.concat(registros, ignore_index=True)
+
+def gravar_base_compacta(caminho, n_datas, inicio="2000-01-03", n_contratos=30, passo_meses=3,
+                         datas_por_bloco=1000, semente=42):
+    """
+    Grava uma Base_Bruta sintética no esquema compacto, um bloco de datas por
+    vez, sem montar a base inteira em memória (bases maiores que a memória).
+    Mesma curva de gerar_base_bruta(); vencimentos a cada `passo_meses` meses.
+    Retorna o número de registros.
+    """
+    if RAIZ not in sys.path:
+        sys.path.insert(0, RAIZ)
+    from base_bruta import ESQUEMA_COMPACTO, OPCOES_ESCRITA, TAMANHO_LOTE
+
+    rng = np.random.default_rng(semente)
+    datas = pd.bdate_range(inicio, periods=n_datas).values.astype("datetime64[D]")
+    nivel = 0.12 + np.cumsum(rng.normal(0, 0.0008, n_datas))
+    inclinacao = 0.01 + np.cumsum(rng.normal(0, 0.0004, n_datas))
+
+    total = 0
+    with pq.ParquetWriter(caminho, ESQUEMA_COMPACTO, **OPCOES_ESCRITA) as escritor:
+        for i in range(0, n_datas, datas_por_bloco):
+            bloco = datas[i:i + datas_por_bloco]
+            # Meses desde jan/2000 do primeiro vencimento (mês seguinte) em diante
+            mes = bloco.astype("datetime64[M]").astype(np.int64) - 360
+            vencimento = mes[:, None] + 1 + passo_meses * np.arange(n_contratos)[None, :]
+            dias = (np.datetime64("2000-01", "M") + vencimento).astype("datetime64[D]")
+            du = np.maximum(np.busday_count(bloco[:, None], dias), 1)
+            taxas = _curva_base(du, nivel[i:i + len(bloco), None], inclinacao[i:i + len(bloco), None])
+            pu = (100000 / (1 + taxas) ** (du / 252)).round(2).ravel()
+
+            n = pu.size
+            tabela = pa.Table.from_arrays([
+                pa.array(np.repeat(bloco.astype(np.int32), n_contratos)),
+                pa.DictionaryArray.from_arrays(np.zeros(n, dtype=np.int8), ["DI1"]),
+                pa.array(vencimento.ravel().astype(np.int16)),
+                pa.array(pu),
+                pa.array(pu),
+                pa.array(np.zeros(n)),
+            ], schema=ESQUEMA_COMPACTO)
+            escritor.write_table(tabela, row_group_size=TAMANHO_LOTE)
+            total += n
+    return total
+
+def gerar_brasil_processado(n_datas, inicio="2007-01-02", semente=42, horizontes=HORIZONTES):
+    """Gera a matriz de taxas por horizonte do Brasil (colunas invertidas, índice 'Data')"""
+    rng = np.random.default_rng(semente)
+    datas = pd.bdate_range(inicio, periods=n_datas, name="Data")
+    nivel = 0.12 + np.cumsum(rng.normal(0, 0.0008, n_datas))
+    inclinacao = 0.01 + np.cumsum(rng.normal(0, 0.0004, n_datas))
+
+    du = np.array(horizontes, dtype=float)
+    valores = _curva_base(du[None, :], nivel[:, None], inclinacao[:, None])
+    df = pd.DataFrame(valores, index=datas, columns=[f"{h}_dias" for h in horizontes])
+    return df[df.columns[::-1]]
+
+def gerar_eua_processado(n_datas, inicio="1990-01-01", semente=7):
+    """Gera a tabela de taxas dos EUA (em %, maior maturidade primeiro)"""
+    rng = np.random.default_rng(semente)
+    datas = pd.bdate_range(inicio, periods=n_datas, name="DATE")
+    anos = np.array([1 / 12, 3 / 12, 6 / 12, 1, 2, 3, 5, 10, 30])
+    nivel = 5 + np.cumsum(rng.normal(0, 0.05, n_datas))
+    inclinacao = 1 + np.cumsum(rng.normal(0, 0.02, n_datas))
+    valores = nivel[:, None] + inclinacao[:, None] * (1 - np.exp(-anos[None, :] / 3))
+    df = pd.DataFrame(valores, index=datas,
+                      columns=["1M", "3M", "6M", "1Y", "2Y", "3Y", "5Y", "10Y", "30Y"])
+    return df[df.columns[::-1]]
+
+def gerar_pasta_dados(destino, n_datas):
+    """Cria destino/Dados com todas as bases sintéticas usadas pelo app"""
+    pasta = os.path.join(destino, "Dados")
+    os.makedirs(pasta, exist_ok=True)
+
+    gerar_base_bruta(n_datas).to_parquet(os.path.join(pasta, "Base_Bruta.parquet"), index=True)
+    df_br = gerar_brasil_processado(n_datas)
+    df_br.to_parquet(os.path.join(pasta, "juros_brasil_processado.parquet"))
+    processamento = _modulo_processamento()
+    # A curva sintética é contínua em todos os horizontes: os fatores de desconto saem da própria grade
+    horizontes = np.array(HORIZONTES)
+    log_fatores = -horizontes / 252 * np.log1p(df_br[df_br.columns[::-1]].to_numpy())
+    processamento._superficie(processamento.calcular_forwards(log_fatores, horizontes), df_br.index.values,
+                              HORIZONTES).to_parquet(os.path.join(pasta, "juros_brasil_forward.parquet"))
+    gerar_brasil_processado(n_datas, horizontes=processamento.grade_densa(max(HORIZONTES))).to_parquet(
+        os.path.join(pasta, "juros_brasil_denso.parquet"))
+
+    df_us = gerar_eua_processado(n_datas)
+    df_us.to_parquet(os.path.join(pasta, "juros_eua_bruto.parquet"))
+    df_us.to_parquet(os.path.join(pasta, "juros_eua_processado.parquet"))
+
+    return pasta
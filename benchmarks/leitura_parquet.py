@@ -0,0 +1,144 @@
+"""
+Benchmark de Leitura por Intervalo de Datas - Superfície de Juros
+Compara o layout padrão do pandas (um grupo de linhas, sem ordenação garantida,
+snappy) com o layout de leitura (ordenado por data, grupos de linhas de tamanho
+fixo, estatísticas, índice de páginas e zstd) ao carregar o histórico completo
+e só os últimos 2 anos. Mede os bytes efetivamente lidos do arquivo, o tempo e
+o efeito do tamanho dos grupos de linhas.
+
+Uso:
+    python benchmarks/leitura_parquet.py                  # bases sintéticas
+    python benchmarks/leitura_parquet.py --dados ../Dados --anos 2
+"""
+
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from dados_sinteticos import RAIZ, _modulo_processamento, gerar_base_bruta, gerar_brasil_processado
+
+sys.path.insert(0, RAIZ)
+
+import base_bruta  # noqa: E402
+from armazenamento import LINHAS_POR_GRUPO, escrever_parquet, ler_parquet  # noqa: E402
+
+class ArquivoContado(io.FileIO):
+    """Arquivo que soma os bytes entregues ao leitor do Parquet"""
+
+    def __init__(self, caminho):
+        super().__init__(caminho, 'r')
+        self.lidos = 0
+
+    def read(self, n=-1):
+        dados = super().read(n)
+        self.lidos += len(dados)
+        return dados
+
+    def readinto(self, buffer):
+        n = super().readinto(buffer)
+        self.lidos += n
+        return n
+
+def medir(ler, caminho, repeticoes=5):
+    """(linhas, bytes lidos, mediana do tempo em ms) de uma leitura"""
+    tempos = []
+    for _ in range(repeticoes):
+        with ArquivoContado(caminho) as arquivo:
+            inicio = time.perf_counter()
+            df = ler(arquivo)
+            tempos.append(time.perf_counter() - inicio)
+            lidos = arquivo.lidos
+    return len(df), lidos, np.median(tempos) * 1000
+
+def bases(args, destino):
+    """Arquivos no layout padrão do pandas: (nome, caminho, é a base bruta)"""
+    if args.dados:
+        base = pd.read_parquet(os.path.join(args.dados, "Base_Bruta.parquet"))
+        if "data_ref" in base:
+            base = base_bruta.expandir(base)
+        processado = pd.read_parquet(os.path.join(args.dados, "juros_brasil_processado.parquet"))
+        denso = pd.read_parquet(os.path.join(args.dados, "juros_brasil_denso.parquet"))
+    else:
+        base = gerar_base_bruta(args.datas)
+        processado = gerar_brasil_processado(args.datas)
+        denso = gerar_brasil_processado(
+            args.datas, horizontes=_modulo_processamento().grade_densa(8558)).astype(np.float32)
+
+    arquivos = []
+    for nome, df in [("Base_Bruta", base), ("juros_brasil_processado", processado),
+                     ("juros_brasil_denso", denso)]:
+        caminho = os.path.join(destino, f"{nome}.parquet")
+        df.to_parquet(caminho, index=nome != "Base_Bruta")
+        arquivos.append((nome, caminho, nome == "Base_Bruta"))
+    return arquivos, denso
+
+def layout_leitura(caminho, eh_base, destino):
+    """Cópia do arquivo no layout de leitura"""
+    copia = os.path.join(destino, "leitura_" + os.path.basename(caminho))
+    if eh_base:
+        shutil.copy(caminho, copia)
+        base_bruta.compactar(copia)
+    else:
+        escrever_parquet(pd.read_parquet(caminho), copia)
+    return copia
+
+def main():
+    parser = argparse.ArgumentParser(description="Leitura por intervalo de datas")
+    parser.add_argument("--dados", default=None, help="Pasta Dados/ real (padrão: bases sintéticas)")
+    parser.add_argument("--datas", type=int, default=4700, help="Datas das bases sintéticas")
+    parser.add_argument("--anos", type=int, default=2, help="Anos mais recentes na consulta por intervalo")
+    parser.add_argument("--grupos", type=int, nargs="+", default=[252, 504, 1008, 2016, 4704],
+                        help="Linhas por grupo testadas na grade densa")
+    args = parser.parse_args()
+
+    print("=== BENCHMARK DE LEITURA POR INTERVALO DE DATAS ===")
+    with tempfile.TemporaryDirectory() as destino:
+        arquivos, denso = bases(args, destino)
+        inicio = denso.index.max() - pd.DateOffset(years=args.anos)
+        print(f"Consulta por intervalo: a partir de {inicio:%Y-%m-%d} ({args.anos} anos)")
+
+        print(f"{'Arquivo':>24} {'Layout':>8} {'Consulta':>9} {'Arquivo':>9} {'Lidos':>9} {'Fração':>7} "
+              f"{'Linhas':>7} {'Tempo':>8}")
+        for nome, caminho, eh_base in arquivos:
+            for layout, arquivo in [("pandas", caminho), ("leitura", layout_leitura(caminho, eh_base, destino))]:
+                tamanho = os.path.getsize(arquivo)
+                if eh_base:
+                    colunas = ["DataRef", "Vencimento", "PUAtual"]
+                    consultas = [
+                        ("completo", lambda f: base_bruta.ler_base(f, colunas=colunas)),
+                        ("intervalo", lambda f: base_bruta.ler_base(f, colunas=colunas, inicio=inicio)),
+                    ]
+                else:
+                    consultas = [
+                        ("completo", lambda f: ler_parquet(f)),
+                        ("intervalo", lambda f: ler_parquet(f, inicio=inicio)),
+                    ]
+                for consulta, ler in consultas:
+                    linhas, lidos, ms = medir(ler, arquivo)
+                    print(f"{nome:>24} {layout:>8} {consulta:>9} {tamanho / 1e6:7.2f}MB {lidos / 1e6:7.2f}MB "
+                          f"{lidos / tamanho:6.0%} {linhas:7d} {ms:6.1f}ms")
+
+        print(f"\nGrade densa ({denso.shape[1]} colunas): linhas por grupo "
+              f"(padrão {LINHAS_POR_GRUPO})")
+        print(f"{'Linhas/grupo':>13} {'Grupos':>7} {'Arquivo':>9} {'Lidos (intervalo)':>18} "
+              f"{'Tempo intervalo':>16} {'Tempo completo':>15}")
+        for linhas in args.grupos:
+            caminho = os.path.join(destino, f"denso_{linhas}.parquet")
+            escrever_parquet(denso, caminho, linhas)
+            _, lidos, ms_intervalo = medir(lambda f: ler_parquet(f, inicio=inicio), caminho)
+            _, _, ms_completo = medir(lambda f: ler_parquet(f), caminho)
+            grupos = -(-len(denso) // linhas)
+            print(f"{linhas:13d} {grupos:7d} {os.path.getsize(caminho) / 1e6:7.2f}MB "
+                  f"{lidos / 1e6:16.2f}MB {ms_intervalo:14.1f}ms {ms_completo:13.1f}ms")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Benchmark de Memória da Coleta - Superfície de Juros
+Compara o pico de memória (RSS) da coleta antiga (todas as tabelas do pregão
+em uma lista, concatenadas no fim junto com a base inteira) com a coleta em
+fluxo (filtro DI1 na leitura, diário por data e escrita da base lote a lote),
+para backfills de tamanho crescente. Cada medição roda em um processo novo.
+
+Uso:
+    python benchmarks/memoria_coleta.py
+    python benchmarks/memoria_coleta.py --datas 250 1000 4000 --base 4000
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from dados_sinteticos import RAIZ, gerar_base_bruta
+
+sys.path.insert(0, RAIZ)
+
+from base_bruta import carregar_indice  # noqa: E402
+from diario_coleta import DiarioColeta  # noqa: E402
+
+# A tabela de ajustes da B3 traz todas as mercadorias; DI1 é uma fração dela
+OUTRAS_MERCADORIAS = ["DAP", "DDI", "DOL", "FRC", "IND", "WDO", "WIN", "BGI", "CCM", "ICF",
+                      "DCO", "OC1", "SJC", "T10", "ETH", "BIT"]
+
+def tabela_pregao(di1):
+    """Colunas (listas) de uma tabela de ajustes: DI1 mais as outras mercadorias"""
+    campos = ["CDVencimento", "PUAnterior", "PUAtual", "Variacao", "Vencimento"]
+    colunas = {"Mercadoria": di1["Mercadoria"].tolist(), **{c: di1[c].tolist() for c in campos}}
+    for mercadoria in OUTRAS_MERCADORIAS:
+        colunas["Mercadoria"] += [mercadoria] * len(di1)
+        for c in campos:
+            colunas[c] += di1[c].tolist()
+    return colunas
+
+def _dataframe(data_ref, colunas):
+    return pd.DataFrame({"DataRef": data_ref, **colunas})
+
+def coleta_antiga(pasta, novos):
+    """Fluxo anterior: lista de tabelas completas, filtro e concatenação no fim"""
+    lista = []
+    for data_ref, di1 in novos.groupby("DataRef"):
+        curve = _dataframe(data_ref, tabela_pregao(di1))
+        curve["date"] = data_ref.date()
+        lista.append(curve)
+
+    df_final = pd.concat(lista, ignore_index=True)
+    df_new = df_final[(df_final["Mercadoria"] == "DI1") & (df_final["PUAtual"] != 100000.0)]
+    base = pd.read_parquet(os.path.join(pasta, "Base_Bruta.parquet"))
+    pd.concat([base, df_new], ignore_index=True).to_parquet(os.path.join(pasta, "Base_Bruta.parquet"))
+
+def coleta_fluxo(pasta, novos):
+    """Fluxo atual: filtro DI1 na leitura, diário por data e escrita em fluxo"""
+    diario = DiarioColeta(os.path.join(pasta, "diario_coleta"))
+    for data_ref, di1 in novos.groupby("DataRef"):
+        colunas = tabela_pregao(di1)
+        linhas = [i for i, m in enumerate(colunas["Mercadoria"]) if m == "DI1"]
+        curve = _dataframe(data_ref, {c: [v[i] for i in linhas] for c, v in colunas.items()})
+        curve["date"] = data_ref.date()
+        diario.registrar(data_ref, curve[curve["PUAtual"] != 100000.0])
+    diario.consolidar(os.path.join(pasta, "Base_Bruta.parquet"))
+
+def _rss_mb(campo):
+    """VmRSS (atual) ou VmHWM (pico) do processo, em MB"""
+    with open("/proc/self/status") as f:
+        for linha in f:
+            if linha.startswith(campo + ":"):
+                return int(linha.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _medir(funcao, pasta, caminho_novos, fila):
+    novos = pd.read_parquet(caminho_novos)
+
+    # Zera o pico de RSS (Linux) para medir só a coleta
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+    inicial = _rss_mb("VmRSS")
+    inicio = time.perf_counter()
+    funcao(pasta, novos)
+    duracao = time.perf_counter() - inicio
+    fila.put((inicial, _rss_mb("VmHWM"), duracao))
+
+def medir(funcao, base, novos, destino):
+    """Pico de RSS (MB) em um processo novo, partindo de uma cópia da base"""
+    pasta = tempfile.mkdtemp(dir=destino)
+    base_path = os.path.join(pasta, "Base_Bruta.parquet")
+    base.to_parquet(base_path, index=False)
+    caminho_novos = os.path.join(pasta, "novos.parquet")
+    novos.to_parquet(caminho_novos)
+    if funcao is coleta_fluxo:
+        carregar_indice(base_path)  # cria o índice fora da medição
+
+    contexto = multiprocessing.get_context("spawn")
+    fila = contexto.Queue()
+    processo = contexto.Process(target=_medir, args=(funcao, pasta, caminho_novos, fila))
+    processo.start()
+    resultado = fila.get()
+    processo.join()
+    shutil.rmtree(pasta)
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Pico de memória da coleta")
+    parser.add_argument("--datas", type=int, nargs="+", default=[250, 1000, 4000],
+                        help="Tamanhos do backfill (datas coletadas)")
+    parser.add_argument("--base", type=int, default=4000, help="Datas já presentes na base")
+    args = parser.parse_args()
+
+    print("=== BENCHMARK DE MEMÓRIA DA COLETA ===")
+    total = gerar_base_bruta(args.base + max(args.datas) + 1)
+    datas = total["DataRef"].drop_duplicates().sort_values()
+    corte = datas.iloc[args.base]
+    base, restante = total[total["DataRef"] < corte], total[total["DataRef"] >= corte]
+
+    print(f"Base: {args.base} datas ({len(base)} registros); "
+          f"{len(OUTRAS_MERCADORIAS) + 1} mercadorias por tabela do pregão")
+    print(f"{'Datas':>6} {'Coleta':>8} {'RSS inicial':>12} {'Pico RSS':>9} {'Acréscimo':>10} {'Tempo':>7}")
+    with tempfile.TemporaryDirectory() as destino:
+        for n in args.datas:
+            novos = restante[restante["DataRef"] < datas.iloc[args.base + n]]
+            for nome, funcao in [("antiga", coleta_antiga), ("fluxo", coleta_fluxo)]:
+                inicial, pico, duracao = medir(funcao, base, novos, destino)
+                print(f"{n:6d} {nome:>8} {inicial:10.0f}MB {pico:7.0f}MB {pico - inicial:8.0f}MB {duracao:6.1f}s")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Benchmark de Memória do Processamento - Superfície de Juros
+Processa uma Base_Bruta sintética muitas vezes maior que um limite de memória
+imposto ao processo nos dois modos de processa_dados_brasil: tudo em memória e
+em blocos. O modo em memória deve estourar o limite; o modo em blocos deve
+terminar com pico de memória limitado pelo tamanho do bloco. Cada medição roda
+em um processo novo.
+
+O limite vale para a memória residente (RSS), como o limite de memória de um
+contêiner: uma thread de vigia encerra o processo quando o RSS passa do limite.
+RLIMIT_AS não serve aqui porque o pyarrow reserva ~2 GB de endereçamento só
+para o alocador e o pool de threads.
+
+Uso:
+    python benchmarks/memoria_processamento.py
+    python benchmarks/memoria_processamento.py --datas 20000 --contratos 240 --limite 160 --conferir
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from dados_sinteticos import RAIZ, _modulo_processamento, gravar_base_compacta
+
+sys.path.insert(0, RAIZ)
+
+from base_bruta import ler_base  # noqa: E402
+
+ARQUIVOS = ["juros_brasil_processado.parquet", "juros_brasil_denso.parquet"]
+
+def _status_mb(campo):
+    """Campo de /proc/self/status (VmSize, VmRSS, VmHWM) em MB"""
+    with open("/proc/self/status") as f:
+        for linha in f:
+            if linha.startswith(campo + ":"):
+                return int(linha.split()[1]) / 1024
+    return 0.0
+
+def _vigiar(limite_mb, inicial, saida):
+    """Encerra o processo se o RSS passar de inicial + limite_mb"""
+    while True:
+        rss = _status_mb("VmRSS")
+        if rss - inicial > limite_mb:
+            saida.send((f"excedeu o limite ({rss - inicial:.0f} MB)", rss - inicial, float("nan")))
+            os._exit(1)
+        time.sleep(0.005)
+
+def _processar(pasta, linhas_por_bloco, limite_mb, saida):
+    processamento = _modulo_processamento()
+    os.chdir(pasta)
+
+    # Zera o pico de RSS (Linux) para medir só o processamento
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+    inicial = _status_mb("VmRSS")
+    if limite_mb:
+        threading.Thread(target=_vigiar, args=(limite_mb, inicial, saida), daemon=True).start()
+
+    inicio = time.perf_counter()
+    try:
+        processamento.processa_dados_brasil(linhas_por_bloco=linhas_por_bloco)
+        status = "ok"
+    except MemoryError as e:
+        status = f"MemoryError ({str(e)[:40]})"
+    duracao = time.perf_counter() - inicio
+
+    # Picos entre duas leituras da vigia também contam
+    pico = _status_mb("VmHWM") - inicial
+    if limite_mb and pico > limite_mb:
+        status = f"excedeu o limite ({pico:.0f} MB)"
+    saida.send((status, pico, duracao))
+
+def medir(pasta, linhas_por_bloco, limite_mb):
+    """(status, acréscimo do pico de RSS em MB, tempo) em um processo novo"""
+    contexto = multiprocessing.get_context("spawn")
+    entrada, saida = contexto.Pipe(duplex=False)
+    processo = contexto.Process(target=_processar, args=(pasta, linhas_por_bloco, limite_mb, saida))
+    processo.start()
+    saida.close()
+    try:
+        resultado = entrada.recv()
+    except EOFError:
+        resultado = ("processo terminou sem resultado", float("nan"), float("nan"))
+    processo.join()
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória do processamento em blocos")
+    parser.add_argument("--datas", type=int, default=20000, help="Datas da base sintética")
+    parser.add_argument("--contratos", type=int, default=240, help="Vencimentos (mensais) por data")
+    parser.add_argument("--limite", type=int, default=160, help="Limite de memória (MB) além dos imports")
+    parser.add_argument("--blocos", type=int, nargs="+", default=[16384, 65536, 262144],
+                        help="Linhas por bloco testadas")
+    parser.add_argument("--conferir", action="store_true",
+                        help="Processa também em memória sem limite e compara os arquivos")
+    args = parser.parse_args()
+
+    print("=== BENCHMARK DE MEMÓRIA DO PROCESSAMENTO ===")
+    with tempfile.TemporaryDirectory() as destino:
+        pasta_dados = os.path.join(destino, "Dados")
+        os.makedirs(pasta_dados)
+        registros = gravar_base_compacta(os.path.join(pasta_dados, "Base_Bruta.parquet"), args.datas,
+                                         n_contratos=args.contratos, passo_meses=1)
+
+        # Tamanho da base no formato original (o que o modo em memória carrega)
+        amostra = ler_base(os.path.join(pasta_dados, "Base_Bruta.parquet"), inicio="2000-01-01", fim="2000-12-31")
+        mb_legado = amostra.memory_usage(deep=True).sum() / len(amostra) * registros / 1e6
+        print(f"Base: {registros} registros ({args.datas} datas x {args.contratos} vencimentos), "
+              f"~{mb_legado:.0f} MB no formato original; limite {args.limite} MB "
+              f"(a base é {mb_legado / args.limite:.1f}x o limite)")
+
+        print(f"{'Modo':>16} {'Limite':>8} {'Status':>40} {'Pico RSS':>9} {'Tempo':>7}")
+        cenarios = [("memória", 0, args.limite)] + [(f"blocos {n}", n, args.limite) for n in args.blocos]
+        referencia = {}
+        for nome, linhas_por_bloco, limite in cenarios:
+            status, pico, duracao = medir(destino, linhas_por_bloco, limite)
+            print(f"{nome:>16} {limite:6d}MB {status:>40} {pico:7.0f}MB {duracao:6.1f}s")
+            if status == "ok" and linhas_por_bloco:
+                referencia = {a: pd.read_parquet(os.path.join(pasta_dados, a)) for a in ARQUIVOS}
+
+        if args.conferir:
+            status, pico, duracao = medir(destino, 0, 0)
+            print(f"{'memória':>16} {'sem':>8} {status:>40} {pico:7.0f}MB {duracao:6.1f}s")
+            for arquivo in ARQUIVOS:
+                iguais = referencia.get(arquivo) is not None and \
+                    referencia[arquivo].equals(pd.read_parquet(os.path.join(pasta_dados, arquivo)))
+                print(f"{arquivo}: blocos {'==' if iguais else '!='} memória")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Benchmark do Reprocessamento Paralelo - Superfície de Juros
+Mede o tempo do reprocessamento completo do Brasil (grade padrão e densa) em
+série e com os anos da base distribuídos em 2, 4, ... processos, e confere que
+os arquivos gerados são iguais. O ganho depende dos núcleos disponíveis, que
+são informados junto com o resultado; para máquinas com mais núcleos que a
+atual, uma estimativa (lei de Amdahl) separa o tempo das tarefas (intervalos
+de anos), que se dividem entre os processos, do tempo da junção, que não se
+divide.
+
+Uso:
+    python benchmarks/reprocessamento_paralelo.py
+    python benchmarks/reprocessamento_paralelo.py --datas 10000 --contratos 120 --processos 2 4 8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from dados_sinteticos import _modulo_processamento, gravar_base_compacta
+
+ARQUIVOS = ["juros_brasil_processado.parquet", "juros_brasil_denso.parquet"]
+
+def medir(processamento, processos, repeticoes):
+    """Mediana do tempo (s) de processa_dados_brasil com `processos`"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        processamento.processa_dados_brasil(processos=processos)
+        tempos.append(time.perf_counter() - inicio)
+    return float(np.median(tempos))
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprocessamento paralelo por ano")
+    parser.add_argument("--datas", type=int, default=10000, help="Datas da base sintética")
+    parser.add_argument("--contratos", type=int, default=120, help="Vencimentos (mensais) por data")
+    parser.add_argument("--processos", type=int, nargs="+", default=[2, 4], help="Processos testados")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Repetições por cenário")
+    args = parser.parse_args()
+
+    print("=== BENCHMARK DO REPROCESSAMENTO PARALELO ===")
+    processamento = _modulo_processamento()
+    processamento.feriados_anbima()  # fora da medição
+
+    original = os.getcwd()
+    with tempfile.TemporaryDirectory() as destino:
+        os.makedirs(os.path.join(destino, "Dados"))
+        registros = gravar_base_compacta(os.path.join(destino, "Dados", "Base_Bruta.parquet"), args.datas,
+                                         n_contratos=args.contratos, passo_meses=1)
+        os.chdir(destino)
+        print(f"Base: {registros} registros ({args.datas} datas x {args.contratos} vencimentos); "
+              f"{os.cpu_count()} núcleos disponíveis")
+
+        serie = medir(processamento, 1, args.repeticoes)
+        referencia = {a: pd.read_parquet(os.path.join("Dados", a)) for a in ARQUIVOS}
+
+        print(f"{'Processos':>10} {'Tempo':>8} {'Ganho':>7} {'Arquivos':>9}")
+        print(f"{'série':>10} {serie:7.2f}s {1:6.2f}x {'-':>9}")
+        for processos in args.processos:
+            duracao = medir(processamento, processos, args.repeticoes)
+            iguais = all(referencia[a].equals(pd.read_parquet(os.path.join("Dados", a))) for a in ARQUIVOS)
+            print(f"{processos:10d} {duracao:7.2f}s {serie / duracao:6.2f}x {'iguais' if iguais else 'DIFEREM':>9}")
+
+        # Tarefas em série (parte que se divide entre os processos) e o restante
+        # (leitura dos anos, junção e escrita), medido com um único processo
+        base = os.path.join("Dados", "Base_Bruta.parquet")
+
+        def tarefas(nucleos):
+            inicio = time.perf_counter()
+            for tarefa in processamento.tarefas_brasil(base, 2 * nucleos):
+                processamento.processa_anos_brasil(tarefa)
+            return time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        processamento.processa_brasil_paralelo(base, processos=1)
+        juncao = max(time.perf_counter() - inicio - tarefas(1), 0.0)
+        print(f"\nEstimativa com N núcleos (junção {juncao:.2f}s)")
+        for nucleos in sorted({2, 4, 8} | set(args.processos)):
+            estimado = juncao + tarefas(nucleos) / nucleos
+            print(f"{nucleos:10d} {estimado:7.2f}s {serie / estimado:6.2f}x")
+        os.chdir(original)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
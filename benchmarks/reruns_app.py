@@ -0,0 +1,220 @@
+"""
+Benchmark de Reruns do App - Superfície de Juros
+Executa 3_app_streamlit.py sem navegador (AppTest do Streamlit) em todas as
+visualizações, mede latência e memória por rerun sobre bases sintéticas de
+tamanho crescente e compara com a baseline salva.
+
+Uso:
+    python benchmarks/reruns_app.py                       # compara com a baseline
+    python benchmarks/reruns_app.py --atualizar-baseline  # grava nova baseline
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from dados_sinteticos import gerar_pasta_dados
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAMINHO_APP = os.path.join(RAIZ, "3_app_streamlit.py")
+CAMINHO_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_reruns_app.json")
+
+TAMANHOS_PADRAO = [250, 1000, 4000]
+
+# Script mínimo que renderiza o dashboard comparativo (não acessível pela navegação principal)
+SCRIPT_DASHBOARD = f"""
+import importlib.util
+spec = importlib.util.spec_from_file_location("app_superficie", {CAMINHO_APP!r})
+app = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(app)
+app.criar_dashboard_comparativo(app.obter_snapshot())
+"""
+
+def bytes_figuras(at):
+    """Soma o tamanho (bytes) das specs Plotly enviadas no último rerun"""
+    return sum(len(el.proto.spec.encode("utf-8")) for el in at.get("plotly_chart"))
+
+def executar_rerun(at, acao, medir_memoria=False):
+    """Aplica uma ação e executa o rerun, retornando tempo, memória e payload"""
+    if medir_memoria:
+        tracemalloc.start()
+
+    inicio = time.perf_counter()
+    acao(at)
+    duracao = time.perf_counter() - inicio
+
+    pico = 0
+    if medir_memoria:
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    if at.exception:
+        raise RuntimeError(f"Exceção no app: {at.exception[0].message}")
+
+    return {"tempo": duracao, "memoria": pico, "bytes_figuras": bytes_figuras(at)}
+
+def _mudar_datas(at):
+    """Altera todos os seletores de data da visualização atual"""
+    for campo in at.date_input:
+        valor = campo.value
+        if isinstance(valor, datetime.date) and campo.min is not None:
+            novo = max(campo.min, valor - datetime.timedelta(days=30))
+            campo.set_value(novo)
+    for seletor in at.selectbox:
+        seletor.set_value(seletor.options[0] if seletor.index else seletor.options[-1])
+    at.run()
+
+def _clicar(chave):
+    def acao(at):
+        at.button(key=chave).click().run()
+    return acao
+
+def _radio(indice):
+    def acao(at):
+        at.radio[0].set_value(at.radio[0].options[indice]).run()
+    return acao
+
+# Cenários: (nome, script, sequência de ações). Após a execução inicial, as
+# ações levam o app à visualização; a última é o rerun medido.
+CENARIOS = [
+    ("historica_brasil", "app", [_mudar_datas]),
+    ("historica_eua", "app", [_clicar("btn_curvas_eua"), _mudar_datas]),
+    ("superficie_brasil", "app", [_clicar("btn_sup_br"), _mudar_datas]),
+    ("superficie_eua", "app", [_clicar("btn_sup_eua"), _mudar_datas]),
+    ("superficie_forward", "app", [_clicar("btn_fwd_br"), _mudar_datas]),
+    ("dashboard_curvas", "dashboard", [_radio(0)]),
+    ("dashboard_superficies", "dashboard", [_radio(1)]),
+]
+
+def novo_app(tipo, timeout):
+    if tipo == "dashboard":
+        return AppTest.from_string(SCRIPT_DASHBOARD, default_timeout=timeout)
+    return AppTest.from_file(CAMINHO_APP, default_timeout=timeout)
+
+def medir_tamanho(n_datas, repeticoes, timeout):
+    """Mede todos os cenários para uma base sintética com n_datas datas"""
+    resultados = {}
+    diretorio_original = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as destino:
+        gerar_pasta_dados(destino, n_datas)
+        os.chdir(destino)
+        try:
+            st.cache_data.clear()
+            st.cache_resource.clear()
+
+            # Carga fria: primeira execução sem cache
+            inicio = time.perf_counter()
+            novo_app("app", timeout).run()
+            resultados["carga_inicial"] = {
+                "tempos": [time.perf_counter() - inicio],
+                "memoria": 0,
+                "bytes_figuras": 0,
+            }
+
+            for nome, tipo, acoes in CENARIOS:
+                at = novo_app(tipo, timeout)
+                at.run()
+                for acao in acoes[:-1]:
+                    acao(at)
+
+                # Reruns medidos (cache quente)
+                medidas = [executar_rerun(at, acoes[-1]) for _ in range(repeticoes)]
+                memoria = executar_rerun(at, acoes[-1], medir_memoria=True)["memoria"]
+
+                resultados[nome] = {
+                    "tempos": [m["tempo"] for m in medidas],
+                    "memoria": memoria,
+                    "bytes_figuras": max(m["bytes_figuras"] for m in medidas),
+                }
+                print(f"  {nome:24s} p95={np.percentile(resultados[nome]['tempos'], 95):7.3f}s "
+                      f"payload={resultados[nome]['bytes_figuras'] / 1024:9.1f} KiB "
+                      f"memória={memoria / 1024 ** 2:7.1f} MiB")
+        finally:
+            os.chdir(diretorio_original)
+
+    return resultados
+
+def resumir(resultados):
+    """Reduz as medições brutas às métricas guardadas na baseline"""
+    resumo = {}
+    for tamanho, cenarios in resultados.items():
+        resumo[tamanho] = {
+            nome: {
+                "p50": float(np.percentile(m["tempos"], 50)),
+                "p95": float(np.percentile(m["tempos"], 95)),
+                "memoria": int(m["memoria"]),
+                "bytes_figuras": int(m["bytes_figuras"]),
+            }
+            for nome, m in cenarios.items()
+        }
+    return resumo
+
+def comparar_baseline(resumo, baseline, tolerancia_tempo, tolerancia_bytes):
+    """Retorna a lista de regressões em relação à baseline"""
+    regressoes = []
+    for tamanho, cenarios in resumo.items():
+        for nome, atual in cenarios.items():
+            base = baseline.get(tamanho, {}).get(nome)
+            if base is None:
+                continue
+            if atual["p95"] > base["p95"] * (1 + tolerancia_tempo):
+                regressoes.append(f"{tamanho} datas / {nome}: p95 {atual['p95']:.3f}s > "
+                                  f"baseline {base['p95']:.3f}s (+{tolerancia_tempo:.0%})")
+            if atual["bytes_figuras"] > base["bytes_figuras"] * (1 + tolerancia_bytes):
+                regressoes.append(f"{tamanho} datas / {nome}: payload {atual['bytes_figuras']} bytes > "
+                                  f"baseline {base['bytes_figuras']} bytes (+{tolerancia_bytes:.0%})")
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de reruns do app Streamlit")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS_PADRAO,
+                        help="Quantidade de datas das bases sintéticas")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Reruns medidos por cenário")
+    parser.add_argument("--timeout", type=float, default=300, help="Timeout (s) de cada rerun")
+    parser.add_argument("--tolerancia-tempo", type=float, default=0.5,
+                        help="Aumento relativo máximo do p95 antes de falhar")
+    parser.add_argument("--tolerancia-bytes", type=float, default=0.05,
+                        help="Aumento relativo máximo do payload das figuras antes de falhar")
+    parser.add_argument("--baseline", default=CAMINHO_BASELINE)
+    parser.add_argument("--atualizar-baseline", action="store_true")
+    args = parser.parse_args()
+
+    print("=== BENCHMARK DE RERUNS DO APP ===")
+    resultados = {}
+    for n_datas in args.tamanhos:
+        print(f"Base sintética com {n_datas} datas:")
+        resultados[str(n_datas)] = medir_tamanho(n_datas, args.repeticoes, args.timeout)
+
+    resumo = resumir(resultados)
+
+    if args.atualizar_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(resumo, f, indent=2, ensure_ascii=False)
+        print(f"Baseline salva: {args.baseline}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    regressoes = comparar_baseline(resumo, baseline, args.tolerancia_tempo, args.tolerancia_bytes)
+    if regressoes:
+        print("❌ Regressões de desempenho encontradas:")
+        for r in regressoes:
+            print(f"  - {r}")
+        return 1
+
+    print("✅ Nenhuma regressão em relação à baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Servidor de Cotações Local - Superfície de Juros
+Substituto local da fonte de cotações do pregão, para testar a coleta
+intradiária e o app sem acesso à B3. Responde no formato da B3
+(/mds/api/v1/DerivativeQuotation/<mercadoria>, taxa negociada em curPrc) com
+cotações que evoluem: a cada passo uma fração dos contratos muda de taxa.
+Cada resposta traz um ETag e consultas sem mudança recebem 304.
+
+Uso:
+    python benchmarks/servidor_cotacoes.py --porta 8765 --passo 2
+    python coleta_intradiaria.py --intervalo 2 \\
+        --url "http://127.0.0.1:8765/mds/api/v1/DerivativeQuotation/{mercadoria}"
+"""
+
+import argparse
+import http.server
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from dados_sinteticos import CODIGOS_MES, _curva_base
+
+class ServidorCotacoes:
+    """
+    Cotações sintéticas servidas por HTTP. Com `passo` (segundos) elas mudam
+    sozinhas em segundo plano; sem ele, só a cada `avancar()`, o que permite
+    conferir a coleta contra o histórico exato de mudanças (`mudancas`).
+    """
+
+    def __init__(self, mercadorias=("DI1",), n_contratos=40, fracao=0.3, passo=None, porta=0, semente=42):
+        self.rng = np.random.default_rng(semente)
+        self.fracao = fracao
+        self.passo = passo
+        hoje = pd.Timestamp.today().normalize()
+        vencimentos = pd.date_range(hoje + pd.offsets.MonthBegin(1), periods=n_contratos, freq="MS")
+        du = np.maximum(np.busday_count(hoje.date(), vencimentos.values.astype("datetime64[D]")), 1)
+        self.taxas = {}
+        for i, mercadoria in enumerate(mercadorias):
+            curva = _curva_base(du, 0.12 - 0.05 * i, 0.01) * 100
+            for vencimento, taxa in zip(vencimentos, curva):
+                codigo = f"{CODIGOS_MES[vencimento.month - 1]}{vencimento.year % 100:02d}"
+                self.taxas[(mercadoria, codigo)] = round(float(taxa), 3)
+        self.versao = 0
+        self.mudancas = len(self.taxas)  # a primeira consulta traz todos os contratos
+        self.requisicoes = self.respostas_304 = 0
+        self._corpos = {}
+        self._trava = threading.Lock()
+        self._servidor = http.server.ThreadingHTTPServer(("127.0.0.1", porta), self._tratador())
+        self.porta = self._servidor.server_address[1]
+        self.url = f"http://127.0.0.1:{self.porta}/mds/api/v1/DerivativeQuotation/{{mercadoria}}"
+        self._parar = threading.Event()
+
+    def avancar(self):
+        """Muda a taxa de uma fração dos contratos (múltiplos de 0,001 p.p.); retorna quantos mudaram"""
+        with self._trava:
+            chaves = list(self.taxas)
+            escolhidos = self.rng.choice(len(chaves), max(1, int(len(chaves) * self.fracao)), replace=False)
+            for i in escolhidos:
+                passo = int(self.rng.choice([-3, -2, -1, 1, 2, 3]))
+                self.taxas[chaves[i]] = round(self.taxas[chaves[i]] + passo * 0.001, 3)
+            self.versao += 1
+            self.mudancas += len(escolhidos)
+            self._corpos = {}
+            return len(escolhidos)
+
+    def cotacoes(self):
+        with self._trava:
+            return dict(self.taxas)
+
+    def corpo(self, mercadoria):
+        """(ETag, JSON) da mercadoria na versão atual"""
+        with self._trava:
+            if mercadoria not in self._corpos:
+                papeis = [
+                    {"SctyQtn": {"curPrc": taxa, "prvsDayAdjstmntPric": taxa},
+                     "asset": {"code": mercadoria}, "mkt": {"cd": "FUT"}, "symb": mercadoria + codigo}
+                    for (m, codigo), taxa in self.taxas.items() if m == mercadoria
+                ]
+                conteudo = {"BizSts": {"cd": "OK"}, "Msg": {"dtTm": time.strftime("%Y-%m-%d %H:%M:%S")},
+                            "Scty": papeis}
+                self._corpos[mercadoria] = (f'"{mercadoria}-{self.versao}"', json.dumps(conteudo).encode())
+            return self._corpos[mercadoria]
+
+    def _tratador(self):
+        servidor = self
+
+        class Tratador(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                servidor.requisicoes += 1
+                etag, corpo = servidor.corpo(self.path.rstrip("/").rsplit("/", 1)[-1])
+                if self.headers.get("If-None-Match") == etag:
+                    servidor.respostas_304 += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        return Tratador
+
+    def iniciar(self):
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        if self.passo:
+            threading.Thread(target=self._evoluir, daemon=True).start()
+        return self
+
+    def _evoluir(self):
+        while not self._parar.wait(self.passo):
+            self.avancar()
+
+    def parar(self):
+        self._parar.set()
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local de cotações que evoluem")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--passo", type=float, default=2.0, help="Segundos entre mudanças de cotação")
+    parser.add_argument("--contratos", type=int, default=40, help="Vencimentos por mercadoria")
+    parser.add_argument("--fracao", type=float, default=0.3, help="Fração dos contratos que muda a cada passo")
+    parser.add_argument("--mercadorias", nargs="+", default=["DI1"])
+    args = parser.parse_args()
+
+    servidor = ServidorCotacoes(args.mercadorias, args.contratos, args.fracao, args.passo, args.porta).iniciar()
+    print(f"Servindo cotações em {servidor.url} (mudanças a cada {args.passo:g}s); Ctrl+C encerra")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        servidor.parar()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
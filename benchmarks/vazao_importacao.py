@@ -0,0 +1,244 @@
+"""
+Benchmark da Importação de Arquivos da B3 - Superfície de Juros
+Gera arquivos de fim de dia no formato da B3 para um histórico sintético de
+DI1, DAP e DDI (misturados a outros instrumentos, como no arquivo real):
+Boletim de Preços BVBG.086 em XML, um .zip dentro de outro por pregão, e
+planilhas CSV, um .zip por mês. Importa cada formato para bases vazias com
+importacao_b3.py, confere os registros gravados contra o histórico e compara
+as datas por minuto com a coleta pela página de ajustes (get_contracts),
+servida por um servidor HTTP local. Sem a latência da B3 (uma requisição por
+data), o número da coleta é um limite superior.
+
+Uso:
+    python benchmarks/vazao_importacao.py
+    python benchmarks/vazao_importacao.py --datas 1000 --outros 20000 --paginas 100
+"""
+
+import argparse
+import datetime
+import http.server
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from urllib.parse import parse_qs
+
+import numpy as np
+import pandas as pd
+
+from dados_sinteticos import RAIZ, gerar_base_bruta
+
+sys.path.insert(0, RAIZ)
+
+import importacao_b3  # noqa: E402
+from base_bruta import MERCADORIAS, caminho_mercadoria, ler_base  # noqa: E402
+
+COLUNAS = ["DataRef", "Mercadoria", "CDVencimento", "PUAnterior", "PUAtual", "Variacao"]
+
+# Nomes das mercadorias na página de ajustes (só os 3 primeiros caracteres contam)
+NOMES_PAGINA = {"DI1": "DI1 - DI de 1 dia", "DAP": "DAP - Cupom de DI x IPCA", "DDI": "DDI - Cupom Cambial"}
+
+def historico(n_datas, semente=42):
+    """Ajustes de DI1, DAP e DDI (formato da base bruta) com PU anterior e variação"""
+    rng = np.random.default_rng(semente)
+    di1 = gerar_base_bruta(n_datas, semente=semente)
+    partes = []
+    for i, mercadoria in enumerate(MERCADORIAS):
+        df = di1[COLUNAS].copy()
+        df["Mercadoria"] = mercadoria
+        df["PUAtual"] = (df["PUAtual"] * (1 + 0.01 * i)).round(2)
+        df["PUAnterior"] = (df["PUAtual"] + rng.normal(0, 20, len(df))).round(2)
+        df["Variacao"] = (df["PUAtual"] - df["PUAnterior"]).round(2)
+        partes.append(df)
+    return pd.concat(partes, ignore_index=True)
+
+def outros_tickers(n):
+    """Instrumentos que não interessam (opções, ações, rolagens), como no boletim completo"""
+    prefixos = ["PETRA", "VALEB", "WINJ", "WDOK", "DOLM", "IND", "DI1F25F27", "DAPK30", "BOVAX"]
+    return [f"{prefixos[i % len(prefixos)]}{i}" for i in range(n)]
+
+def _pric_rpt(data, ticker, pu_atual, pu_anterior):
+    return (f"<PricRpt><TradDt><Dt>{data}</Dt></TradDt><SctyId><TckrSymb>{ticker}</TckrSymb></SctyId>"
+            f"<FinInstrmId><OthrId><Id>100000000</Id><Tp><Prtry>8</Prtry></Tp><PlcOfListg><MktIdrCd>BVMF"
+            f"</MktIdrCd></PlcOfListg></OthrId></FinInstrmId><TradDtls><TradQty>1500</TradQty></TradDtls>"
+            f"<FinInstrmAttrbts><MktDataStrmId>E</MktDataStrmId><NtlFinVol Ccy=\"BRL\">1234567.89</NtlFinVol>"
+            f"<OpnIntrst>54321</OpnIntrst><FinInstrmQty>1500</FinInstrmQty><AdjstdQt>{pu_atual:.2f}</AdjstdQt>"
+            f"<AdjstdQtTax>10.5</AdjstdQtTax><AdjstdQtStin>A</AdjstdQtStin><PrvsAdjstdQt>{pu_anterior:.2f}"
+            f"</PrvsAdjstdQt><PrvsAdjstdQtTax>10.4</PrvsAdjstdQtTax><PrvsAdjstdQtStin>A</PrvsAdjstdQtStin>"
+            f"</FinInstrmAttrbts></PricRpt>")
+
+def xml_pregao(data, ajustes, outros):
+    """Boletim de Preços BVBG.086 de um pregão (envelope BVBG.052 como no arquivo da B3)"""
+    dia = f"{data:%Y-%m-%d}"
+    precos = [_pric_rpt(dia, m + c, atual, anterior) for m, c, atual, anterior in
+              zip(ajustes["Mercadoria"], ajustes["CDVencimento"], ajustes["PUAtual"], ajustes["PUAnterior"])]
+    precos += [_pric_rpt(dia, ticker, 10.0 + i % 97, 10.0) for i, ticker in enumerate(outros)]
+    return ('<?xml version="1.0" encoding="UTF-8"?><Document xmlns="urn:bvmf.052.01.xsd"><BizFileHdr>'
+            '<Xchg><BizGrpDesc>BVBG.086.01</BizGrpDesc></Xchg></BizFileHdr><BizGrp>'
+            '<Document xmlns="urn:bvmf.217.01.xsd">' + ''.join(precos) + '</Document></BizGrp></Document>').encode()
+
+def gerar_xml(pasta, hist, outros):
+    """PRaammdd.zip por pregão, com outro .zip dentro e o XML nele (como o download da B3)"""
+    caminhos = []
+    for data, ajustes in hist.groupby("DataRef"):
+        interno = io.BytesIO()
+        with zipfile.ZipFile(interno, "w", zipfile.ZIP_DEFLATED) as pacote:
+            pacote.writestr(f"BVBG.086.01_BV000328{data:%Y%m%d}0001.xml", xml_pregao(data, ajustes, outros))
+        caminho = os.path.join(pasta, f"PR{data:%y%m%d}.zip")
+        with zipfile.ZipFile(caminho, "w", zipfile.ZIP_STORED) as pacote:
+            pacote.writestr(f"PR{data:%y%m%d}.zip", interno.getvalue())
+        caminhos.append(caminho)
+    return caminhos
+
+def gerar_csv(pasta, hist, outros):
+    """Um .zip por mês com a planilha CSV (linha de título, ';' e vírgula decimal)"""
+    def virgula(x):
+        return f"{x:.2f}".replace(".", ",")
+
+    caminhos = []
+    for mes, ajustes in hist.groupby(hist["DataRef"].dt.to_period("M")):
+        linhas = ["Status do Arquivo: Final", "RptDt;TckrSymb;ISIN;SgmtNm;AdjstdQt;AdjstdQtTax;PrvsAdjstdQt"]
+        for data, dia in ajustes.groupby("DataRef"):
+            d = f"{data:%Y-%m-%d}"
+            linhas += [f"{d};{m}{c};BRBMEF;FINANCIAL;{virgula(atual)};10,5;{virgula(anterior)}"
+                       for m, c, atual, anterior in
+                       zip(dia["Mercadoria"], dia["CDVencimento"], dia["PUAtual"], dia["PUAnterior"])]
+            linhas += [f"{d};{t};BRXXXX;EQUITY CALL;{10 + i % 97},00;;10,00" for i, t in enumerate(outros)]
+        caminho = os.path.join(pasta, f"TradeInformationConsolidated_{mes}.zip")
+        with zipfile.ZipFile(caminho, "w", zipfile.ZIP_DEFLATED) as pacote:
+            pacote.writestr(f"TradeInformationConsolidated_{mes}.csv", "\n".join(linhas) + "\n")
+        caminhos.append(caminho)
+    return caminhos
+
+def conferir(hist):
+    """Bases gravadas iguais ao histórico (mesmos registros e valores)"""
+    for mercadoria in MERCADORIAS:
+        gravado = ler_base(caminho_mercadoria(mercadoria), colunas=COLUNAS)
+        esperado = hist[hist["Mercadoria"] == mercadoria]
+        if len(gravado) != len(esperado):
+            return False
+        gravado = gravado.sort_values(["DataRef", "CDVencimento"]).reset_index(drop=True)
+        esperado = esperado.sort_values(["DataRef", "CDVencimento"]).reset_index(drop=True)
+        if not ((gravado["CDVencimento"].astype(str) == esperado["CDVencimento"]).all() and
+                np.allclose(gravado[["PUAnterior", "PUAtual", "Variacao"]], esperado[["PUAnterior", "PUAtual",
+                                                                                      "Variacao"]])):
+            return False
+    return True
+
+def importar(pasta, caminhos, hist):
+    """(segundos, bases iguais ao histórico) da importação para bases vazias em `pasta`"""
+    os.chdir(pasta)
+    os.makedirs("Dados", exist_ok=True)
+    inicio = time.perf_counter()
+    importacao_b3.importar(caminhos)
+    duracao = time.perf_counter() - inicio
+    return duracao, conferir(hist)
+
+def pagina(data, ajustes, outros):
+    """Página de ajustes do pregão (seis células por contrato, nome só no primeiro)"""
+    def numero(x):
+        return f"{x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+    celulas = []
+    for mercadoria, contratos in ajustes.groupby("Mercadoria", sort=False):
+        for i, (c, anterior, atual, variacao) in enumerate(zip(contratos["CDVencimento"], contratos["PUAnterior"],
+                                                             contratos["PUAtual"], contratos["Variacao"])):
+            celulas += [NOMES_PAGINA[mercadoria] if i == 0 else "", c, numero(anterior), numero(atual),
+                        numero(variacao), "10,00"]
+    for i, ticker in enumerate(outros):
+        celulas += [f"X{i // 10:02d} - Outro" if i % 10 == 0 else "", "F25", "10,00", "10,00", "0,00", "0,00"]
+    tds = "".join(f"<td>{c}</td>" for c in celulas)
+    return (f"<html><body><p>Atualizado em: {data:%d/%m/%Y}</p><table id=\"tblDadosAjustes\"><tr>{tds}</tr>"
+            f"</table></body></html>").encode("latin-1")
+
+def coletar(hist, outros, n_paginas):
+    """Segundos da coleta de `n_paginas` datas pela página, servida localmente"""
+    paginas = {data: pagina(data, ajustes, outros) for data, ajustes in hist.groupby("DataRef")}
+
+    class Servidor(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            campos = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+            corpo = paginas[pd.Timestamp(datetime.datetime.strptime(campos["dData1"][0], "%d/%m/%Y"))]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=latin-1")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Servidor)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    local = f"http://127.0.0.1:{servidor.server_address[1]}/"
+
+    spec = importlib.util.spec_from_file_location("coleta_dados", os.path.join(RAIZ, "1_coleta_dados.py"))
+    coleta = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(coleta)
+    post = coleta.requests.post
+
+    class Requisicoes:
+        """Envia as requisições da coleta para o servidor local"""
+        @staticmethod
+        def post(url, **kwargs):
+            return post(local, **kwargs)
+
+    coleta.requests = Requisicoes
+    inicio = time.perf_counter()
+    for data in list(paginas)[:n_paginas]:
+        df = coleta.get_contracts(data.to_pydatetime(), mercadoria=MERCADORIAS)
+        assert len(df) == len(hist[hist["DataRef"] == data])
+    duracao = time.perf_counter() - inicio
+    servidor.shutdown()
+    return duracao, min(n_paginas, len(paginas))
+
+def main():
+    parser = argparse.ArgumentParser(description="Importação de arquivos da B3")
+    parser.add_argument("--datas", type=int, default=500, help="Pregões do histórico sintético")
+    parser.add_argument("--outros", type=int, default=5000, help="Outros instrumentos por pregão nos arquivos")
+    parser.add_argument("--paginas", type=int, default=50, help="Datas coletadas pela página de ajustes")
+    parser.add_argument("--latencia", type=float, default=1.0,
+                        help="Segundos por requisição à B3 na estimativa da coleta real")
+    args = parser.parse_args()
+
+    print("=== BENCHMARK DA IMPORTAÇÃO DE ARQUIVOS DA B3 ===")
+    hist = historico(args.datas)
+    outros = outros_tickers(args.outros)
+    print(f"Histórico: {args.datas} pregões, {len(hist)} ajustes de {', '.join(MERCADORIAS)}; "
+          f"{args.outros} outros instrumentos por pregão")
+
+    original = os.getcwd()
+    with tempfile.TemporaryDirectory() as destino:
+        print(f"{'Fonte':>28} {'Arquivos':>9} {'Tamanho':>9} {'Datas':>6} {'Tempo':>8} {'Datas/min':>10} "
+              f"{'Bases':>7}")
+        resultados = {}
+        for formato, gerar in [("xml", gerar_xml), ("csv", gerar_csv)]:
+            pasta = os.path.join(destino, formato)
+            os.makedirs(os.path.join(pasta, "arquivos"))
+            caminhos = gerar(os.path.join(pasta, "arquivos"), hist, outros)
+            tamanho = sum(os.path.getsize(c) for c in caminhos) / 1e6
+            duracao, iguais = importar(pasta, caminhos, hist)
+            resultados[formato] = args.datas / duracao * 60
+            nome = {"xml": "BVBG.086 (XML, zip em zip)", "csv": "CSV mensal (zip)"}[formato]
+            print(f"{nome:>28} {len(caminhos):9d} {tamanho:7.1f}MB {args.datas:6d} {duracao:7.1f}s "
+                  f"{resultados[formato]:10.0f} {'iguais' if iguais else 'DIFEREM':>7}")
+        os.chdir(original)
+
+        duracao, paginas = coletar(hist, outros, args.paginas)
+        por_minuto = paginas / duracao * 60
+        print(f"{'página de ajustes (local)':>28} {paginas:9d} {'-':>9} {paginas:6d} {duracao:7.1f}s "
+              f"{por_minuto:10.0f} {'-':>7}")
+        print(f"Importação vs página local: XML {resultados['xml'] / por_minuto:.1f}x, "
+              f"CSV {resultados['csv'] / por_minuto:.1f}x")
+        real = 60 / (args.latencia + duracao / paginas)
+        print(f"Com {args.latencia:g}s por requisição à B3, a coleta faria ~{real:.0f} datas/min: "
+              f"XML {resultados['xml'] / real:.0f}x, CSV {resultados['csv'] / real:.0f}x")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+Benchmark do Ajuste NSS - Superfície de Juros
+Mede a vazão (curvas/s) do ajuste Nelson-Siegel-Svensson com diferentes números
+de processos e compara partida quente (parâmetros do dia anterior) com partida
+a frio em todas as datas.
+
+Uso:
+    python benchmarks/vazao_nss.py                        # base sintética
+    python benchmarks/vazao_nss.py --dados ../Dados --processos 1 2 4
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from dados_sinteticos import gerar_base_bruta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import ajuste_nss  # noqa: E402
+
+def medir(datas, curvas, processos, tamanho_bloco):
+    inicio = time.perf_counter()
+    parametros = ajuste_nss.ajustar_mercado(datas, curvas, processos=processos, tamanho_bloco=tamanho_bloco)
+    duracao = time.perf_counter() - inicio
+    return len(datas) / duracao, parametros["rmse"].median()
+
+def main():
+    parser = argparse.ArgumentParser(description="Vazão do ajuste NSS")
+    parser.add_argument("--dados", default=None, help="Pasta Dados/ real (padrão: base sintética)")
+    parser.add_argument("--datas", type=int, default=1000, help="Datas da base sintética")
+    parser.add_argument("--processos", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    print("=== BENCHMARK DO AJUSTE NSS ===")
+    print(f"Núcleos disponíveis: {os.cpu_count()}")
+
+    mercados = {}
+    if args.dados:
+        mercados["brasil"] = ajuste_nss.pontos_brasil(os.path.join(args.dados, "Base_Bruta.parquet"))
+        mercados["eua"] = ajuste_nss.pontos_eua(os.path.join(args.dados, "juros_eua_processado.parquet"))
+    else:
+        with tempfile.TemporaryDirectory() as destino:
+            caminho = os.path.join(destino, "Base_Bruta.parquet")
+            gerar_base_bruta(args.datas).to_parquet(caminho)
+            mercados["brasil"] = ajuste_nss.pontos_brasil(caminho)
+
+    print(f"{'Mercado':>8} {'Partida':>8} {'Processos':>10} {'Curvas':>7} {'Curvas/s':>9} {'RMSE (bp)':>10}")
+    for mercado, (datas, curvas) in mercados.items():
+        # Partida a frio em todas as datas (blocos de uma data)
+        vazao, rmse = medir(datas, curvas, 1, 1)
+        print(f"{mercado:>8} {'frio':>8} {1:10d} {len(datas):7d} {vazao:9.1f} {rmse * 1e4:10.2f}")
+
+        for processos in sorted(set(args.processos)):
+            vazao, rmse = medir(datas, curvas, processos, ajuste_nss.TAMANHO_BLOCO)
+            print(f"{mercado:>8} {'quente':>8} {processos:10d} {len(datas):7d} {vazao:9.1f} {rmse * 1e4:10.2f}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
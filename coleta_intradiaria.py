@@ -0,0 +1,165 @@
+"""
+Coleta Intradiária - Superfície de Juros
+Consulta as cotações dos contratos durante o pregão em intervalos regulares,
+compara com a última fotografia e grava só os contratos que mudaram no
+arquivo do dia (Dados/intradiario/AAAA-MM-DD.jsonl, uma linha por mudança,
+sempre acrescentada no fim). O app acompanha esse arquivo e atualiza a curva
+do pregão nas sessões abertas, sem recarregar a base nem mudar a versão dos
+dados.
+
+Uso:
+    python coleta_intradiaria.py                   # cotações da B3 a cada 15 s
+    python coleta_intradiaria.py --intervalo 5 --mercadorias DI1 DAP
+    python coleta_intradiaria.py --url "http://127.0.0.1:8765/mds/api/v1/DerivativeQuotation/{mercadoria}"
+"""
+
+import argparse
+import datetime
+import json
+import os
+import time
+
+import requests
+
+from armazenamento import PASTA_INTRADIARIO, caminho_intradiario
+from base_bruta import padrao_ticker
+
+# Cotações correntes da B3 por mercadoria (a taxa negociada está em curPrc)
+URL_COTACOES = 'https://cotacao.b3.com.br/mds/api/v1/DerivativeQuotation/{mercadoria}'
+
+# Segundos entre consultas e mercadorias consultadas por padrão
+INTERVALO = 15
+MERCADORIAS_INTRADIARIO = ('DI1',)
+
+def ler_cotacoes(conteudo, mercadoria):
+    """{(mercadoria, vencimento): taxa} da resposta da B3, só contratos futuros simples negociados"""
+    padrao = padrao_ticker((mercadoria,))
+    cotacoes = {}
+    for papel in conteudo.get('Scty') or []:
+        encontrado = padrao.match(str(papel.get('symb', '')).strip())
+        taxa = (papel.get('SctyQtn') or {}).get('curPrc')
+        if encontrado and taxa is not None:
+            cotacoes[(mercadoria, encontrado.group(2))] = float(taxa)
+    return cotacoes
+
+def diferencas(anteriores, atuais):
+    """Contratos novos ou com cotação diferente da última fotografia"""
+    return {chave: taxa for chave, taxa in atuais.items() if anteriores.get(chave) != taxa}
+
+def carregar_ultimas(caminho):
+    """
+    Última cotação de cada contrato no arquivo do dia, para retomar a coleta
+    depois de um reinício. Uma linha final incompleta (coleta interrompida no
+    meio da escrita) é descartada do arquivo.
+    """
+    ultimas = {}
+    if not os.path.exists(caminho):
+        return ultimas
+    with open(caminho, 'rb+') as f:
+        conteudo = f.read()
+        completos = conteudo.rfind(b'\n') + 1
+        if completos < len(conteudo):
+            f.truncate(completos)
+    for linha in conteudo[:completos].splitlines():
+        registro = json.loads(linha)
+        ultimas[(registro['mercadoria'], registro['vencimento'])] = registro['taxa']
+    return ultimas
+
+class FonteCotacoes:
+    """
+    Cotações correntes por HTTP, uma requisição por mercadoria em uma sessão
+    reaproveitada. Com ETag, a consulta pede só respostas novas
+    (If-None-Match): um 304 reaproveita a leitura anterior sem baixar nem
+    interpretar nada.
+    """
+
+    def __init__(self, url=URL_COTACOES, mercadorias=MERCADORIAS_INTRADIARIO, tempo_limite=10):
+        self.url = url
+        self.mercadorias = tuple(mercadorias)
+        self.tempo_limite = tempo_limite
+        self.sessao = requests.Session()
+        self.etags = {}
+        self.ultimas = {}
+        self.nao_modificadas = 0
+
+    def consultar(self):
+        """{(mercadoria, vencimento): taxa} de todas as mercadorias"""
+        cotacoes = {}
+        for mercadoria in self.mercadorias:
+            cabecalhos = {'If-None-Match': self.etags[mercadoria]} if mercadoria in self.etags else {}
+            resposta = self.sessao.get(self.url.format(mercadoria=mercadoria), headers=cabecalhos,
+                                       timeout=self.tempo_limite)
+            if resposta.status_code == 304 and mercadoria in self.ultimas:
+                self.nao_modificadas += 1
+            else:
+                resposta.raise_for_status()
+                self.ultimas[mercadoria] = ler_cotacoes(resposta.json(), mercadoria)
+                if resposta.headers.get('ETag'):
+                    self.etags[mercadoria] = resposta.headers['ETag']
+            cotacoes.update(self.ultimas[mercadoria])
+        return cotacoes
+
+class ColetorIntradiario:
+    """Consultas periódicas gravando só as mudanças no arquivo do pregão"""
+
+    def __init__(self, fonte, pasta=PASTA_INTRADIARIO):
+        self.fonte = fonte
+        self.pasta = pasta
+        self.caminho = None
+        self.ultimas = {}
+
+    def ciclo(self):
+        """Consulta, compara com a última fotografia e acrescenta as mudanças; retorna quantas"""
+        caminho = caminho_intradiario(pasta=self.pasta)
+        if caminho != self.caminho:
+            # Novo pregão (ou reinício): a fotografia é a do arquivo do dia
+            self.caminho, self.ultimas = caminho, carregar_ultimas(caminho)
+
+        mudancas = diferencas(self.ultimas, self.fonte.consultar())
+        if not mudancas:
+            return 0
+
+        hora = datetime.datetime.now().isoformat(timespec='milliseconds')
+        linhas = ''.join(
+            json.dumps({'hora': hora, 'mercadoria': mercadoria, 'vencimento': vencimento, 'taxa': taxa}) + '\n'
+            for (mercadoria, vencimento), taxa in sorted(mudancas.items())
+        )
+        os.makedirs(self.pasta, exist_ok=True)
+        with open(self.caminho, 'a', encoding='utf-8') as f:
+            f.write(linhas)
+        self.ultimas.update(mudancas)
+        return len(mudancas)
+
+    def executar(self, intervalo=INTERVALO, ciclos=None):
+        """Consulta a cada `intervalo` segundos (descontado o tempo da consulta) até `ciclos`"""
+        feitos = 0
+        while ciclos is None or feitos < ciclos:
+            inicio = time.monotonic()
+            try:
+                mudancas = self.ciclo()
+                if mudancas:
+                    print(f"{datetime.datetime.now():%H:%M:%S} {mudancas} contratos alterados")
+            except (requests.RequestException, ValueError) as e:
+                # Falha de rede ou resposta inválida: tenta de novo no próximo ciclo
+                print(f"{datetime.datetime.now():%H:%M:%S} Falha na consulta: {e}")
+            feitos += 1
+            if ciclos is None or feitos < ciclos:
+                time.sleep(max(intervalo - (time.monotonic() - inicio), 0))
+
+def main():
+    parser = argparse.ArgumentParser(description="Coleta intradiária das cotações com gravação só das mudanças")
+    parser.add_argument('--url', default=URL_COTACOES, help="URL da fonte, com {mercadoria}")
+    parser.add_argument('--intervalo', type=float, default=INTERVALO, help="Segundos entre consultas")
+    parser.add_argument('--mercadorias', nargs='+', default=list(MERCADORIAS_INTRADIARIO))
+    parser.add_argument('--ciclos', type=int, default=None, help="Número de consultas (padrão: sem fim)")
+    args = parser.parse_args()
+
+    print(f"Coleta intradiária de {', '.join(args.mercadorias)} a cada {args.intervalo:g}s em {PASTA_INTRADIARIO}")
+    coletor = ColetorIntradiario(FonteCotacoes(args.url, args.mercadorias))
+    try:
+        coletor.executar(args.intervalo, args.ciclos)
+    except KeyboardInterrupt:
+        print("Coleta intradiária encerrada")
+
+if __name__ == '__main__':
+    main()
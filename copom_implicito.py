@@ -0,0 +1,232 @@
+"""
+Copom Implícito - Superfície de Juros
+Extrai da curva DI1 a taxa implícita após cada uma das próximas reuniões do
+Copom, para todas as datas da base bruta, com forwards reunião a reunião
+vetorizadas entre datas. As colunas são relativas à data: `vigente` e `r1`...
+`r16` (taxa após a 1ª, ..., 16ª reunião seguinte).
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from bizdays import Calendar
+
+from armazenamento import escrever_parquet_lotes
+from base_bruta import ler_base
+
+CAMINHO_CALENDARIO = 'Dados/calendario_copom.csv'
+CAMINHO_COPOM = 'Dados/copom_implicito.parquet'
+
+# Reuniões à frente extraídas em cada data (16 reuniões ~ 2 anos)
+MAX_REUNIOES = 16
+COLUNAS = ['vigente'] + [f'r{k}' for k in range(1, MAX_REUNIOES + 1)]
+
+# Metadado do Parquet com a assinatura do calendário usado na extração
+CHAVE_CALENDARIO = b'calendario_copom'
+
+# Datas por bloco processado em cada processo
+TAMANHO_BLOCO = 500
+
+def carregar_calendario(caminho=CAMINHO_CALENDARIO):
+    """
+    Datas das reuniões (último dia de cada reunião) do arquivo CSV com a
+    coluna `data_reuniao`. Retorna None se o arquivo não existir.
+    """
+    if not os.path.exists(caminho):
+        return None
+    calendario = pd.read_csv(caminho, parse_dates=['data_reuniao'])
+    return np.unique(calendario['data_reuniao'].dropna().to_numpy(dtype='datetime64[D]'))
+
+def assinatura_calendario(reunioes):
+    """Hash das datas das reuniões, gravado junto com a matriz extraída"""
+    return hashlib.sha256(','.join(map(str, reunioes)).encode()).hexdigest()[:16].encode()
+
+def datas_efetivas(reunioes, feriados):
+    """A decisão vale a partir do dia útil seguinte à reunião"""
+    return np.busday_offset(reunioes, 1, roll='forward', holidays=feriados)
+
+def reunioes_seguintes(data, reunioes, feriados, n=MAX_REUNIOES):
+    """Reuniões das colunas r1...rn em `data`: as primeiras com decisão ainda não em vigor"""
+    efetivas = datas_efetivas(reunioes, feriados)
+    return reunioes[efetivas > np.datetime64(pd.Timestamp(data).date(), 'D')][:n]
+
+def extrair_bloco(bloco):
+    """
+    Taxas implícitas de um bloco de datas.
+
+    `bloco` é (datas, DU dos contratos, fator log dos contratos, efetivas, feriados),
+    com DU e fator em matrizes datas x vencimentos (NaN onde não há contrato).
+    O fator acumulado em cada data efetiva vem da interpolação flat forward
+    entre os vencimentos DI1 vizinhos; a taxa após a reunião j é a forward
+    entre a efetiva de j e a de j + 1. Todas as datas do bloco avançam juntas,
+    uma reunião por vez.
+
+    Retorna uma matriz datas x (1 + MAX_REUNIOES) de taxas anuais: a vigente
+    (até a primeira reunião) e a implícita após a k-ésima reunião seguinte a
+    cada data (NaN fora do horizonte dos contratos ou do calendário).
+    """
+    datas, du, fator, efetivas, feriados = bloco
+    n_datas = len(datas)
+    taxas = np.full((n_datas, MAX_REUNIOES + 1), np.nan)
+
+    # Dias úteis até cada data efetiva; <= 0 significa decisão já em vigor
+    du_efetivas = np.busday_count(datas[:, None], efetivas[None, :], holidays=feriados).astype(np.float64)
+    futuras = du_efetivas > 0
+    ordem = np.cumsum(futuras, axis=1)
+
+    validos = np.isfinite(fator) & (du > 0)
+    linhas = np.arange(n_datas)
+    ultima = validos.shape[1] - 1
+
+    def fator_em(prazo):
+        # Vértices vizinhos: último contrato antes do prazo (ou a data de
+        # referência, fator zero) e primeiro contrato no prazo ou depois
+        antes = validos & (du < prazo[:, None])
+        depois = validos & (du >= prazo[:, None])
+        tem_antes = antes.any(axis=1)
+        i_antes = ultima - antes[:, ::-1].argmax(axis=1)
+        i_depois = depois.argmax(axis=1)
+        du_antes = np.where(tem_antes, du[linhas, i_antes], 0.0)
+        f_antes = np.where(tem_antes, fator[linhas, i_antes], 0.0)
+        du_depois = du[linhas, i_depois]
+        f_depois = fator[linhas, i_depois]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            peso = (prazo - du_antes) / (du_depois - du_antes)
+        return np.where(depois.any(axis=1), f_antes + peso * (f_depois - f_antes), np.nan)
+
+    # Trecho vigente: da data de referência até a primeira data efetiva
+    inicio = np.zeros(n_datas)
+    acumulado = np.zeros(n_datas)
+
+    for j in range(len(efetivas)):
+        ativas = futuras[:, j] & (ordem[:, j] <= MAX_REUNIOES + 1)
+        if not ativas.any():
+            continue
+        fim = du_efetivas[:, j]
+        fator_fim = fator_em(fim)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            forward = (fator_fim - acumulado) / (fim - inicio)
+
+        # A forward até a efetiva j é a taxa vigente após a reunião anterior,
+        # que é a (ordem - 1)-ésima à frente da data (0 = vigente)
+        taxas[linhas[ativas], ordem[ativas, j] - 1] = forward[ativas]
+
+        inicio = np.where(ativas, fim, inicio)
+        acumulado = np.where(ativas, fator_fim, acumulado)
+
+    return np.expm1(taxas * 252)
+
+def preparar_blocos(base, efetivas, feriados, tamanho_bloco=TAMANHO_BLOCO):
+    """Matrizes datas x vencimentos (DU e fator log) em blocos de datas"""
+    referencia = base['DataRef'].to_numpy(dtype='datetime64[D]')
+    vencimento = np.busday_offset(base['Vencimento'].to_numpy(dtype='datetime64[D]'), 0,
+                                  roll='forward', holidays=feriados)
+    fator = np.log(100000 / base['PUAtual'].to_numpy(dtype=np.float64))
+
+    datas, linha = np.unique(referencia, return_inverse=True)
+    blocos = []
+    for i in range(0, len(datas), tamanho_bloco):
+        no_bloco = (linha >= i) & (linha < i + tamanho_bloco)
+        vencimentos, coluna = np.unique(vencimento[no_bloco], return_inverse=True)
+        datas_bloco = datas[i:i + tamanho_bloco]
+
+        matriz = np.full((len(datas_bloco), len(vencimentos)), np.nan)
+        matriz[linha[no_bloco] - i, coluna] = fator[no_bloco]
+        du = np.busday_count(datas_bloco[:, None], vencimentos[None, :], holidays=feriados).astype(np.float64)
+
+        # Só as reuniões que podem cair no horizonte do bloco
+        relevantes = (efetivas > datas_bloco[0]) & (efetivas <= vencimentos[-1])
+        blocos.append((datas_bloco, du, matriz, efetivas[relevantes], feriados))
+    return datas, blocos
+
+def extrair_taxas(base, reunioes, processos=None, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Matriz datas x (vigente, r1...r16) de taxas implícitas para a base DI1.
+
+    Os blocos de datas são independentes e rodam em processos separados.
+    """
+    feriados = np.array(Calendar.load('ANBIMA').holidays, dtype='datetime64[D]')
+    efetivas = datas_efetivas(reunioes, feriados)
+    datas, blocos = preparar_blocos(base, efetivas, feriados, tamanho_bloco)
+
+    if processos == 1 or len(blocos) <= 1:
+        resultados = [extrair_bloco(b) for b in blocos]
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            resultados = list(executor.map(extrair_bloco, blocos))
+
+    matriz = np.concatenate(resultados).astype(np.float32)
+    return pd.DataFrame(matriz, index=pd.DatetimeIndex(datas.astype('datetime64[ns]'), name='Data'), columns=COLUNAS)
+
+def movimentos_implicitos(taxas):
+    """Movimento implícito (em pontos-base) de cada reunião em relação ao trecho anterior"""
+    niveis = taxas.to_numpy(dtype=np.float64)
+    anterior = pd.DataFrame(niveis).ffill(axis=1).shift(1, axis=1).to_numpy()
+    movimentos = (niveis - anterior)[:, 1:] * 1e4
+    return pd.DataFrame(movimentos, index=taxas.index, columns=taxas.columns[1:])
+
+def gravar_copom(taxas, reunioes, caminho=CAMINHO_COPOM):
+    """Grava a matriz no layout de leitura com a assinatura do calendário nos metadados"""
+    tabela = pa.Table.from_pandas(taxas.sort_index(kind='stable'))
+    tabela = tabela.replace_schema_metadata({**tabela.schema.metadata, CHAVE_CALENDARIO: assinatura_calendario(reunioes)})
+    escrever_parquet_lotes([tabela], caminho, tabela.num_rows)
+
+def processa_copom(refazer=False, processos=None):
+    """
+    Atualiza Dados/copom_implicito.parquet.
+
+    Sem `refazer`, só as datas posteriores à última já extraída são lidas da
+    base (o filtro de datas vai para o leitor); se o calendário de reuniões
+    mudar, a matriz é refeita.
+    """
+    print("Extraindo taxas implícitas por reunião do Copom...")
+
+    reunioes = carregar_calendario()
+    if reunioes is None:
+        print(f"Calendário do Copom não encontrado: {CAMINHO_CALENDARIO} (extração ignorada)")
+        return None
+
+    origem = 'Dados/Base_Bruta.parquet'
+    if not os.path.exists(origem):
+        print(f"Arquivo não encontrado: {origem}")
+        return None
+
+    existentes = None
+    inicio_leitura = None
+    if not refazer and os.path.exists(CAMINHO_COPOM):
+        metadados = pq.read_schema(CAMINHO_COPOM).metadata or {}
+        if metadados.get(CHAVE_CALENDARIO) != assinatura_calendario(reunioes):
+            print("Calendário do Copom mudou; refazendo a extração")
+        else:
+            existentes = pd.read_parquet(CAMINHO_COPOM)
+            if existentes.columns.tolist() != COLUNAS or existentes.empty:
+                existentes = None
+            else:
+                inicio_leitura = existentes.index[-1] + pd.Timedelta(days=1)
+
+    base = ler_base(origem, colunas=['DataRef', 'Vencimento', 'PUAtual'], inicio=inicio_leitura)
+    base = base[base['PUAtual'] > 0]
+
+    if base.empty:
+        print("Nenhuma data nova para extrair (Copom)")
+        return existentes
+
+    inicio = time.perf_counter()
+    taxas = extrair_taxas(base, reunioes, processos=processos)
+    duracao = time.perf_counter() - inicio
+
+    if existentes is not None:
+        taxas = pd.concat([existentes, taxas])
+
+    gravar_copom(taxas, reunioes)
+    print(f"{len(taxas) if existentes is None else len(taxas) - len(existentes)} datas extraídas em {duracao:.1f}s")
+    print(f"Taxas implícitas salvas: {CAMINHO_COPOM} ({taxas.shape[0]} datas x {MAX_REUNIOES} reuniões à frente)")
+
+    return taxas
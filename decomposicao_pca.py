@@ -0,0 +1,144 @@
+"""
+Decomposição PCA - Superfície de Juros
+Decompõe as variações das curvas processadas em nível, inclinação e curvatura
+com uma covariância atualizada dia a dia (sem refazer o histórico).
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import escrever_json_atomico, escrever_parquet
+
+FATORES = ['nivel', 'inclinacao', 'curvatura']
+
+ORIGENS_PCA = {
+    'brasil': 'Dados/juros_brasil_processado.parquet',
+    'eua': 'Dados/juros_eua_processado.parquet',
+}
+
+def caminho_estado(mercado):
+    return f'Dados/pca_{mercado}_estado.json'
+
+def caminho_fatores(mercado):
+    return f'Dados/pca_{mercado}_fatores.parquet'
+
+class CovarianciaOnline:
+    """
+    Média e covariância atualizadas uma observação por vez (Welford).
+
+    Cada atualização custa O(h²) para h horizontes.
+    """
+
+    def __init__(self, dimensao):
+        self.n = 0
+        self.media = np.zeros(dimensao)
+        self.m2 = np.zeros((dimensao, dimensao))
+
+    def atualizar(self, x):
+        self.n += 1
+        delta = x - self.media
+        self.media += delta / self.n
+        self.m2 += np.outer(delta, x - self.media)
+
+    def covariancia(self):
+        return self.m2 / max(self.n - 1, 1)
+
+    def para_dict(self):
+        return {'n': self.n, 'media': self.media.tolist(), 'm2': self.m2.tolist()}
+
+    @classmethod
+    def de_dict(cls, dados):
+        cov = cls(len(dados['media']))
+        cov.n = dados['n']
+        cov.media = np.array(dados['media'])
+        cov.m2 = np.array(dados['m2'])
+        return cov
+
+def _ordenar_colunas(df, mercado):
+    """Colunas do menor para o maior horizonte, em pontos percentuais"""
+    if mercado == 'brasil':
+        colunas = sorted(df.columns, key=lambda c: int(c.split('_')[0]))
+        return df[colunas] * 100
+    return df[df.columns[::-1]]
+
+def componentes(cov, n_fatores=3):
+    """
+    Autovetores principais da covariância com sinal padronizado: nível com
+    média positiva, inclinação subindo com o prazo e curvatura com a barriga
+    acima das pontas.
+    """
+    autovalores, autovetores = np.linalg.eigh(cov.covariancia())
+    ordem = np.argsort(autovalores)[::-1][:n_fatores]
+    autovalores, cargas = autovalores[ordem], autovetores[:, ordem]
+
+    meio = cargas.shape[0] // 2
+    referencias = [
+        cargas[:, 0].sum(),
+        cargas[-1, 1] - cargas[0, 1],
+        cargas[meio, 2] - (cargas[0, 2] + cargas[-1, 2]) / 2,
+    ]
+    sinais = np.where(np.array(referencias[:cargas.shape[1]]) < 0, -1.0, 1.0)
+    return cargas * sinais, autovalores / np.trace(cov.covariancia())
+
+def processa_pca(mercado, refazer=False):
+    """
+    Atualiza a decomposição de um mercado ('brasil' ou 'eua').
+
+    O estado (covariância online, cargas e última data) fica em Dados/pca_<mercado>_estado.json;
+    só as variações posteriores à última data do estado entram na covariância.
+    Os fatores de todas as datas são recalculados com as cargas atuais em uma
+    única multiplicação de matrizes.
+    """
+    print(f"Atualizando decomposição PCA ({mercado})...")
+
+    origem = ORIGENS_PCA[mercado]
+    if not os.path.exists(origem):
+        print(f"Arquivo não encontrado: {origem}")
+        return None
+
+    curvas = _ordenar_colunas(pd.read_parquet(origem).sort_index(), mercado)
+    variacoes = curvas.diff().iloc[1:]
+    variacoes = variacoes[np.isfinite(variacoes.to_numpy()).all(axis=1)]
+    if len(variacoes) < 3:
+        print(f"Dados insuficientes para a decomposição ({mercado})")
+        return None
+
+    estado = None
+    if not refazer and os.path.exists(caminho_estado(mercado)):
+        with open(caminho_estado(mercado), encoding='utf-8') as f:
+            estado = json.load(f)
+        if estado.get('colunas') != curvas.columns.tolist():
+            print("Horizontes mudaram; refazendo a decomposição")
+            estado = None
+
+    if estado is None:
+        cov = CovarianciaOnline(curvas.shape[1])
+        novas = variacoes
+    else:
+        cov = CovarianciaOnline.de_dict(estado['covariancia'])
+        novas = variacoes[variacoes.index > pd.Timestamp(estado['ultima_data'])]
+
+    for x in novas.to_numpy(dtype=np.float64):
+        cov.atualizar(x)
+    print(f"{len(novas)} variações novas incorporadas ({cov.n} no total)")
+
+    cargas, variancia = componentes(cov)
+    fatores = pd.DataFrame((variacoes.to_numpy() - cov.media) @ cargas,
+                           index=variacoes.index, columns=FATORES[:cargas.shape[1]])
+    escrever_parquet(fatores, caminho_fatores(mercado))
+
+    escrever_json_atomico(caminho_estado(mercado), {
+        'colunas': curvas.columns.tolist(),
+        'ultima_data': variacoes.index[-1].strftime('%Y-%m-%d'),
+        'covariancia': cov.para_dict(),
+        'cargas': {f: cargas[:, i].tolist() for i, f in enumerate(fatores.columns)},
+        'variancia_explicada': {f: float(variancia[i]) for i, f in enumerate(fatores.columns)},
+    })
+
+    explicada = ', '.join(f"{f} {v:.1%}" for f, v in zip(fatores.columns, variancia))
+    print(f"Fatores PCA salvos: {caminho_fatores(mercado)} ({explicada})")
+
+    return fatores
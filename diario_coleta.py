@@ -0,0 +1,93 @@
+"""
+Diário de Coleta - Superfície de Juros
+Registra em disco o resultado de cada data coletada assim que ele chega, para
+que uma coleta interrompida continue de onde parou, e guarda as datas que não
+têm dados (cache negativo) para não consultá-las de novo.
+"""
+
+import datetime
+import json
+import os
+
+import pandas as pd
+
+from armazenamento import escrever_json_atomico
+from base_bruta import CAMINHO_BASE, MERCADORIAS, caminho_mercadoria, inserir
+
+PASTA_DIARIO = 'Dados/diario_coleta'
+
+# Datas vazias mais recentes que isto (em dias corridos, na hora da consulta)
+# podem ainda não ter sido publicadas e são consultadas de novo
+DIAS_TOLERANCIA = 5
+
+class DiarioColeta:
+    """
+    Um arquivo Parquet por data concluída em PASTA_DIARIO, com todas as
+    mercadorias coletadas da data, e um JSON com as datas sem dados
+    (data -> dia da consulta).
+
+    As datas do diário só saem dele quando `consolidar()` grava tudo na base.
+    """
+
+    def __init__(self, pasta=PASTA_DIARIO, dias_tolerancia=DIAS_TOLERANCIA):
+        self.pasta = pasta
+        self.dias_tolerancia = dias_tolerancia
+        self.caminho_vazias = os.path.join(pasta, 'sem_dados.json')
+        os.makedirs(pasta, exist_ok=True)
+        try:
+            with open(self.caminho_vazias, encoding='utf-8') as f:
+                self.vazias = json.load(f)
+        except (OSError, ValueError):
+            self.vazias = {}
+
+    def _caminho(self, data):
+        return os.path.join(self.pasta, f'{data:%Y-%m-%d}.parquet')
+
+    def arquivos(self):
+        return sorted(
+            os.path.join(self.pasta, nome) for nome in os.listdir(self.pasta)
+            if nome.endswith('.parquet')
+        )
+
+    def concluida(self, data):
+        return os.path.exists(self._caminho(data))
+
+    def sem_dados(self, data):
+        """Data conhecida como vazia e consultada quando já não era recente"""
+        consulta = self.vazias.get(f'{data:%Y-%m-%d}')
+        if consulta is None:
+            return False
+        atraso = datetime.date.fromisoformat(consulta) - pd.Timestamp(data).date()
+        return atraso.days > self.dias_tolerancia
+
+    def pendentes(self, datas):
+        """Datas que ainda precisam ser consultadas"""
+        return [d for d in datas if not self.concluida(d) and not self.sem_dados(d)]
+
+    def registrar(self, data, df):
+        """Grava os registros de uma data (arquivo temporário + troca atômica)"""
+        destino = self._caminho(data)
+        df.to_parquet(destino + '.tmp', index=False)
+        os.replace(destino + '.tmp', destino)
+
+    def registrar_vazia(self, data):
+        self.vazias[f'{data:%Y-%m-%d}'] = datetime.date.today().isoformat()
+        escrever_json_atomico(self.caminho_vazias, self.vazias)
+
+    def consolidar(self, caminho_base=CAMINHO_BASE, mercadorias=MERCADORIAS):
+        """
+        Insere todas as datas do diário na base de cada mercadoria (escrita em
+        fluxo, um arquivo por vez; a do DI1 é `caminho_base`) e as remove do
+        diário. Retorna {mercadoria: (linhas na base, inseridos, substituídos)}
+        ou None se o diário estiver vazio.
+        """
+        arquivos = self.arquivos()
+        if not arquivos:
+            return None
+        resultados = {
+            mercadoria: inserir(arquivos, caminho_mercadoria(mercadoria, caminho_base), mercadoria=mercadoria)
+            for mercadoria in mercadorias
+        }
+        for arquivo in arquivos:
+            os.remove(arquivo)
+        return resultados
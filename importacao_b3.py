@@ -0,0 +1,205 @@
+"""
+Importação de Arquivos da B3 - Superfície de Juros
+Carga do histórico a partir dos arquivos de fim de dia da B3 (Boletim de
+Preços BVBG.086 em XML ou planilhas CSV, soltos ou em .zip, inclusive .zip
+dentro de .zip como são baixados), em vez de uma página de ajustes por data.
+Os arquivos são lidos em fluxo (pedaços de bytes no XML, blocos de linhas no CSV),
+só os ajustes das MERCADORIAS são guardados e, a cada lote de arquivos, eles
+são inseridos direto na base bruta de cada mercadoria.
+
+Uso:
+    python importacao_b3.py Dados/arquivos_b3/*.zip
+"""
+
+import argparse
+import io
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+
+import numpy as np
+import pandas as pd
+from lxml import etree
+
+from armazenamento import atualizar_manifesto
+from base_bruta import CAMINHO_BASE, CODIGOS_MES, MERCADORIAS, caminho_mercadoria, inserir, padrao_ticker
+
+# Linhas por bloco na leitura dos CSV e bytes por pedaço na leitura dos XML
+LINHAS_POR_BLOCO_CSV = 100_000
+TAMANHO_PEDACO_XML = 1 << 20
+
+# Arquivos lidos antes de cada gravação nas bases
+ARQUIVOS_POR_LOTE = 250
+
+# Campos do BVBG.086 (e colunas dos CSV de mesmo nome) usados na importação
+CAMPOS = {
+    'data': 'TradDt/Dt',
+    'ticker': 'SctyId/TckrSymb',
+    'pu_atual': 'FinInstrmAttrbts/AdjstdQt',
+    'pu_anterior': 'FinInstrmAttrbts/PrvsAdjstdQt',
+}
+COLUNAS_CSV = {'RptDt': 'data', 'TradDt': 'data', 'TckrSymb': 'ticker',
+               'AdjstdQt': 'pu_atual', 'PrvsAdjstdQt': 'pu_anterior'}
+
+def _caminho_xml(campo):
+    return '/'.join('{*}' + parte for parte in CAMPOS[campo].split('/'))
+
+def _precos_xml(arquivo, mercadorias, tamanho=TAMANHO_PEDACO_XML):
+    """
+    Trechos <PricRpt>...</PricRpt> das MERCADORIAS, lidos em pedaços de
+    `tamanho` bytes. O boletim traz todos os instrumentos da bolsa e os
+    futuros de juros são uma fração mínima dele: procurar o ticker nos bytes
+    evita montar a árvore XML dos outros registros.
+    """
+    ticker = re.compile(
+        rb'<TckrSymb>\s*(?:' + b'|'.join(re.escape(m.encode()) for m in mercadorias) +
+        rb')[' + CODIGOS_MES.encode() + rb']\d\d\s*</TckrSymb>')
+    resto = b''
+    while True:
+        pedaco = arquivo.read(tamanho)
+        resto += pedaco
+        # Só até o último registro completo; o que vem depois espera o próximo pedaço
+        fim = resto.rfind(b'</PricRpt>') if pedaco else len(resto)
+        fim = fim + len(b'</PricRpt>') if 0 <= fim < len(resto) else max(fim, 0)
+        for encontrado in ticker.finditer(resto, 0, fim):
+            inicio = resto.rfind(b'<PricRpt>', 0, encontrado.start())
+            final = resto.find(b'</PricRpt>', encontrado.end())
+            if inicio >= 0 and final >= 0:
+                yield resto[inicio:final + len(b'</PricRpt>')]
+        resto = resto[fim:]
+        if not pedaco:
+            return
+
+def ler_xml(arquivo, mercadorias=MERCADORIAS):
+    """Ajustes (data, ticker, PU atual, PU anterior) de um Boletim de Preços BVBG.086"""
+    padrao = padrao_ticker(mercadorias)
+    caminhos = {campo: _caminho_xml(campo) for campo in CAMPOS}
+    linhas = []
+    for trecho in _precos_xml(arquivo, mercadorias):
+        preco = etree.fromstring(trecho)
+        ticker = (preco.findtext(caminhos['ticker']) or '').strip()
+        if padrao.match(ticker):
+            linhas.append((preco.findtext(caminhos['data']), ticker,
+                           preco.findtext(caminhos['pu_atual']), preco.findtext(caminhos['pu_anterior'])))
+    return pd.DataFrame(linhas, columns=list(CAMPOS))
+
+def ler_csv(arquivo, mercadorias=MERCADORIAS, linhas_por_bloco=LINHAS_POR_BLOCO_CSV):
+    """Ajustes de uma planilha CSV da B3 (separador ';'), lida em blocos de linhas"""
+    padrao = padrao_ticker(mercadorias)
+    texto = io.TextIOWrapper(arquivo, encoding='latin-1', newline='')
+
+    # Alguns arquivos trazem uma linha de título antes do cabeçalho
+    cabecalho = texto.readline()
+    if 'TckrSymb' not in cabecalho:
+        cabecalho = texto.readline()
+    nomes = [coluna.strip() for coluna in cabecalho.rstrip('\r\n').split(';')]
+
+    partes = []
+    # Texto em colunas Arrow: limpeza e filtro dos tickers fora do Python
+    blocos = pd.read_csv(texto, sep=';', header=None, names=nomes, dtype='string[pyarrow]',
+                         usecols=[coluna for coluna in nomes if coluna in COLUNAS_CSV], chunksize=linhas_por_bloco)
+    for bloco in blocos:
+        bloco = bloco.rename(columns=COLUNAS_CSV)
+        ticker = bloco['ticker'].str.strip()
+        partes.append(bloco[ticker.str.match(padrao).fillna(False)].assign(ticker=ticker))
+    ajustes = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=list(CAMPOS))
+    return ajustes.reindex(columns=list(CAMPOS))
+
+def _numero(valores):
+    """Números no formato do arquivo: '99562.37' ou '99.562,37'"""
+    texto = pd.Series(valores, dtype=object).astype(str).str.strip()
+    decimal_virgula = texto.str.contains(',', regex=False)
+    texto = texto.where(~decimal_virgula, texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    return pd.to_numeric(texto, errors='coerce').to_numpy(dtype=np.float64)
+
+def registros(ajustes, mercadorias=MERCADORIAS):
+    """Ajustes lidos no formato da base bruta (o mesmo do diário da coleta)"""
+    partes = ajustes['ticker'].str.extract(padrao_ticker(mercadorias))
+    pu_atual, pu_anterior = _numero(ajustes['pu_atual']), _numero(ajustes['pu_anterior'])
+    df = pd.DataFrame({
+        'DataRef': pd.to_datetime(ajustes['data'].str.strip().str[:10], format='%Y-%m-%d'),
+        'Mercadoria': partes[0].to_numpy(dtype=object),
+        'CDVencimento': partes[1].to_numpy(dtype=object),
+        'PUAnterior': pu_anterior,
+        'PUAtual': pu_atual,
+        'Variacao': pu_atual - pu_anterior,
+    })
+
+    # Contratos vencidos (PU 100.000) e sem ajuste não entram, como na coleta
+    return df[np.isfinite(pu_atual) & (pu_atual != 100000.0)].reset_index(drop=True)
+
+def arquivos_internos(caminho, arquivo=None):
+    """(nome, arquivo aberto) de cada XML/CSV de um arquivo solto ou .zip, abrindo .zip internos"""
+    nome = os.path.basename(caminho)
+    if nome.lower().endswith('.zip'):
+        with zipfile.ZipFile(arquivo or caminho) as pacote:
+            for membro in pacote.namelist():
+                if membro.lower().endswith('.zip'):
+                    # O .zip interno precisa de acesso aleatório: vai para a memória (comprimido)
+                    yield from arquivos_internos(membro, io.BytesIO(pacote.read(membro)))
+                elif membro.lower().endswith(('.xml', '.csv', '.txt')):
+                    with pacote.open(membro) as interno:
+                        yield membro, interno
+    elif nome.lower().endswith(('.xml', '.csv', '.txt')):
+        with open(caminho, 'rb') if arquivo is None else arquivo as aberto:
+            yield nome, aberto
+
+def ler_arquivo(caminho, mercadorias=MERCADORIAS):
+    """Registros (formato da base bruta) de todos os XML/CSV de um arquivo da B3"""
+    partes = []
+    for nome, arquivo in arquivos_internos(caminho):
+        ler = ler_xml if nome.lower().endswith('.xml') else ler_csv
+        partes.append(registros(ler(arquivo, mercadorias), mercadorias))
+    return pd.concat(partes, ignore_index=True) if partes else registros(pd.DataFrame(columns=list(CAMPOS)))
+
+def importar(caminhos, caminho_base=CAMINHO_BASE, mercadorias=MERCADORIAS,
+             arquivos_por_lote=ARQUIVOS_POR_LOTE, processos=1):
+    """
+    Importa arquivos da B3 para as bases brutas (a do DI1 é `caminho_base`).
+    A cada `arquivos_por_lote` arquivos os registros lidos são inseridos
+    direto em cada base pela chave (DataRef, CDVencimento), substituindo os
+    existentes, sem passar pelo diário da coleta: a memória fica no lote e o
+    que já foi gravado não se perde se a importação parar. Com `processos`
+    > 1, os arquivos do lote são lidos em paralelo.
+
+    Retorna (datas importadas, {mercadoria: (linhas na base, inseridos, substituídos)}).
+    """
+    inicio = time.perf_counter()
+    datas = set()
+    resultados = {mercadoria: (0, 0, 0) for mercadoria in mercadorias}
+    ler = partial(ler_arquivo, mercadorias=mercadorias)
+    with ProcessPoolExecutor(processos) if processos > 1 else nullcontext() as pool:
+        for primeiro in range(0, len(caminhos), arquivos_por_lote):
+            lote = caminhos[primeiro:primeiro + arquivos_por_lote]
+            df = pd.concat(list(pool.map(ler, lote) if pool else map(ler, lote)), ignore_index=True)
+            datas.update(df['DataRef'].unique())
+            for mercadoria in mercadorias:
+                total, inseridos, substituidos = inserir(
+                    df[df['Mercadoria'].to_numpy() == mercadoria], caminho_mercadoria(mercadoria, caminho_base))
+                anteriores = resultados[mercadoria]
+                resultados[mercadoria] = (total, anteriores[1] + inseridos, anteriores[2] + substituidos)
+            print(f"{primeiro + len(lote)}/{len(caminhos)} arquivos: {len(df)} ajustes de "
+                  f"{df['DataRef'].nunique()} datas gravados")
+
+    duracao = time.perf_counter() - inicio
+    print(f"{len(datas)} datas importadas em {duracao:.1f}s ({len(datas) / max(duracao, 1e-9) * 60:.0f} datas/min)")
+    return len(datas), resultados
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa arquivos de fim de dia da B3 para as bases brutas")
+    parser.add_argument('arquivos', nargs='+', help="Arquivos .zip, .xml ou .csv da B3")
+    parser.add_argument('--base', default=CAMINHO_BASE, help="Base bruta do DI1 (as outras ficam ao lado)")
+    parser.add_argument('--processos', type=int, default=1, help="Processos na leitura dos arquivos")
+    args = parser.parse_args()
+
+    _, resultados = importar(sorted(args.arquivos), args.base, processos=args.processos)
+    for mercadoria, (total, inseridos, substituidos) in resultados.items():
+        print(f"{mercadoria}: {inseridos} registros novos, {substituidos} substituídos ({total} na base)")
+    atualizar_manifesto()
+
+if __name__ == '__main__':
+    main()
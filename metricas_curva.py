@@ -0,0 +1,128 @@
+"""
+Métricas da Estrutura a Termo - Superfície de Juros
+Materializa spreads, borboletas e taxas de vértices (com variação diária) a
+partir das matrizes de horizontes processadas, com atualização incremental.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import escrever_parquet
+
+# Definições das métricas. Tipos:
+#   taxa      - taxa de um vértice
+#   spread    - longo - curto
+#   borboleta - 2 x meio - curto - longo
+# Todas em pontos percentuais; cada métrica ganha também a coluna <nome>_var
+# com a variação em relação à data anterior.
+DEFINICOES_METRICAS = {
+    'brasil': [
+        {'nome': 'taxa_252', 'tipo': 'taxa', 'vertices': ['252_dias']},
+        {'nome': 'taxa_2520', 'tipo': 'taxa', 'vertices': ['2520_dias']},
+        {'nome': 'spread_21x252', 'tipo': 'spread', 'vertices': ['21_dias', '252_dias']},
+        {'nome': 'spread_252x2520', 'tipo': 'spread', 'vertices': ['252_dias', '2520_dias']},
+        {'nome': 'spread_252x1260', 'tipo': 'spread', 'vertices': ['252_dias', '1260_dias']},
+        {'nome': 'borboleta_252x1260x2520', 'tipo': 'borboleta', 'vertices': ['252_dias', '1260_dias', '2520_dias']},
+    ],
+    'eua': [
+        {'nome': 'taxa_2Y', 'tipo': 'taxa', 'vertices': ['2Y']},
+        {'nome': 'taxa_10Y', 'tipo': 'taxa', 'vertices': ['10Y']},
+        {'nome': 'spread_2Yx10Y', 'tipo': 'spread', 'vertices': ['2Y', '10Y']},
+        {'nome': 'spread_3Mx10Y', 'tipo': 'spread', 'vertices': ['3M', '10Y']},
+        {'nome': 'borboleta_2Yx5Yx10Y', 'tipo': 'borboleta', 'vertices': ['2Y', '5Y', '10Y']},
+    ],
+}
+
+PESOS_TIPO = {
+    'taxa': [1.0],
+    'spread': [-1.0, 1.0],
+    'borboleta': [-1.0, 2.0, -1.0],
+}
+
+ORIGENS_METRICAS = {
+    'brasil': ('Dados/juros_brasil_processado.parquet', 100.0),
+    'eua': ('Dados/juros_eua_processado.parquet', 1.0),
+}
+
+def caminho_metricas(mercado):
+    return f'Dados/metricas_{mercado}.parquet'
+
+def matriz_pesos(colunas, definicoes):
+    """Matriz horizontes x métricas: cada métrica é uma combinação linear de vértices"""
+    pesos = np.zeros((len(colunas), len(definicoes)))
+    posicao = {col: i for i, col in enumerate(colunas)}
+    for j, definicao in enumerate(definicoes):
+        coeficientes = PESOS_TIPO[definicao['tipo']]
+        if len(coeficientes) != len(definicao['vertices']):
+            raise ValueError(f"Métrica {definicao['nome']}: {definicao['tipo']} usa {len(coeficientes)} vértices")
+        for vertice, coeficiente in zip(definicao['vertices'], coeficientes):
+            if vertice not in posicao:
+                raise ValueError(f"Métrica {definicao['nome']}: vértice {vertice} não existe")
+            pesos[posicao[vertice], j] += coeficiente
+    return pesos
+
+def calcular_metricas(curvas, definicoes, escala=1.0, anterior=None):
+    """
+    Calcula todas as métricas de uma vez (matriz de curvas x matriz de pesos).
+
+    `anterior` é a última linha de métricas já materializada, usada para a
+    variação da primeira data nova.
+    """
+    nomes = [d['nome'] for d in definicoes]
+    pesos = matriz_pesos(curvas.columns, definicoes)
+
+    # Só os vértices usados entram na conta (NaN em outros vértices não contamina)
+    usados = pesos.any(axis=1)
+    valores = (curvas.to_numpy(dtype=np.float64)[:, usados] * escala) @ pesos[usados]
+    niveis = pd.DataFrame(valores, index=curvas.index, columns=nomes)
+
+    base = niveis.shift(1)
+    if anterior is not None and len(niveis) > 0:
+        base.iloc[0] = anterior[nomes].to_numpy()
+    variacoes = (niveis - base).add_suffix('_var')
+
+    return pd.concat([niveis, variacoes], axis=1)
+
+def processa_metricas(mercado, definicoes=None, refazer=False):
+    """
+    Atualiza Dados/metricas_<mercado>.parquet.
+
+    Só as datas posteriores à última materializada são calculadas; se as
+    definições mudarem (colunas diferentes), a tabela é refeita.
+    """
+    print(f"Atualizando métricas da estrutura a termo ({mercado})...")
+
+    definicoes = DEFINICOES_METRICAS[mercado] if definicoes is None else definicoes
+    origem, escala = ORIGENS_METRICAS[mercado]
+    if not os.path.exists(origem):
+        print(f"Arquivo não encontrado: {origem}")
+        return None
+
+    curvas = pd.read_parquet(origem).sort_index()
+    colunas = [d['nome'] for d in definicoes]
+    colunas += [f'{c}_var' for c in colunas]
+
+    caminho = caminho_metricas(mercado)
+    existentes = None
+    if not refazer and os.path.exists(caminho):
+        existentes = pd.read_parquet(caminho)
+        if existentes.columns.tolist() != colunas or existentes.empty:
+            print("Definições das métricas mudaram; refazendo a tabela")
+            existentes = None
+
+    if existentes is None:
+        metricas = calcular_metricas(curvas, definicoes, escala)
+    else:
+        novas = curvas[curvas.index > existentes.index[-1]]
+        if novas.empty:
+            print(f"Nenhuma data nova para as métricas ({mercado})")
+            return existentes
+        metricas = pd.concat([existentes, calcular_metricas(novas, definicoes, escala, existentes.iloc[-1])])
+
+    metricas.index.name = curvas.index.name
+    escrever_parquet(metricas, caminho)
+    print(f"Métricas salvas: {caminho} ({len(metricas)} datas, {len(definicoes)} métricas)")
+
+    return metricas